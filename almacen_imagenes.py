@@ -0,0 +1,157 @@
+# almacen_imagenes.py - Almacén de gráficas direccionado por contenido
+import hashlib
+import os
+import tempfile
+import threading
+import time
+
+# umask del proceso, leída una sola vez al importar (cambiarla para leerla no
+# es seguro con varios hilos)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class ImageStore:
+    """
+    Guarda las gráficas en disco con un nombre derivado de su contenido lógico.
+
+    Dos peticiones con la misma función, límites, resolución y estilo
+    comparten el mismo archivo, así que la gráfica solo se renderiza una vez.
+    Las escrituras son atómicas (archivo temporal + rename) y un hilo en
+    segundo plano desaloja los archivos menos usados cuando se superan los
+    límites de tamaño o de cantidad.
+    """
+
+    PREFIX = "graph_"
+
+    def __init__(self, directory, max_bytes=200 * 2 ** 20, max_files=2000,
+                 sweep_interval=60.0, grace_period=120.0):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_files = max_files
+        self.sweep_interval = sweep_interval
+        # Archivos usados hace menos de esto nunca se desalojan (pueden estar cargándose)
+        self.grace_period = grace_period
+
+        self._lock = threading.Lock()
+        self._sweeper_pid = None
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(*parts):
+        """Genera la clave de una gráfica a partir de sus parámetros"""
+        canon = "|".join(str(part) for part in parts)
+        return hashlib.sha256(canon.encode("utf-8")).hexdigest()[:32]
+
+    def filename(self, key, ext="png"):
+        return f"{self.PREFIX}{key}.{ext}"
+
+    def lookup(self, key, ext="png"):
+        """Devuelve el nombre del archivo si ya existe (y lo marca como usado), o None"""
+        path = os.path.join(self.directory, self.filename(key, ext))
+        try:
+            # Actualizar la fecha de modificación sirve como marca LRU
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return self.filename(key, ext)
+
+    def save(self, key, data, ext="png"):
+        """Escribe la imagen de forma atómica y devuelve el nombre del archivo"""
+        self._ensure_sweeper()
+        name = self.filename(key, ext)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp_", suffix=f".{ext}")
+        try:
+            # mkstemp crea el archivo con 0600: las gráficas las sirve también
+            # el servidor de estáticos, que puede correr con otro usuario
+            os.fchmod(fd, 0o666 & ~_UMASK)
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, os.path.join(self.directory, name))
+        except BaseException:
+            try:
+                os.remove(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+        with self._lock:
+            self.writes += 1
+        return name
+
+    def sweep(self):
+        """Desaloja los archivos menos usados hasta respetar los límites"""
+        now = time.time()
+        files = []
+        total = 0
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    info = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.startswith(".tmp_"):
+                    # Temporales huérfanos de escrituras interrumpidas
+                    if now - info.st_mtime > self.grace_period:
+                        self._remove(entry.path)
+                    continue
+                if not entry.name.startswith(self.PREFIX):
+                    continue
+                files.append((info.st_mtime, info.st_size, entry.path))
+                total += info.st_size
+
+        files.sort()
+        count = len(files)
+        for mtime, size, path in files:
+            if total <= self.max_bytes and count <= self.max_files:
+                break
+            if now - mtime < self.grace_period:
+                break
+            if self._remove(path):
+                total -= size
+                count -= 1
+                with self._lock:
+                    self.evictions += 1
+
+    def stats(self):
+        """Devuelve los contadores del almacén"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "aciertos": self.hits,
+                "fallos": self.misses,
+                "escrituras": self.writes,
+                "desalojos": self.evictions,
+                "tasa_aciertos": self.hits / total if total else 0.0,
+            }
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _ensure_sweeper(self):
+        """Arranca el hilo de limpieza en el proceso actual (también tras un fork)"""
+        with self._lock:
+            if self._sweeper_pid == os.getpid():
+                return
+            self._sweeper_pid = os.getpid()
+        threading.Thread(target=self._sweep_loop, daemon=True).start()
+
+    def _sweep_loop(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                print(f"Error al limpiar las gráficas: {e}")
+            time.sleep(self.sweep_interval)
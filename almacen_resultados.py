@@ -0,0 +1,306 @@
+# almacen_resultados.py - Almacén persistente de resultados compartido entre procesos (SQLite en modo WAL)
+#
+# Precarga desde un corpus al desplegar:
+#
+#   python -m almacen_resultados precargar corpus.txt [--ruta resultados.db] [--procesos N]
+#   python -m almacen_resultados estadisticas [--ruta resultados.db]
+#
+# El corpus tiene una integral por línea, "función; inferior; superior"
+# (x^2; 0; 1), o un objeto JSON con las claves de /calcular; las líneas
+# vacías y las que empiezan con # se ignoran.
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from sympy import srepr, sympify
+
+
+class ResultStore:
+    """
+    Resultados de las integrales en un archivo SQLite local, compartido por
+    todos los workers de gunicorn y los procesos del pool, que sobrevive a
+    los reinicios.
+
+    Las entradas se indexan por la clave canónica de la expresión (ver
+    cache_resultados.canonical_key) y se guardan en JSON, con las
+    expresiones de SymPy (antiderivada, forma exacta) serializadas con
+    ``srepr``. El modo WAL permite lecturas concurrentes con una escritura a
+    la vez, y cada hilo de cada proceso usa su propia conexión (se reabre
+    tras un fork). Cuando el tamaño total supera ``max_bytes`` se desalojan
+    las entradas usadas hace más tiempo.
+
+    Args:
+        path: Archivo SQLite
+        max_bytes: Tamaño máximo de los valores guardados (None = sin límite)
+        ttl: Segundos de validez de una entrada (None = no expiran: el
+            resultado de una integral no cambia)
+        check_every: Escrituras de este proceso entre dos revisiones del tamaño
+    """
+
+    # Campos que contienen expresiones de SymPy y se serializan con srepr
+    SYMPY_FIELDS = ("definida", "indefinida", "exacta")
+
+    # Una lectura solo actualiza la marca de uso si es más vieja que esto
+    # (segundos), para no convertir cada lectura en una escritura
+    TOUCH_INTERVAL = 300.0
+
+    def __init__(self, path, max_bytes=256 * 2 ** 20, ttl=None, check_every=100):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.check_every = check_every
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self.errors = 0
+        self._writes_since_check = 0
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # El modo WAL queda guardado en el archivo
+        self._connection().execute("PRAGMA journal_mode=WAL")
+        with self._write() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS resultados ("
+                "clave TEXT PRIMARY KEY, valor TEXT NOT NULL, creado REAL NOT NULL)"
+            )
+            # Archivos de la versión anterior (sin marca de uso ni tamaño)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(resultados)")}
+            if "usado" not in columns:
+                conn.execute("ALTER TABLE resultados ADD COLUMN usado REAL")
+                conn.execute("UPDATE resultados SET usado = creado")
+            if "tamano" not in columns:
+                conn.execute("ALTER TABLE resultados ADD COLUMN tamano INTEGER")
+                conn.execute("UPDATE resultados SET tamano = length(valor)")
+            conn.execute("CREATE INDEX IF NOT EXISTS resultados_usado ON resultados (usado)")
+
+    def get(self, key):
+        """Devuelve la entrada guardada o None si no existe, expiró o no se puede leer"""
+        try:
+            rows = self._connection().execute(
+                "SELECT valor, creado, usado FROM resultados WHERE clave = ?", (key,)
+            ).fetchall()
+            now = time.time()
+            if not rows or (self.ttl is not None and now - rows[0][1] > self.ttl):
+                with self._lock:
+                    self.misses += 1
+                return None
+            value, _, used = rows[0]
+            entry = self.deserialize(value)
+            if used is None or now - used > self.TOUCH_INTERVAL:
+                with self._write() as conn:
+                    conn.execute("UPDATE resultados SET usado = ? WHERE clave = ?", (now, key))
+        except Exception as e:
+            self._error("leer", e)
+            return None
+        with self._lock:
+            self.hits += 1
+        return entry
+
+    def set(self, key, entry):
+        """Guarda (o reemplaza) una entrada; los errores no interrumpen el cálculo"""
+        try:
+            value = self.serialize(entry)
+            now = time.time()
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO resultados (clave, valor, creado, usado, tamano) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, value, now, now, len(value)),
+                )
+            with self._lock:
+                self.writes += 1
+                self._writes_since_check += 1
+                check = self._writes_since_check >= self.check_every
+                if check:
+                    self._writes_since_check = 0
+            if check:
+                self.evict()
+        except Exception as e:
+            self._error("escribir", e)
+
+    def evict(self):
+        """Desaloja las entradas menos usadas hasta quedar en el 90 % de max_bytes"""
+        if not self.max_bytes:
+            return 0
+        with self._write() as conn:
+            total = conn.execute("SELECT COALESCE(SUM(tamano), 0) FROM resultados").fetchone()[0]
+            if total <= self.max_bytes:
+                return 0
+            target = 0.9 * self.max_bytes
+            victims = []
+            for key, size in conn.execute("SELECT clave, tamano FROM resultados ORDER BY usado").fetchall():
+                if total <= target:
+                    break
+                victims.append((key,))
+                total -= size or 0
+            conn.executemany("DELETE FROM resultados WHERE clave = ?", victims)
+            removed = len(victims)
+        with self._lock:
+            self.evictions += removed
+        return removed
+
+    def stats(self):
+        """Tamaño del almacén y contadores de este proceso"""
+        with self._lock:
+            data = {
+                "ruta": self.path,
+                "aciertos": self.hits,
+                "fallos": self.misses,
+                "escrituras": self.writes,
+                "desalojos": self.evictions,
+                "errores": self.errors,
+                "max_bytes": self.max_bytes,
+            }
+        try:
+            entries, size = self._connection().execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamano), 0) FROM resultados"
+            ).fetchall()[0]
+            data.update(entradas=entries, bytes=size)
+        except Exception as e:
+            self._error("leer", e)
+        return data
+
+    def serialize(self, entry):
+        data = dict(entry)
+        for field in self.SYMPY_FIELDS:
+            if data.get(field) is not None:
+                data[field] = srepr(data[field])
+        return json.dumps(data)
+
+    def deserialize(self, raw):
+        data = json.loads(raw)
+        for field in self.SYMPY_FIELDS:
+            if data.get(field) is not None:
+                data[field] = sympify(data[field])
+        return data
+
+    @contextmanager
+    def _write(self):
+        """
+        Transacción de escritura. BEGIN IMMEDIATE toma el candado de escritura
+        al empezar (esperando hasta el timeout), en lugar de fallar al querer
+        convertir una lectura en escritura mientras otro proceso escribe.
+        """
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _connection(self):
+        # Una conexión por hilo y por proceso: las de antes de un fork no se reutilizan
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # Sin transacciones implícitas: las de escritura las abre _write
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _error(self, operation, error):
+        with self._lock:
+            self.errors += 1
+        print(f"Error al {operation} el almacén de resultados: {error}")
+
+
+def read_corpus(path):
+    """
+    Lee un corpus de integrales.
+
+    Returns:
+        list: (función, límite inferior, límite superior)
+    """
+    items = []
+    with open(path, encoding="utf-8") as corpus:
+        for number, line in enumerate(corpus, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("{"):
+                data = json.loads(line)
+                parts = [data.get("funcion"), data.get("limite_inferior"), data.get("limite_superior")]
+            else:
+                parts = [part.strip() for part in line.split(";")]
+            if len(parts) != 3 or not all(parts):
+                raise ValueError(f"{path}:{number}: se esperaba 'función; inferior; superior'")
+            items.append(tuple(str(part) for part in parts))
+    return items
+
+
+def _precargar_una(item):
+    """Calcula una integral del corpus con la calculadora del proceso (que escribe en el almacén)"""
+    import tareas
+    calculadora = tareas.obtener_calculadora()
+    funcion, inferior, superior = item
+    inicio = time.perf_counter()
+    try:
+        resultado = calculadora.calculate_integral(funcion, inferior, superior)
+        # El texto formateado también queda guardado en la entrada
+        calculadora.format_result_pretty(resultado["definida"], resultado["indefinida"], resultado["a"],
+                                         resultado["b"], funcion, error_estimate=resultado["error_estimado"],
+                                         engine=resultado["motor"])
+        return item, resultado["motor"], time.perf_counter() - inicio, None
+    except Exception as e:
+        return item, None, time.perf_counter() - inicio, str(e)
+
+
+def precargar(args):
+    """Calcula todas las integrales del corpus y las deja en el almacén"""
+    os.environ["CALCULADORA_CACHE_DISCO"] = args.ruta
+    items = read_corpus(args.corpus)
+    inicio = time.perf_counter()
+    errores = 0
+    if args.procesos > 1:
+        import multiprocessing
+        with multiprocessing.get_context("spawn").Pool(args.procesos) as pool:
+            resultados = pool.imap_unordered(_precargar_una, items)
+            for i, (item, motor, segundos, error) in enumerate(resultados, 1):
+                errores += error is not None
+                _informar(i, len(items), item, motor, segundos, error)
+    else:
+        for i, item in enumerate(items, 1):
+            item, motor, segundos, error = _precargar_una(item)
+            errores += error is not None
+            _informar(i, len(items), item, motor, segundos, error)
+    print(f"{len(items)} integrales en {time.perf_counter() - inicio:.1f} s, {errores} errores")
+    print(json.dumps(ResultStore(args.ruta, max_bytes=None).stats(), ensure_ascii=False))
+    return 1 if errores and args.estricto else 0
+
+
+def _informar(i, total, item, motor, segundos, error):
+    estado = f"error: {error}" if error else motor
+    print(f"[{i}/{total}] {' ; '.join(item)}  {segundos:.2f} s  {estado}", flush=True)
+
+
+def estadisticas(args):
+    """Muestra el tamaño del almacén"""
+    print(json.dumps(ResultStore(args.ruta, max_bytes=None).stats(), ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Almacén persistente de resultados de la calculadora")
+    parser.add_argument("--ruta", default=os.environ.get("CALCULADORA_CACHE_DISCO") or "resultados.db",
+                        help="archivo SQLite (por defecto CALCULADORA_CACHE_DISCO o resultados.db)")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+    precarga = comandos.add_parser("precargar", help="calcular un corpus y guardar sus resultados")
+    precarga.add_argument("corpus", help="archivo con una integral por línea")
+    precarga.add_argument("--procesos", type=int, default=1, help="procesos de cálculo en paralelo")
+    precarga.add_argument("--estricto", action="store_true", help="terminar con error si falla alguna integral")
+    precarga.set_defaults(funcion=precargar)
+    comandos.add_parser("estadisticas", help="mostrar el tamaño del almacén").set_defaults(funcion=estadisticas)
+    args = parser.parse_args()
+    sys.exit(args.funcion(args))
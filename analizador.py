@@ -0,0 +1,286 @@
+# analizador.py - Analizador de expresiones que construye árboles de SymPy sin eval
+import re
+from functools import lru_cache
+
+from sympy import (Abs, Float, Integer, acos, asin, atan, cos, cosh, exp, log, oo, pi,
+                   sin, sinh, sqrt, symbols, tan, tanh)
+
+x, y, z = symbols('x y z')
+
+# Variables de integración de las integrales múltiples, por nombre
+VARIABLES = {'x': x, 'y': y, 'z': z}
+
+# Constantes y variables reconocidas
+NOMBRES = {
+    'x': x,
+    'pi': pi,
+    'π': pi,
+    'e': exp(1),
+    'E': exp(1),
+    'oo': oo,
+    '∞': oo,
+}
+
+# Nombres de las integrales múltiples: los mismos más las variables y, z
+NOMBRES_MULTIPLES = dict(NOMBRES, **VARIABLES)
+
+# Funciones reconocidas y su número de argumentos
+FUNCIONES = {
+    'sin': (sin, 1),
+    'cos': (cos, 1),
+    'tan': (tan, 1),
+    'exp': (exp, 1),
+    'ln': (log, 1),
+    'log': (log, (1, 2)),
+    'sqrt': (sqrt, 1),
+    'abs': (Abs, 1),
+    'asin': (asin, 1),
+    'acos': (acos, 1),
+    'atan': (atan, 1),
+    'sinh': (sinh, 1),
+    'cosh': (cosh, 1),
+    'tanh': (tanh, 1),
+}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<numero>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+      | (?P<nombre>[A-Za-z_]+|π|∞)
+      | (?P<operador>\*\*|[-+*/^(),])
+    )""", re.VERBOSE)
+
+
+def _power_bits(base, exponent):
+    """
+    Bits aproximados del resultado exacto de base^exponente: |exponente| por
+    los bits del numerador o denominador de la base (ya evaluada, aunque sea
+    a su vez una potencia). 0 si no es una potencia exacta entre racionales.
+    """
+    if not (base.is_Rational and exponent.is_Rational) or abs(base) in (0, 1):
+        return 0
+    return float(abs(exponent)) * max(abs(base.p).bit_length(), base.q.bit_length())
+
+
+class ParseError(ValueError):
+    """La expresión no pertenece a la gramática admitida"""
+
+
+class ExpressionParser:
+    """
+    Convierte cadenas como ``2x^2 + sin(πx)`` en expresiones de SymPy.
+
+    Es un analizador descendente recursivo para la gramática de la calculadora:
+    números, constantes (pi, e, oo), variables, las funciones de ``FUNCIONES``,
+    ``+ - * / ^ **`` y la multiplicación implícita. No usa ``eval``: los
+    nombres desconocidos son un error, y las entradas demasiado largas, demasiado
+    anidadas o con potencias numéricas enormes se rechazan antes de construir
+    el árbol. Los resultados se memorizan por cadena en una caché LRU.
+    """
+
+    def __init__(self, names=None, functions=None, maxsize=1024,
+                 max_length=1000, max_depth=50, max_power_bits=2 ** 16):
+        self.names = dict(NOMBRES if names is None else names)
+        self.functions = dict(FUNCIONES if functions is None else functions)
+        self.max_length = max_length
+        self.max_depth = max_depth
+        # Tamaño máximo, en bits, del resultado exacto de una potencia entre
+        # números: SymPy la calcula al construirla (2^2^2^2^2 tiene 65 537 bits)
+        self.max_power_bits = max_power_bits
+        # Nombres conocidos de mayor a menor longitud, para separar "xsin" en x·sin
+        self._known = sorted(set(self.names) | set(self.functions), key=len, reverse=True)
+        self._parse_cached = lru_cache(maxsize=maxsize)(self._parse)
+
+    def parse(self, text):
+        """
+        Analiza una expresión y devuelve su árbol de SymPy.
+
+        Raises:
+            ParseError: Si la entrada es demasiado larga, demasiado anidada o
+            no pertenece a la gramática
+        """
+        if not isinstance(text, str):
+            raise ParseError("La expresión debe ser una cadena de texto")
+        text = text.strip()
+        if len(text) > self.max_length:
+            raise ParseError(f"La expresión excede el máximo de {self.max_length} caracteres")
+        return self._parse_cached(text)
+
+    def stats(self):
+        """Devuelve los contadores de la caché de expresiones"""
+        info = self._parse_cached.cache_info()
+        total = info.hits + info.misses
+        return {
+            "entradas": info.currsize,
+            "capacidad": info.maxsize,
+            "aciertos": info.hits,
+            "fallos": info.misses,
+            "tasa_aciertos": info.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        self._parse_cached.cache_clear()
+
+    def _parse(self, text):
+        if not text:
+            raise ParseError("La expresión está vacía")
+        state = _State(self._tokenize(text))
+        result = self._expression(state, 0)
+        if state.peek() is not None:
+            raise state.error("Símbolo inesperado")
+        return result
+
+    # --- Léxico ---
+
+    def _tokenize(self, text):
+        """Devuelve una lista de (tipo, valor, posición)"""
+        tokens = []
+        pos = 0
+        end = len(text.rstrip())
+        while pos < end:
+            match = _TOKEN.match(text, pos)
+            if match is None or match.end() == pos:
+                start = pos + len(text[pos:]) - len(text[pos:].lstrip())
+                raise ParseError(f"Carácter no válido '{text[start]}' en la posición {start + 1}")
+            kind = match.lastgroup
+            value = match.group(kind)
+            start = match.start(kind)
+            if kind == "nombre":
+                for name in self._split_name(value, start):
+                    tokens.append(("nombre", name, start))
+            else:
+                tokens.append((kind, value, start))
+            pos = match.end()
+        return tokens
+
+    def _split_name(self, word, start):
+        """Separa una palabra en nombres conocidos (multiplicación implícita)"""
+        if word in self.names or word in self.functions:
+            return [word]
+        parts = []
+        i = 0
+        while i < len(word):
+            for name in self._known:
+                if word.startswith(name, i):
+                    parts.append(name)
+                    i += len(name)
+                    break
+            else:
+                raise ParseError(f"Nombre desconocido '{word}' en la posición {start + 1}")
+        return parts
+
+    # --- Sintaxis (de menor a mayor precedencia) ---
+
+    def _expression(self, state, depth):
+        """expresión := término (('+' | '-') término)*"""
+        result = self._term(state, depth)
+        while state.peek_value() in ("+", "-"):
+            op = state.next()[1]
+            right = self._term(state, depth)
+            result = result + right if op == "+" else result - right
+        return result
+
+    def _term(self, state, depth):
+        """término := unario (('*' | '/') unario | potencia)*"""
+        result = self._unary(state, depth)
+        while True:
+            token = state.peek()
+            if token is None:
+                return result
+            kind, value, _ = token
+            if value in ("*", "/"):
+                state.next()
+                right = self._unary(state, depth)
+                result = result * right if value == "*" else result / right
+            elif kind in ("numero", "nombre") or value == "(":
+                # Multiplicación implícita: 2x, x(x + 1), 3sin(x)
+                result = result * self._power(state, depth)
+            else:
+                return result
+
+    def _unary(self, state, depth):
+        """unario := ('+' | '-') unario | potencia"""
+        if depth > self.max_depth:
+            raise state.error(f"La expresión excede la profundidad máxima de {self.max_depth}")
+        if state.peek_value() in ("+", "-"):
+            op = state.next()[1]
+            operand = self._unary(state, depth + 1)
+            return operand if op == "+" else -operand
+        return self._power(state, depth)
+
+    def _power(self, state, depth):
+        """potencia := átomo (('^' | '**') unario)?   (asociativa por la derecha)"""
+        base = self._atom(state, depth)
+        if state.peek_value() in ("^", "**"):
+            token = state.next()
+            exponent = self._unary(state, depth + 1)
+            if _power_bits(base, exponent) > self.max_power_bits:
+                raise ParseError(f"Potencia numérica demasiado grande en la posición {token[2] + 1}")
+            return base ** exponent
+        return base
+
+    def _atom(self, state, depth):
+        """átomo := número | nombre | función '(' argumentos ')' | '(' expresión ')'"""
+        token = state.next()
+        if token is None:
+            raise state.error("La expresión termina de forma inesperada")
+        kind, value, pos = token
+        if kind == "numero":
+            return Integer(value) if value.isdigit() else Float(value)
+        if kind == "nombre":
+            if value in self.functions:
+                return self._call(state, value, pos, depth)
+            return self.names[value]
+        if value == "(":
+            result = self._expression(state, depth + 1)
+            state.expect(")")
+            return result
+        raise ParseError(f"Símbolo inesperado '{value}' en la posición {pos + 1}")
+
+    def _call(self, state, name, pos, depth):
+        function, arity = self.functions[name]
+        if state.peek_value() != "(":
+            raise ParseError(f"La función '{name}' requiere paréntesis (posición {pos + 1})")
+        state.next()
+        args = [self._expression(state, depth + 1)]
+        while state.peek_value() == ",":
+            state.next()
+            args.append(self._expression(state, depth + 1))
+        state.expect(")")
+        valid = arity if isinstance(arity, tuple) else (arity,)
+        if len(args) not in valid:
+            raise ParseError(f"La función '{name}' recibe {' o '.join(map(str, valid))} argumento(s)")
+        return function(*args)
+
+
+class _State:
+    """Posición actual dentro de la lista de tokens"""
+
+    __slots__ = ("tokens", "index")
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def peek_value(self):
+        token = self.peek()
+        return token[1] if token is not None and token[0] == "operador" else None
+
+    def next(self):
+        token = self.peek()
+        if token is not None:
+            self.index += 1
+        return token
+
+    def expect(self, value):
+        if self.peek_value() != value:
+            raise self.error(f"Se esperaba '{value}'")
+        self.next()
+
+    def error(self, message):
+        token = self.peek()
+        if token is None:
+            return ParseError(f"{message} al final de la expresión")
+        return ParseError(f"{message} en la posición {token[2] + 1}")
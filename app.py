@@ -1,16 +1,233 @@
 # app.py
-from flask import Flask, render_template, request, jsonify
-from calculadora_logica import IntegralCalculator
+from flask import (Flask, Response, abort, g, render_template, request, jsonify, send_file,
+                   stream_with_context, url_for)
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache_resultados import ResultCache
+from coalescencia import SingleFlight, default_lock_dir
+from pool_procesos import WorkerProcessPool, PoolSaturated, TaskTimeout, TaskCancelled, WorkerCrashed
+from trabajos import JobQueue, COMPLETADO, CANCELADO
+from perfilador import new_id
+import tareas
+import hmac
+import json
+import math
 import os
+import threading
+import time
 
 app = Flask(__name__)
-# Instanciamos tu clase de lógica una sola vez
-calculadora = IntegralCalculator()
+
+# Último estado de memoria informado por cada proceso del pool, por PID
+memoria_pool = {}
+
+def recibir_informe(informe):
+    """Incorpora las métricas y el estado de memoria que envía un proceso del pool con cada resultado."""
+    tareas.metricas.merge(informe['metricas'])
+    memoria_pool[informe['pid']] = informe['memoria']
+
+def memoria_procesos_pool():
+    """Estado de memoria de los procesos del pool que siguen vivos."""
+    for pid in list(memoria_pool):
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            memoria_pool.pop(pid, None)
+    return {str(pid): datos for pid, datos in memoria_pool.items()}
+
+# Pool de procesos aislados para SymPy (CALCULADORA_PROCESOS=0 lo desactiva
+# y el cálculo se hace dentro del propio proceso web)
+num_procesos = int(os.environ.get('CALCULADORA_PROCESOS', 2))
+pool = WorkerProcessPool(
+    processes=num_procesos,
+    task_timeout=float(os.environ.get('CALCULADORA_TIEMPO_TAREA', 30)),
+    memory_limit_mb=int(os.environ.get('CALCULADORA_MEMORIA_MB', 1024)),
+    max_queue=int(os.environ.get('CALCULADORA_COLA_MAXIMA', 8)),
+    initializer=tareas.calentar,
+    # matplotlib ya no se importa con tareas: se precarga en el servidor de fork
+    preload=('tareas', 'matplotlib.figure', 'matplotlib.backends.backend_agg'),
+    collect=tareas.recoger_informe,
+    on_collect=recibir_informe,
+) if num_procesos > 0 else None
+
+# Número máximo de integrales aceptadas en una petición por lotes
+lote_maximo = int(os.environ.get('CALCULADORA_LOTE_MAXIMO', 10000))
+
+# Número máximo de puntos (límites × parámetros) aceptados en un barrido
+barrido_maximo = int(os.environ.get('CALCULADORA_BARRIDO_MAXIMO', 100000))
+
+# Precisión arbitraria ("precision" en /calcular): dígitos máximos por petición
+# y cálculos simultáneos por proceso web (cada uno puede ocupar un proceso del
+# pool hasta CALCULADORA_PRECISION_TIEMPO segundos)
+precision_maxima = int(os.environ.get('CALCULADORA_PRECISION_MAXIMA', 1000))
+precision_tiempo = float(os.environ.get('CALCULADORA_PRECISION_TIEMPO', 10))
+precision_simultaneos = threading.BoundedSemaphore(int(os.environ.get('CALCULADORA_PRECISION_SIMULTANEOS', 1)))
+
+# Gráficas servidas desde memoria en el modo 'memoria' (LRU por clave de contenido)
+graficas_memoria = ResultCache(
+    maxsize=int(os.environ.get('CALCULADORA_GRAFICAS_MEMORIA', 256)),
+    ttl=float(os.environ.get('CALCULADORA_GRAFICAS_TTL', 3600)),
+)
+TIPOS_GRAFICA = {'png': 'image/png', 'svg': 'image/svg+xml'}
+
+# Cola de trabajos para las peticiones asíncronas ("asincrono": true). Los
+# hilos solo esperan al pool, así que basta con uno por lugar del pool. El
+# estado de los trabajos se comparte entre los workers de gunicorn en un
+# directorio privado, para que /resultado/<id> funcione en cualquiera de
+# ellos (CALCULADORA_TRABAJOS_COMPARTIDOS=0 los deja locales a cada worker).
+trabajos = JobQueue(
+    workers=pool.processes + pool.max_queue if pool is not None
+    else int(os.environ.get('CALCULADORA_TRABAJOS_HILOS', 2)),
+    ttl=float(os.environ.get('CALCULADORA_TRABAJOS_TTL', 300)),
+    max_jobs=int(os.environ.get('CALCULADORA_TRABAJOS_MAXIMO', 1000)),
+    store_dir=(os.environ.get('CALCULADORA_TRABAJOS_DIR') or default_lock_dir('calculadora_trabajos'))
+    if os.environ.get('CALCULADORA_TRABAJOS_COMPARTIDOS', '1') != '0' else None,
+)
+# Peticiones idénticas simultáneas comparten un único cálculo en el pool (si
+# quien lo inició lo cancela, otro de los que esperaban lo repite)
+coalescedor = SingleFlight(retry_on=(TaskCancelled,))
+
+# Segundos que /calcular espera un trabajo antes de responder con su identificador;
+# los aciertos de caché y los cálculos rápidos se responden en la misma petición
+espera_inline = float(os.environ.get('CALCULADORA_ESPERA_INLINE', 0.25))
+
+# Perfilado opcional (CALCULADORA_PERFILADO=1): los cálculos que superan
+# CALCULADORA_PERFILADO_UMBRAL segundos se guardan con su perfil por muestreo,
+# y la cabecera "X-Perfilar: 1" fuerza un perfil con cProfile de la petición
+perfilado = os.environ.get('CALCULADORA_PERFILADO', '0') == '1'
+# Token de las rutas /admin, en la cabecera X-Admin-Token. Sin token no hay
+# rutas /admin ni perfiles a pedido: detrás de un proxy inverso todas las
+# peticiones parecen locales, así que la dirección no sirve para autorizar
+token_admin = os.environ.get('CALCULADORA_ADMIN_TOKEN') or None
 
 # Crear la carpeta de imágenes si no existe
 img_dir = os.path.join(app.root_path, 'static', 'img')
 os.makedirs(img_dir, exist_ok=True)
 
+
+def ejecutar(fn, *args, cancel=None):
+    """Ejecuta una tarea de cálculo en el pool, o en este proceso si está desactivado."""
+    if pool is None:
+        return fn(*args)
+    return pool.run(fn, *args, cancel=cancel)
+
+
+def ejecutar_calculo(argumentos, cancel=None, perfil_id=None):
+    """Ejecuta tareas.calcular, perfilado si el perfilado está activo."""
+    if perfilado:
+        return ejecutar(tareas.calcular_perfilado, perfil_id, *argumentos, cancel=cancel)
+    return ejecutar(tareas.calcular, *argumentos, cancel=cancel)
+
+
+def calcular_coalescido(argumentos, cancel=None, perfil_id=None):
+    """
+    Ejecuta el cálculo compartiéndolo con las peticiones idénticas en curso
+    (salvo que se pida su perfil: entonces se calcula por separado).
+    """
+    if perfil_id is not None:
+        return ejecutar_calculo(argumentos, cancel, perfil_id)
+    # Sin analizar la entrada aquí: eso solo ocurre dentro del pool
+    clave = tareas.clave_peticion(*argumentos)
+    return coalescedor.do(clave, lambda: ejecutar_calculo(argumentos, cancel), cancel)[0]
+
+
+def calcular_multiple_coalescido(funcion_str, limites, cancel=None):
+    """Como calcular_coalescido, para una integral múltiple."""
+    clave = tareas.clave_peticion('multiple', funcion_str, limites)
+    return coalescedor.do(
+        clave, lambda: ejecutar(tareas.calcular_multiple, funcion_str, limites, cancel=cancel), cancel
+    )[0]
+
+
+def leer_limites(valor):
+    """
+    Valida el campo "limites" de una integral múltiple: una lista de
+    [variable, inferior, superior], de la integral más interna a la más
+    externa. Devuelve la lista con cadenas, o None si no es válida.
+    """
+    if not isinstance(valor, list) or not valor:
+        return None
+    limites = []
+    for limite in valor:
+        if not isinstance(limite, (list, tuple)) or len(limite) != 3 \
+                or not all(isinstance(parte, (str, int, float)) and str(parte).strip() for parte in limite):
+            return None
+        limites.append([str(parte) for parte in limite])
+    return limites
+
+
+def autorizado_admin():
+    """
+    Las rutas /admin requieren el token configurado en la cabecera X-Admin-Token
+    (nunca en la URL, que queda en los registros de accesos y de los proxies).
+    """
+    if token_admin is None:
+        return False
+    recibido = request.headers.get('X-Admin-Token') or ''
+    return hmac.compare_digest(recibido.encode(), token_admin.encode())
+
+
+def respuesta_error(e):
+    """Cuerpo, código HTTP y cabeceras de un error de cálculo."""
+    if isinstance(e, (PoolSaturated, TaskTimeout, TaskCancelled, WorkerCrashed)):
+        # Los errores del cálculo en sí ya los cuenta el proceso que calculó
+        tareas.metricas.inc('calculadora_errores_total', origen='servidor', tipo=type(e).__name__)
+    if isinstance(e, TaskTimeout):
+        tareas.metricas.inc('calculadora_tiempos_agotados_total', origen='pool')
+    if isinstance(e, PoolSaturated):
+        return {'error': str(e), 'exito': False}, 503, {'Retry-After': str(e.retry_after)}
+    if isinstance(e, TaskTimeout):
+        return {'error': str(e), 'exito': False}, 504, {}
+    return {'error': str(e), 'exito': False}, 500, {}
+
+
+def publicar_grafica(resultado, funcion_str, limite_inferior_str, limite_superior_str, acumulada=False):
+    """En modo 'memoria', guarda los bytes de la gráfica y los reemplaza por su URL."""
+    if resultado.get('grafica_bytes') is None:
+        return resultado
+    resultado = dict(resultado)
+    nombre = f"{resultado.pop('grafica_clave')}.{resultado.pop('grafica_formato')}"
+    graficas_memoria.set(nombre, {'contenido': resultado.pop('grafica_bytes')})
+    # Los parámetros permiten regenerarla si otro proceso atiende la descarga
+    resultado['grafica_url'] = url_for(
+        'grafica', nombre=nombre, funcion=funcion_str,
+        limite_inferior=limite_inferior_str, limite_superior=limite_superior_str,
+        **({'acumulada': 1} if acumulada else {}),
+    )
+    return resultado
+
+
+def respuesta_trabajo(trabajo):
+    """Cuerpo, código HTTP y cabeceras que describen un trabajo asíncrono."""
+    base = {'trabajo': trabajo.id, 'estado': trabajo.estado}
+    if trabajo.estado == COMPLETADO:
+        datos = trabajo.datos
+        resultado = publicar_grafica(trabajo.resultado, datos['funcion'], datos.get('limite_inferior'),
+                                     datos.get('limite_superior'), datos.get('acumulada', False))
+        return dict(resultado, exito=True, **base), 200, {}
+    if trabajo.estado == CANCELADO:
+        return dict(base, error=trabajo.error, exito=False), 410, {}
+    if trabajo.finished:
+        cuerpo, codigo, cabeceras = respuesta_error(trabajo.error)
+        return dict(cuerpo, **base), codigo, cabeceras
+    return dict(base, exito=True,
+                resultado_url=url_for('resultado', trabajo_id=trabajo.id),
+                eventos_url=url_for('eventos_resultado', trabajo_id=trabajo.id)), \
+        202, {'Location': url_for('resultado', trabajo_id=trabajo.id)}
+
+@app.before_request
+def iniciar_cronometro():
+    g.inicio_peticion = time.perf_counter()
+
+@app.after_request
+def registrar_peticion(respuesta):
+    """Duración y código de cada petición, por ruta (la plantilla, no la URL concreta)."""
+    inicio = g.pop('inicio_peticion', None)
+    if inicio is not None and tareas.metricas.enabled:
+        ruta = request.url_rule.rule if request.url_rule is not None else 'otra'
+        tareas.metricas.observe('calculadora_peticion_segundos', time.perf_counter() - inicio, ruta=ruta)
+        tareas.metricas.inc('calculadora_peticiones_total', ruta=ruta, codigo=respuesta.status_code)
+    return respuesta
+
 # --- Rutas de la aplicación ---
 
 @app.route('/')
@@ -23,40 +240,372 @@ def calcular():
     """
     Endpoint de la API para calcular la integral.
     Recibe los datos del formulario y devuelve el resultado.
+
+    Con "limites": [["x", "0", "1"], ["y", "0", "x"], ...] en lugar de
+    limite_inferior y limite_superior, calcula la integral iterada de una
+    función de x, y, z (de la variable más interna a la más externa; los
+    límites pueden depender de las variables más externas). Su respuesta
+    no incluye gráfica.
+
+    Con "acumulada": true la gráfica (o sus datos, en "y_acumulada") incluye
+    también la integral acumulada F(x) = ∫_a^x f.
+
+    Con "precision": N (dígitos, hasta CALCULADORA_PRECISION_MAXIMA) el
+    resultado incluye "precision" con el valor a N dígitos. Se atienden pocos
+    a la vez (CALCULADORA_PRECISION_SIMULTANEOS); el resto recibe 503.
     """
     try:
         data = request.get_json()
-        
+
         # Extracción de datos del request
         funcion_str = data.get('funcion')
         limite_inferior_str = data.get('limite_inferior')
         limite_superior_str = data.get('limite_superior')
-        
-        # Verificar que los datos no estén vacíos
-        if not all([funcion_str, limite_inferior_str, limite_superior_str]):
-            return jsonify({'error': 'Todos los campos son requeridos.', 'exito': False}), 400
 
-        # Usar tu lógica de cálculo
-        result_def, result_indef, func, a, b = calculadora.calculate_definite_integral(
-            funcion_str, limite_inferior_str, limite_superior_str
-        )
-        
-        # Formatear el resultado para el frontend
-        resultado_formateado = calculadora.format_result_pretty(result_def, result_indef, a, b, funcion_str)
+        modo_grafica = data.get('modo_grafica', 'archivo')
+        formato = data.get('formato_grafica', 'png')
+        codificacion = data.get('codificacion_datos', 'base64')
+        asincrono = bool(data.get('asincrono', False))
+        acumulada = bool(data.get('acumulada', False))
+        precision = data.get('precision')
+
+        perfil_id = None
+        cabeceras = {}
+        if 'limites' in data:
+            # Integral múltiple en x, y, z: "limites" reemplaza a los dos límites
+            limites = leer_limites(data['limites'])
+            if not funcion_str or limites is None:
+                return jsonify({'error': 'Se requieren la función y una lista "limites" de '
+                                         '[variable, inferior, superior].', 'exito': False}), 400
+
+            def calculo(cancel=None):
+                return calcular_multiple_coalescido(funcion_str, limites, cancel)
+            datos_trabajo = {'funcion': funcion_str, 'limites': limites}
+        else:
+            # Verificar que los datos no estén vacíos
+            if not all([funcion_str, limite_inferior_str, limite_superior_str]):
+                return jsonify({'error': 'Todos los campos son requeridos.', 'exito': False}), 400
+            if modo_grafica not in tareas.MODOS_GRAFICA or formato not in TIPOS_GRAFICA \
+                    or codificacion not in ('base64', 'lista'):
+                return jsonify({'error': 'Opciones de gráfica no válidas.', 'exito': False}), 400
+            if precision is not None and (isinstance(precision, bool) or not isinstance(precision, int)
+                                          or not 1 <= precision <= precision_maxima):
+                return jsonify({'error': f'La precisión debe ser un número de dígitos entre 1 y {precision_maxima}.',
+                                'exito': False}), 400
 
-        # Generar la gráfica y obtener la ruta
-        grafica_url = calculadora.generate_integral_plot(func, a, b, img_dir)
+            # Parsear, integrar, formatear y graficar (aislado en el pool)
+            argumentos = (funcion_str, limite_inferior_str, limite_superior_str, img_dir,
+                          modo_grafica, formato, codificacion, acumulada, precision)
+
+            # Perfil de esta petición a pedido (si el perfilado está activo)
+            if perfilado and request.headers.get('X-Perfilar') == '1' and autorizado_admin():
+                perfil_id = new_id()
+                cabeceras['X-Perfil'] = perfil_id
+
+            def calculo(cancel=None):
+                if not precision:
+                    return calcular_coalescido(argumentos, cancel, perfil_id)
+                # Los cálculos de precisión arbitraria no deben acaparar el pool
+                if not precision_simultaneos.acquire(blocking=False):
+                    raise PoolSaturated(retry_after=math.ceil(precision_tiempo))
+                try:
+                    return calcular_coalescido(argumentos, cancel, perfil_id)
+                finally:
+                    precision_simultaneos.release()
+            datos_trabajo = {'funcion': funcion_str, 'limite_inferior': limite_inferior_str,
+                             'limite_superior': limite_superior_str, 'acumulada': acumulada}
+
+        if asincrono:
+            # Aceptar el trabajo y responder enseguida con su identificador
+            trabajo = trabajos.submit(calculo, datos=datos_trabajo)
+            trabajos.wait(trabajo, espera_inline)
+            cuerpo, codigo, cabeceras_trabajo = respuesta_trabajo(trabajo)
+            return jsonify(cuerpo), codigo, dict(cabeceras_trabajo, **cabeceras)
+
+        resultado = calculo()
+        resultado = publicar_grafica(resultado, funcion_str, limite_inferior_str, limite_superior_str, acumulada)
 
         # Enviar el resultado y la URL de la gráfica en el JSON
-        return jsonify({
-            'resultado_texto': resultado_formateado,
-            'grafica_url': grafica_url,
-            'exito': True,
-        })
+        return jsonify(dict(resultado, exito=True)), 200, cabeceras
 
     except Exception as e:
         # Manejar errores de forma elegante
-        return jsonify({'error': str(e), 'exito': False}), 500
+        cuerpo, codigo, cabeceras = respuesta_error(e)
+        return jsonify(cuerpo), codigo, cabeceras
+
+@app.route('/resultado/<trabajo_id>', methods=['GET', 'DELETE'])
+def resultado(trabajo_id):
+    """
+    Consulta (GET) o cancela (DELETE) un trabajo asíncrono.
+
+    Responde 202 mientras el trabajo no termina y, al terminar, lo mismo que
+    habría respondido /calcular (410 si fue cancelado).
+    """
+    if request.method == 'DELETE':
+        trabajo = trabajos.cancel(trabajo_id)
+    else:
+        trabajo = trabajos.get(trabajo_id)
+    if trabajo is None:
+        return jsonify({'error': 'El trabajo no existe o ya expiró.', 'exito': False}), 404
+    if request.method == 'DELETE':
+        return jsonify({'trabajo': trabajo.id, 'estado': trabajo.estado, 'exito': True})
+    cuerpo, codigo, cabeceras = respuesta_trabajo(trabajo)
+    return jsonify(cuerpo), codigo, cabeceras
+
+@app.route('/resultado/<trabajo_id>/eventos')
+def eventos_resultado(trabajo_id):
+    """
+    Server-Sent Events de un trabajo: un evento "estado" por cada cambio y un
+    evento "resultado" final con el mismo cuerpo que /resultado/<id>.
+    """
+    trabajo = trabajos.get(trabajo_id)
+    if trabajo is None:
+        return jsonify({'error': 'El trabajo no existe o ya expiró.', 'exito': False}), 404
+
+    def generar():
+        version = None
+        while True:
+            if trabajo.finished:
+                cuerpo, codigo, _ = respuesta_trabajo(trabajo)
+                yield f"event: resultado\ndata: {json.dumps(dict(cuerpo, codigo=codigo), ensure_ascii=False)}\n\n"
+                return
+            if trabajo.version != version:
+                version = trabajo.version
+                yield f"event: estado\ndata: {json.dumps({'estado': trabajo.estado})}\n\n"
+            elif not trabajos.wait(trabajo, 15, version):
+                # Comentario para mantener viva la conexión a través de proxies
+                yield ": sigue\n\n"
+
+    return Response(stream_with_context(generar()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/grafica/<nombre>')
+def grafica(nombre):
+    """Sirve una gráfica generada en modo 'memoria'."""
+    clave, _, formato = nombre.partition('.')
+    if formato not in TIPOS_GRAFICA:
+        abort(404)
+
+    entrada = graficas_memoria.get(nombre)
+    if entrada is None:
+        # No está en la memoria de este proceso: regenerarla a partir de la consulta
+        funcion_str = request.args.get('funcion')
+        limite_inferior_str = request.args.get('limite_inferior')
+        limite_superior_str = request.args.get('limite_superior')
+        acumulada = request.args.get('acumulada') == '1'
+        if not all([funcion_str, limite_inferior_str, limite_superior_str]):
+            abort(404)
+        try:
+            clave_real, contenido = ejecutar(
+                tareas.renderizar_grafica, funcion_str, limite_inferior_str, limite_superior_str, formato,
+                acumulada,
+            )
+        except PoolSaturated as e:
+            return 'Servidor ocupado', 503, {'Retry-After': str(e.retry_after)}
+        except Exception:
+            abort(404)
+        if clave_real != clave:
+            abort(404)
+        entrada = {'contenido': contenido}
+        graficas_memoria.set(nombre, entrada)
+
+    # La clave depende del contenido, así que la respuesta nunca cambia
+    return Response(entrada['contenido'], mimetype=TIPOS_GRAFICA[formato],
+                    headers={'Cache-Control': 'public, max-age=86400, immutable'})
+
+@app.route('/calcular/lote', methods=['POST'])
+def calcular_lote():
+    """
+    Endpoint para calcular muchas integrales en una sola petición.
+
+    Recibe {"integrales": [{"funcion", "limite_inferior", "limite_superior"}, ...],
+    "graficar": false} y responde en NDJSON, una línea por integral conforme
+    se van terminando (cada línea incluye su "indice" en la petición). Una
+    integral con "limites" en lugar de los dos límites es múltiple (ver /calcular).
+    """
+    data = request.get_json(silent=True) or {}
+    integrales = data.get('integrales')
+    graficar = bool(data.get('graficar', False))
+
+    if not isinstance(integrales, list) or not integrales:
+        return jsonify({'error': 'Se requiere una lista "integrales" no vacía.', 'exito': False}), 400
+    if len(integrales) > lote_maximo:
+        return jsonify({'error': f'El lote excede el máximo de {lote_maximo} integrales.', 'exito': False}), 413
+
+    # Agrupar por función para que cada antiderivada se calcule una sola vez
+    # (las integrales múltiples van en grupos aparte)
+    grupos = {}
+    invalidas = []
+    for indice, item in enumerate(integrales):
+        item = item if isinstance(item, dict) else {}
+        funcion = str(item.get('funcion') or '').strip()
+        if 'limites' in item:
+            limites = leer_limites(item['limites'])
+            if limites is None:
+                invalidas.append({'indice': indice, 'funcion': funcion, 'exito': False,
+                                  'error': 'Se requiere una lista "limites" de [variable, inferior, superior].'})
+            else:
+                grupos.setdefault(('multiple', funcion), []).append((indice, funcion, limites))
+            continue
+        grupos.setdefault(funcion, []).append(
+            (indice, funcion, str(item.get('limite_inferior') or ''), str(item.get('limite_superior') or ''))
+        )
+
+    def tarea(clave, grupo):
+        if isinstance(clave, tuple):
+            return tareas.calcular_lote_multiple, (grupo,)
+        return tareas.calcular_lote, (grupo, graficar, img_dir)
+
+    def generar():
+        for resultado in invalidas:
+            yield json.dumps(resultado, ensure_ascii=False) + '\n'
+        if pool is None:
+            for clave, grupo in grupos.items():
+                fn, args = tarea(clave, grupo)
+                for resultado in fn(*args):
+                    yield json.dumps(resultado, ensure_ascii=False) + '\n'
+            return
+
+        # Repartir las funciones distintas entre los procesos del pool
+        with ThreadPoolExecutor(max_workers=pool.processes) as ejecutor:
+            futuros = {
+                ejecutor.submit(_calcular_grupo_en_pool, *tarea(clave, grupo)): grupo
+                for clave, grupo in grupos.items()
+            }
+            for futuro in as_completed(futuros):
+                try:
+                    resultados = futuro.result()
+                except Exception as e:
+                    resultados = [
+                        {'indice': entrada[0], 'funcion': entrada[1], 'error': str(e), 'exito': False,
+                         **({'limites': entrada[2]} if len(entrada) == 3 else
+                            {'limite_inferior': entrada[2], 'limite_superior': entrada[3]})}
+                        for entrada in futuros[futuro]
+                    ]
+                for resultado in resultados:
+                    yield json.dumps(resultado, ensure_ascii=False) + '\n'
+
+    return Response(stream_with_context(generar()), mimetype='application/x-ndjson')
+
+
+@app.route('/calcular/barrido', methods=['POST'])
+def calcular_barrido():
+    """
+    Endpoint para integrar una función paramétrica sobre muchos puntos.
+
+    Recibe {"funcion": "exp(-k x) sin(x)", "limite_inferior": "0",
+    "limite_superior": [1, 2, ...], "parametros": {"k": [0.5, 1, ...]},
+    "codificacion": "base64"}: cada límite y cada parámetro es un valor o una
+    lista, y las listas tienen la misma longitud. La antiderivada se calcula
+    una sola vez y se evalúa en todos los puntos; "resultado" y
+    "error_estimado" llegan como float64 en base64 (o listas JSON con
+    "codificacion": "lista").
+    """
+    data = request.get_json(silent=True) or {}
+    funcion_str = data.get('funcion')
+    limite_inferior = data.get('limite_inferior')
+    limite_superior = data.get('limite_superior')
+    parametros = data.get('parametros') or {}
+    codificacion = data.get('codificacion', 'base64')
+
+    if not funcion_str or limite_inferior in (None, '') or limite_superior in (None, ''):
+        return jsonify({'error': 'Todos los campos son requeridos.', 'exito': False}), 400
+    if not isinstance(parametros, dict) or codificacion not in ('base64', 'lista'):
+        return jsonify({'error': 'Parámetros u opciones de codificación no válidos.', 'exito': False}), 400
+    tamanos = [len(valor) for valor in (limite_inferior, limite_superior, *parametros.values())
+               if isinstance(valor, list)]
+    if max(tamanos, default=1) > barrido_maximo:
+        return jsonify({'error': f'El barrido excede el máximo de {barrido_maximo} puntos.', 'exito': False}), 413
+
+    try:
+        resultado = ejecutar(tareas.calcular_barrido, funcion_str, limite_inferior, limite_superior,
+                             parametros, codificacion)
+        return jsonify(dict(resultado, exito=True))
+    except Exception as e:
+        cuerpo, codigo, cabeceras = respuesta_error(e)
+        return jsonify(cuerpo), codigo, cabeceras
+
+
+def _calcular_grupo_en_pool(fn, args, intentos=3):
+    """Envía un grupo al pool, reintentando brevemente si está saturado."""
+    for intento in range(intentos):
+        try:
+            return pool.run(fn, *args)
+        except PoolSaturated as e:
+            if intento == intentos - 1:
+                raise
+            time.sleep(e.retry_after)
+
+@app.route('/estadisticas')
+def estadisticas():
+    """Devuelve los contadores internos del servidor."""
+    if pool is None:
+        return jsonify(dict(tareas.estadisticas(img_dir), trabajos=trabajos.stats(),
+                            coalescencia_peticiones=coalescedor.stats()))
+    return jsonify({'pool_procesos': pool.stats(), 'trabajos': trabajos.stats(),
+                    'coalescencia_peticiones': coalescedor.stats(),
+                    'memoria': {'web': tareas.obtener_gobernador().stats(),
+                                'pool': memoria_procesos_pool()}})
+
+@app.route('/metrics')
+def metrics():
+    """Métricas de este proceso en el formato de texto de Prometheus."""
+    if not tareas.metricas.enabled:
+        abort(404)
+    medidores = []
+    if pool is not None:
+        medidores.append(('calculadora_pool_ociosos', 'Procesos del pool sin tarea', pool.stats()['ociosos']))
+    medidores.append(('calculadora_trabajos_activos', 'Trabajos asíncronos sin terminar',
+                      trabajos.stats()['activos']))
+    memoria = [tareas.obtener_gobernador().stats()] + list(memoria_procesos_pool().values())
+    medidores.append(('calculadora_memoria_residente_mb', 'Memoria residente del proceso web y de su pool',
+                      sum(datos['rss_mb'] or 0 for datos in memoria)))
+    medidores.append(('calculadora_cache_sympy_entradas', 'Entradas en las cachés internas de SymPy',
+                      sum(datos['cache_sympy_entradas'] for datos in memoria)))
+    medidores.append(('calculadora_limpiezas_memoria', 'Limpiezas de las cachés de SymPy',
+                      sum(sum(datos['limpiezas'].values()) for datos in memoria)))
+    return Response(tareas.metricas.render(medidores), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/admin/perfiles')
+def perfiles():
+    """Lista los cálculos perfilados guardados, del más reciente al más antiguo."""
+    if not perfilado or token_admin is None:
+        abort(404)
+    if not autorizado_admin():
+        abort(403)
+    entradas = [
+        {clave: entrada.get(clave) for clave in ('id', 'creado', 'datos', 'estado', 'duracion_s', 'perfil', 'error')}
+        for entrada in tareas.obtener_registro_lentos().list()
+    ]
+    for entrada in entradas:
+        entrada['url'] = url_for('perfil', perfil_id=entrada['id'])
+        entrada['descarga_url'] = url_for('descargar_perfil', perfil_id=entrada['id'])
+    return jsonify({'perfiles': entradas})
+
+@app.route('/admin/perfiles/<perfil_id>')
+def perfil(perfil_id):
+    """Datos completos de un cálculo perfilado: entrada, etapas y resumen del perfil."""
+    if not perfilado or token_admin is None:
+        abort(404)
+    if not autorizado_admin():
+        abort(403)
+    entrada = tareas.obtener_registro_lentos().get(perfil_id)
+    if entrada is None:
+        abort(404)
+    return jsonify(entrada)
+
+@app.route('/admin/perfiles/<perfil_id>/descargar')
+def descargar_perfil(perfil_id):
+    """Descarga el perfil: .prof de cProfile (pstats, snakeviz) o pilas plegadas (.txt, flame graph)."""
+    if not perfilado or token_admin is None:
+        abort(404)
+    if not autorizado_admin():
+        abort(403)
+    ruta = tareas.obtener_registro_lentos().profile_path(perfil_id)
+    if ruta is None:
+        abort(404)
+    return send_file(ruta, as_attachment=True, download_name=os.path.basename(ruta),
+                     mimetype='text/plain' if ruta.endswith('.txt') else 'application/octet-stream')
 
 if __name__ == '__main__':
-    app.run(debug=True)
\ No newline at end of file
+    app.run(debug=True)
@@ -0,0 +1 @@
+# benchmarks - Mediciones de rendimiento de la calculadora de integrales
@@ -0,0 +1,81 @@
+# analizador.py - Latencia y seguridad del analizador de expresiones contra sympify
+#
+# Uso: python -m benchmarks.analizador [repeticiones]
+import sys
+import time
+
+from sympy import sympify
+
+from analizador import FUNCIONES, NOMBRES, ExpressionParser
+from benchmarks.corpus import COMUNES
+
+# Diccionario que recibía sympify en la implementación anterior
+LOCALES = dict(NOMBRES, **{nombre: funcion for nombre, (funcion, _) in FUNCIONES.items()})
+
+# Entradas hostiles o malformadas
+HOSTILES = [
+    ("eval de Python", "__import__('os').getpid()"),
+    ("atributo interno", "x.__class__"),
+    ("anidamiento profundo", "(" * 150 + "x" + ")" * 150),
+    ("signos repetidos", "-" * 400 + "x"),
+    ("entrada enorme", "+".join(["x"] * 2000)),
+    ("potencia numérica", "2^2^2^2^2"),
+    ("potencia anidada", "(9^9999)^9999"),
+    ("nombre desconocido", "foo(x)"),
+    ("sintaxis inválida", "x +* 2"),
+]
+
+
+def legacy(texto):
+    """Implementación anterior: reemplazo de texto y sympify (usa eval)"""
+    return sympify(texto.strip().replace("^", "**"), locals=LOCALES)
+
+
+def por_llamada(fn, repeticiones):
+    """Tiempo medio por llamada, en microsegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def intentar(fn, texto):
+    """Devuelve (descripción del resultado, milisegundos)"""
+    inicio = time.perf_counter()
+    try:
+        resultado = fn(texto)
+        descripcion = f"acepta ({type(resultado).__name__})"
+    except RecursionError:
+        descripcion = "rechaza: RecursionError"
+    except Exception as e:
+        descripcion = f"rechaza: {type(e).__name__}"
+    return descripcion, (time.perf_counter() - inicio) * 1e3
+
+
+def main(repeticiones=200):
+    sin_cache = ExpressionParser(maxsize=0)
+    con_cache = ExpressionParser()
+
+    print(f"{'expresión':<22}{'sympify (µs)':>14}{'analizador (µs)':>17}{'memorizado (µs)':>17}")
+    textos = sorted({texto for entrada in COMUNES for texto in entrada}, key=len, reverse=True)
+    totales = [0.0, 0.0, 0.0]
+    for texto in textos:
+        con_cache.parse(texto)
+        tiempos = [
+            por_llamada(lambda: legacy(texto), repeticiones),
+            por_llamada(lambda: sin_cache.parse(texto), repeticiones),
+            por_llamada(lambda: con_cache.parse(texto), repeticiones),
+        ]
+        totales = [t + nuevo for t, nuevo in zip(totales, tiempos)]
+        print(f"{texto:<22}{tiempos[0]:>14.1f}{tiempos[1]:>17.1f}{tiempos[2]:>17.2f}")
+    print(f"{'total':<22}{totales[0]:>14.1f}{totales[1]:>17.1f}{totales[2]:>17.2f}")
+
+    print(f"\n{'entrada hostil':<22}{'sympify':>34}{'analizador':>34}")
+    for nombre, texto in HOSTILES:
+        antes, t_antes = intentar(legacy, texto)
+        despues, t_despues = intentar(sin_cache.parse, texto)
+        print(f"{nombre:<22}{antes:>24} {t_antes:>7.2f} ms{despues:>24} {t_despues:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
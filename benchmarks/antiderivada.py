@@ -0,0 +1,64 @@
+# antiderivada.py - Compara integrar dos veces contra derivar la definida de la antiderivada
+#
+# Uso: python -m benchmarks.antiderivada [repeticiones]
+import sys
+import time
+
+from sympy import integrate
+from sympy.core.cache import clear_cache
+
+from benchmarks.corpus import COMUNES
+from calculadora_logica import IntegralCalculator
+
+
+def legacy(calculator, func_str, lower_str, upper_str):
+    """Implementación anterior: dos llamadas independientes a integrate"""
+    func = calculator.parse_function(func_str)
+    a = calculator.parse_limit(lower_str)
+    b = calculator.parse_limit(upper_str)
+    result_def = integrate(func, (calculator.x, a, b)).evalf()
+    result_indef = integrate(func, calculator.x)
+    return result_def, result_indef
+
+
+def medir(fn, repeticiones):
+    """Devuelve el mejor tiempo (en segundos) y el último resultado"""
+    mejor = float("inf")
+    resultado = None
+    for _ in range(repeticiones):
+        # La caché interna de SymPy favorecería a la segunda implementación medida
+        clear_cache()
+        inicio = time.perf_counter()
+        resultado = fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor, resultado
+
+
+def main(repeticiones=3):
+    # Sin caché, para medir únicamente la integración
+    calculator = IntegralCalculator()
+    total_antes = total_despues = 0.0
+    discrepancias = 0
+
+    print(f"{'función':<22}{'límites':<16}{'antes (ms)':>12}{'después (ms)':>14}  ok")
+    for func_str, lower_str, upper_str in COMUNES:
+        t_antes, (def_antes, _) = medir(lambda: legacy(calculator, func_str, lower_str, upper_str), repeticiones)
+        t_despues, resultado = medir(
+            lambda: calculator.calculate_definite_integral(func_str, lower_str, upper_str), repeticiones
+        )
+        def_despues = resultado[0]
+        ok = abs(complex(def_antes) - complex(def_despues)) <= 1e-9 * max(1.0, abs(complex(def_antes))) \
+            if def_antes.is_finite else def_antes == def_despues
+        discrepancias += not ok
+        total_antes += t_antes
+        total_despues += t_despues
+        limites = f"[{lower_str}, {upper_str}]"
+        print(f"{func_str:<22}{limites:<16}{t_antes * 1e3:>12.1f}{t_despues * 1e3:>14.1f}  {'sí' if ok else 'NO'}")
+
+    print(f"\nTotal: {total_antes * 1e3:.1f} ms -> {total_despues * 1e3:.1f} ms "
+          f"({total_antes / total_despues:.2f}x), discrepancias: {discrepancias}")
+    return discrepancias
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main(int(sys.argv[1]) if len(sys.argv) > 1 else 3) else 0)
@@ -0,0 +1,78 @@
+# arranque.py - Tiempo de arranque y latencia de la primera petición en un proceso nuevo
+#
+# Uso: python -m benchmarks.arranque [repeticiones] [--json ruta]
+#
+# Cada medición corre en un intérprete nuevo (sin pool de procesos, para que
+# el cálculo ocurra en el proceso medido). "precalentado" ejecuta antes
+# tareas.precalentar, como hace el maestro de gunicorn antes del fork.
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+
+from benchmarks.informe import entorno, guardar
+
+_SONDA = r"""
+import json, sys, time
+inicio = time.perf_counter()
+import app
+importado = time.perf_counter()
+modulos = {m: m in sys.modules for m in ("sympy", "numpy", "matplotlib", "matplotlib.figure")}
+precalentado = None
+if PRECALENTAR:
+    import tareas
+    tareas.precalentar()
+    precalentado = time.perf_counter() - importado
+cliente = app.app.test_client()
+tiempos = []
+for funcion in ("x*sin(x)", "exp(-x)*cos(2x)"):
+    t = time.perf_counter()
+    r = cliente.post("/calcular", json={"funcion": funcion, "limite_inferior": "0", "limite_superior": "3",
+                                        "modo_grafica": "memoria"})
+    assert r.status_code == 200, r.get_data(as_text=True)
+    tiempos.append(time.perf_counter() - t)
+print(json.dumps({"importacion_s": importado - inicio, "modulos": modulos, "precalentar_s": precalentado,
+                  "primera_s": tiempos[0], "segunda_s": tiempos[1]}))
+"""
+
+
+def medir(precalentar):
+    entorno_proceso = dict(os.environ, CALCULADORA_PROCESOS="0", CALCULADORA_CACHE_DISCO="",
+                           CALCULADORA_COALESCENCIA="0")
+    salida = subprocess.run(
+        [sys.executable, "-c", _SONDA.replace("PRECALENTAR", str(precalentar))],
+        capture_output=True, text=True, env=entorno_proceso, check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    ).stdout
+    return json.loads(salida.strip().splitlines()[-1])
+
+
+def main(repeticiones=3, ruta=None):
+    informe = {"benchmark": "arranque", "entorno": entorno(), "repeticiones": repeticiones}
+    for precalentar in (False, True):
+        muestras = [medir(precalentar) for _ in range(repeticiones)]
+        nombre = "precalentado" if precalentar else "en_frio"
+        resumen = {clave: float(np.median([m[clave] for m in muestras]))
+                   for clave in ("importacion_s", "primera_s", "segunda_s")}
+        if precalentar:
+            resumen["precalentar_s"] = float(np.median([m["precalentar_s"] for m in muestras]))
+        resumen["modulos_al_importar"] = muestras[0]["modulos"]
+        informe[nombre] = resumen
+        print(f"{nombre:<14} importar app {resumen['importacion_s'] * 1e3:7.0f} ms"
+              + (f"   precalentar {resumen['precalentar_s'] * 1e3:7.0f} ms" if precalentar else "")
+              + f"   1.ª petición {resumen['primera_s'] * 1e3:7.0f} ms   2.ª {resumen['segunda_s'] * 1e3:6.0f} ms")
+        print(f"{'':<14} cargados al importar: {resumen['modulos_al_importar']}")
+    if ruta:
+        guardar(informe, ruta)
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Arranque y primera petición en un proceso nuevo")
+    parser.add_argument("repeticiones", nargs="?", type=int, default=3)
+    parser.add_argument("--json", dest="ruta", help="guardar el informe JSON en esta ruta ('-' = salida estándar)")
+    args = parser.parse_args()
+    main(args.repeticiones, args.ruta)
@@ -0,0 +1,263 @@
+# carga.py - Generador de carga local para /calcular
+#
+# Uso:
+#   python -m benchmarks.carga cliente  [opciones]            (cliente de pruebas de Flask, en proceso)
+#   python -m benchmarks.carga gunicorn [--workers N] [opciones]  (arranca un gunicorn local)
+#   python -m benchmarks.carga http --url http://host:puerto [opciones]
+#
+# Opciones comunes: --concurrencia, --peticiones o --duracion, --unicas, --asincrono,
+# --modo-grafica, --categorias y --json ruta
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from benchmarks.corpus import CATEGORIAS
+from benchmarks.informe import MemorySampler, entorno, guardar, resumen
+
+
+def cuerpos(categorias, unicas, asincrono, modo_grafica):
+    """Genera los cuerpos JSON de las peticiones, recorriendo el corpus en ciclo"""
+    entradas = [(categoria, entrada) for categoria in categorias for entrada in CATEGORIAS[categoria]]
+    for i, (categoria, (funcion, inferior, superior)) in enumerate(itertools.cycle(entradas)):
+        if unicas:
+            # Un factor distinto por petición evita los aciertos de caché y la coalescencia
+            funcion = f"({funcion})*(1 + {i + 1}/1000000000)"
+        yield categoria, {
+            "funcion": funcion, "limite_inferior": inferior, "limite_superior": superior,
+            "modo_grafica": modo_grafica, "asincrono": asincrono,
+        }
+
+
+class TestClientTransport:
+    """Peticiones con el cliente de pruebas de Flask, dentro de este proceso"""
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, metodo, ruta, cuerpo=None):
+        cliente = getattr(self._local, "cliente", None)
+        if cliente is None:
+            cliente = self._local.cliente = self.app.test_client()
+        respuesta = cliente.open(ruta, method=metodo, json=cuerpo)
+        return respuesta.status_code, respuesta.get_json(silent=True)
+
+
+class HttpTransport:
+    """Peticiones HTTP contra un servidor en marcha"""
+
+    def __init__(self, url, timeout=120):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, metodo, ruta, cuerpo=None):
+        datos = json.dumps(cuerpo).encode("utf-8") if cuerpo is not None else None
+        peticion = urllib.request.Request(self.url + ruta, data=datos, method=metodo,
+                                          headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(peticion, timeout=self.timeout) as respuesta:
+                return respuesta.status, json.loads(respuesta.read() or b"null")
+        except urllib.error.HTTPError as e:
+            try:
+                return e.code, json.loads(e.read() or b"null")
+            except ValueError:
+                return e.code, None
+
+
+def calcular(transporte, cuerpo, sondeo=0.05):
+    """Hace una petición a /calcular y, si es asíncrona, sondea hasta el resultado final"""
+    codigo, respuesta = transporte.request("POST", "/calcular", cuerpo)
+    while codigo == 202 and respuesta and respuesta.get("resultado_url"):
+        time.sleep(sondeo)
+        sondeo = min(sondeo * 2, 1.0)
+        codigo, respuesta = transporte.request("GET", respuesta["resultado_url"])
+    return codigo, respuesta
+
+
+def generar_carga(transporte, generador, concurrencia, peticiones=None, duracion=None):
+    """
+    Lanza las peticiones desde ``concurrencia`` hilos hasta completar
+    ``peticiones`` o agotar ``duracion`` segundos.
+
+    Returns:
+        tuple: (lista de (categoría, código, latencia), segundos transcurridos)
+    """
+    resultados = []
+    candado = threading.Lock()
+    contador = itertools.count()
+    fin = time.monotonic() + duracion if duracion else None
+
+    def trabajador():
+        while True:
+            with candado:
+                if (peticiones is not None and next(contador) >= peticiones) or \
+                        (fin is not None and time.monotonic() >= fin):
+                    return
+                categoria, cuerpo = next(generador)
+            inicio = time.perf_counter()
+            try:
+                codigo = calcular(transporte, cuerpo)[0]
+            except Exception:
+                codigo = "excepcion"
+            latencia = time.perf_counter() - inicio
+            with candado:
+                resultados.append((categoria, codigo, latencia))
+
+    inicio = time.perf_counter()
+    hilos = [threading.Thread(target=trabajador, daemon=True) for _ in range(concurrencia)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados, time.perf_counter() - inicio
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def arrancar_gunicorn(workers, puerto, espera=60, entorno=None):
+    """
+    Arranca gunicorn con la configuración de producción (gunicorn.conf.py) en
+    127.0.0.1:puerto y espera a que acepte conexiones.
+
+    Args:
+        entorno: Variables de entorno adicionales (CALCULADORA_PROCESOS, ...)
+    """
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "-w", str(workers),
+         "-b", f"127.0.0.1:{puerto}", "--log-level", "warning", "app:app"],
+        cwd=raiz, env=dict(os.environ, **(entorno or {})),
+    )
+    limite = time.monotonic() + espera
+    while time.monotonic() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError(f"gunicorn terminó con código {proceso.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", puerto), timeout=0.5).close()
+            return proceso
+        except OSError:
+            time.sleep(0.2)
+    proceso.terminate()
+    raise RuntimeError("gunicorn no empezó a aceptar conexiones a tiempo")
+
+
+def informe_carga(resultados, transcurrido, parametros, memoria_pico_mb):
+    codigos = {}
+    for _, codigo, _ in resultados:
+        codigos[str(codigo)] = codigos.get(str(codigo), 0) + 1
+    exitosas = [r for r in resultados if r[1] == 200]
+    por_categoria = {}
+    for categoria, _, latencia in exitosas:
+        por_categoria.setdefault(categoria, []).append(latencia)
+    return {
+        "benchmark": "carga",
+        "entorno": entorno(),
+        "parametros": parametros,
+        "peticiones": len(resultados),
+        "codigos": codigos,
+        "duracion_s": round(transcurrido, 3),
+        "rendimiento_rps": len(exitosas) / transcurrido if transcurrido else 0.0,
+        "latencia": resumen([latencia for _, codigo, latencia in resultados]),
+        "latencia_exitosas": resumen([latencia for _, _, latencia in exitosas]),
+        "categorias": {categoria: resumen(valores) for categoria, valores in por_categoria.items()},
+        "memoria_pico_mb": None if memoria_pico_mb is None else round(memoria_pico_mb, 1),
+    }
+
+
+def main(args):
+    categorias = args.categorias.split(",") if args.categorias else list(CATEGORIAS)
+    generador = cuerpos(categorias, args.unicas, args.asincrono, args.modo_grafica)
+    parametros = {
+        "modo": args.modo, "concurrencia": args.concurrencia, "peticiones": args.peticiones,
+        "duracion": args.duracion, "unicas": args.unicas, "asincrono": args.asincrono,
+        "modo_grafica": args.modo_grafica, "categorias": categorias,
+    }
+
+    servidor = None
+    pid = None
+    if args.modo == "cliente":
+        # El pool de procesos se configura al importar app
+        os.environ.setdefault("CALCULADORA_PROCESOS", str(args.procesos))
+        parametros["procesos"] = int(os.environ["CALCULADORA_PROCESOS"])
+        transporte = TestClientTransport()
+        pid = os.getpid()
+    elif args.modo == "gunicorn":
+        puerto = args.puerto or _puerto_libre()
+        servidor = arrancar_gunicorn(args.workers, puerto)
+        parametros["workers"] = args.workers
+        transporte = HttpTransport(f"http://127.0.0.1:{puerto}")
+        pid = servidor.pid
+    else:
+        transporte = HttpTransport(args.url)
+        pid = args.pid
+
+    try:
+        # Una petición de calentamiento por entrada del corpus, fuera de la medición
+        if args.calentar:
+            generar_carga(transporte, cuerpos(categorias, False, False, args.modo_grafica),
+                          args.concurrencia, peticiones=sum(len(CATEGORIAS[c]) for c in categorias))
+        if pid is not None:
+            with MemorySampler(pid) as memoria:
+                resultados, transcurrido = generar_carga(
+                    transporte, generador, args.concurrencia, args.peticiones, args.duracion)
+            pico = memoria.pico_mb
+        else:
+            resultados, transcurrido = generar_carga(
+                transporte, generador, args.concurrencia, args.peticiones, args.duracion)
+            pico = None
+    finally:
+        if servidor is not None:
+            servidor.terminate()
+            servidor.wait(timeout=30)
+
+    informe = informe_carga(resultados, transcurrido, parametros, pico)
+    latencia = informe["latencia"]
+    print(f"{informe['peticiones']} peticiones en {informe['duracion_s']:.1f} s "
+          f"con concurrencia {args.concurrencia}: {informe['rendimiento_rps']:.1f} resp/s")
+    print(f"Códigos: {informe['codigos']}")
+    if latencia["n"]:
+        print(f"Latencia (ms): p50 {latencia['p50_ms']:.1f}  p95 {latencia['p95_ms']:.1f}  "
+              f"p99 {latencia['p99_ms']:.1f}  máx {latencia['max_ms']:.1f}")
+    if pico is not None:
+        print(f"Memoria pico: {informe['memoria_pico_mb']} MB")
+    if args.ruta:
+        guardar(informe, args.ruta)
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generador de carga local para /calcular")
+    parser.add_argument("modo", choices=("cliente", "gunicorn", "http"))
+    parser.add_argument("--url", default="http://127.0.0.1:5000", help="servidor en el modo http")
+    parser.add_argument("--pid", type=int, help="PID del servidor para medir su memoria (modo http)")
+    parser.add_argument("--workers", type=int, default=2, help="workers de gunicorn")
+    parser.add_argument("--puerto", type=int, help="puerto de gunicorn (por defecto, uno libre)")
+    parser.add_argument("--procesos", type=int, default=2, help="procesos del pool en el modo cliente")
+    parser.add_argument("--concurrencia", type=int, default=8)
+    grupo = parser.add_mutually_exclusive_group()
+    grupo.add_argument("--peticiones", type=int, help="número total de peticiones (por defecto, 200)")
+    grupo.add_argument("--duracion", type=float, help="segundos de carga")
+    parser.add_argument("--unicas", action="store_true", help="evitar aciertos de caché y coalescencia")
+    parser.add_argument("--asincrono", action="store_true", help="usar trabajos asíncronos con sondeo")
+    parser.add_argument("--modo-grafica", default="datos", choices=("archivo", "memoria", "datos"))
+    parser.add_argument("--categorias", help=f"lista separada por comas de: {', '.join(CATEGORIAS)}")
+    parser.add_argument("--sin-calentar", dest="calentar", action="store_false",
+                        help="no hacer la ronda de calentamiento")
+    parser.add_argument("--json", dest="ruta", help="guardar el informe JSON en esta ruta ('-' = salida estándar)")
+    args = parser.parse_args()
+    if args.peticiones is None and args.duracion is None:
+        args.peticiones = 200
+    main(args)
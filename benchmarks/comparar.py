@@ -0,0 +1,60 @@
+# comparar.py - Compara dos informes JSON de los benchmarks (antes y después de un cambio)
+#
+# Uso: python -m benchmarks.comparar base.json nuevo.json [--umbral 10]
+import argparse
+import json
+
+
+def hojas(datos, prefijo=""):
+    """Aplana el informe en {ruta: valor} con los valores numéricos (sin el entorno)"""
+    if isinstance(datos, dict):
+        for clave, valor in datos.items():
+            if clave not in ("entorno", "parametros"):
+                yield from hojas(valor, f"{prefijo}.{clave}" if prefijo else str(clave))
+    elif isinstance(datos, (int, float)) and not isinstance(datos, bool):
+        yield prefijo, datos
+
+
+def comparar(base, nuevo, umbral=10.0):
+    """
+    Devuelve las filas (ruta, base, nuevo, cambio %) de las métricas comunes y
+    cuántas empeoraron más de ``umbral`` por ciento. Las latencias y la memoria
+    empeoran al subir; el rendimiento, al bajar.
+    """
+    valores_base = dict(hojas(base))
+    filas = []
+    regresiones = 0
+    for ruta, valor in hojas(nuevo):
+        anterior = valores_base.get(ruta)
+        if anterior is None:
+            continue
+        cambio = (valor - anterior) / anterior * 100 if anterior else 0.0
+        peor = -cambio if ruta.endswith("rendimiento_rps") else cambio
+        es_metrica = ruta.endswith(("_ms", "_mb", "_rps"))
+        regresion = es_metrica and peor > umbral
+        regresiones += regresion
+        filas.append((ruta, anterior, valor, cambio, regresion))
+    return filas, regresiones
+
+
+def main(ruta_base, ruta_nuevo, umbral=10.0):
+    with open(ruta_base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(ruta_nuevo, encoding="utf-8") as f:
+        nuevo = json.load(f)
+    print(f"base:  {base.get('entorno', {}).get('commit')}  nuevo: {nuevo.get('entorno', {}).get('commit')}")
+    filas, regresiones = comparar(base, nuevo, umbral)
+    for ruta, anterior, valor, cambio, regresion in filas:
+        marca = "  <-- peor" if regresion else ""
+        print(f"{ruta:<60}{anterior:>12.2f}{valor:>12.2f}{cambio:>+9.1f}%{marca}")
+    print(f"\n{regresiones} métrica(s) empeoraron más de {umbral:g}%")
+    return regresiones
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compara dos informes JSON de los benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=10.0, help="porcentaje a partir del que se marca una regresión")
+    args = parser.parse_args()
+    raise SystemExit(1 if main(args.base, args.nuevo, args.umbral) else 0)
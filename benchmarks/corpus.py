@@ -0,0 +1,66 @@
+# corpus.py - Conjunto de entradas representativas para los benchmarks
+
+# (función, límite inferior, límite superior)
+COMUNES = [
+    ("x^2", "0", "1"),
+    ("3*x^3 - 2*x + 1", "-1", "2"),
+    ("sin(x)", "0", "pi"),
+    ("cos(x)", "0", "pi/2"),
+    ("exp(x)", "0", "1"),
+    ("x*exp(x)", "0", "1"),
+    ("1/x", "1", "e"),
+    ("ln(x)", "1", "2"),
+    ("sqrt(x)", "0", "4"),
+    ("1/(x^2 + 1)", "-1", "1"),
+    ("x*sin(x)", "0", "pi"),
+    ("exp(-x)", "0", "oo"),
+    ("1/x^2", "1", "oo"),
+    ("exp(-x^2)", "-oo", "oo"),
+    ("tan(x)", "0", "1"),
+    ("1/(2 + sin(x))", "0", "2*pi"),
+]
+
+# Corpus por categoría para los benchmarks por método y las pruebas de carga
+CATEGORIAS = {
+    "polinomio": [
+        ("x^2", "0", "1"),
+        ("3*x^3 - 2*x + 1", "-1", "2"),
+        ("(x^2 + 1)^3", "0", "1"),
+        ("x^7 - 4x^5 + x", "-2", "2"),
+    ],
+    "trigonometrica": [
+        ("sin(x)", "0", "pi"),
+        ("x*sin(x)", "0", "pi"),
+        ("cos(3x + 1)", "0", "1"),
+        ("sin(x)^2", "0", "pi"),
+        ("tan(x)", "0", "1"),
+    ],
+    "exponencial": [
+        ("exp(x)", "0", "1"),
+        ("x*exp(x)", "0", "1"),
+        ("exp(x)*sin(2x)", "0", "pi"),
+        ("2^x", "0", "3"),
+    ],
+    "impropia": [
+        ("exp(-x)", "0", "oo"),
+        ("1/x^2", "1", "oo"),
+        ("x*exp(-x)", "0", "oo"),
+        ("1/(x^2 + 1)", "-oo", "oo"),
+        ("exp(-x^2)", "-oo", "oo"),
+    ],
+    "sin_forma_cerrada": [
+        ("exp(-x^2)*ln(1 + x^4)", "0", "2"),
+        ("sin(x)/ln(x + 2)", "0", "3"),
+        ("sin(sin(x))", "0", "1"),
+        ("x^x", "1", "2"),
+    ],
+    # Polos dentro del intervalo, valores complejos, oscilaciones y casos lentos
+    "patologica": [
+        ("1/x", "-1", "1"),
+        ("tan(x)", "0", "2"),
+        ("sqrt(x)", "-1", "1"),
+        ("1/(x - 1)^2", "0", "2"),
+        ("sin(1/x)", "0.01", "1"),
+        ("1/(2 + sin(x))", "0", "2*pi"),
+    ],
+}
@@ -0,0 +1,86 @@
+# escalado.py - Prueba de humo: el rendimiento de gunicorn crece con el número de workers
+#
+# Uso: python -m benchmarks.escalado [--workers 1,2,4] [--procesos 0] [--duracion 20] [--json ruta]
+#
+# Arranca gunicorn con gunicorn.conf.py para cada número de workers y lo
+# carga con entradas únicas (sin aciertos de caché) y concurrencia suficiente
+# para ocuparlos a todos. Con --procesos 0 (por defecto) cada worker calcula
+# por sí mismo; con --procesos N cada worker tiene su pool de N procesos.
+import argparse
+import os
+
+from benchmarks.carga import HttpTransport, _puerto_libre, arrancar_gunicorn, cuerpos, generar_carga
+from benchmarks.informe import MemorySampler, entorno, guardar, resumen
+
+# Integrales con cálculo simbólico corto y gráfica, limitadas por CPU
+CATEGORIAS = ["polinomio", "trigonometrica", "exponencial"]
+
+
+def medir(workers, procesos, duracion, concurrencia):
+    puerto = _puerto_libre()
+    servidor = arrancar_gunicorn(workers, puerto, entorno={
+        "CALCULADORA_PROCESOS": str(procesos), "CALCULADORA_COALESCENCIA": "0",
+        "CALCULADORA_GUNICORN_CLASE": "gthread" if procesos else "sync",
+    })
+    try:
+        transporte = HttpTransport(f"http://127.0.0.1:{puerto}")
+        # Calentar cada worker con unas peticiones fuera de la medición
+        generar_carga(transporte, cuerpos(CATEGORIAS, True, False, "memoria"), concurrencia,
+                      peticiones=4 * concurrencia)
+        with MemorySampler(servidor.pid) as memoria:
+            resultados, transcurrido = generar_carga(
+                transporte, cuerpos(CATEGORIAS, True, False, "memoria"), concurrencia, duracion=duracion)
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=60)
+    exitosas = [latencia for _, codigo, latencia in resultados if codigo == 200]
+    return {
+        "workers": workers,
+        "concurrencia": concurrencia,
+        "peticiones": len(resultados),
+        "exitosas": len(exitosas),
+        "rendimiento_rps": len(exitosas) / transcurrido,
+        "latencia": resumen(exitosas),
+        "memoria_pico_mb": round(memoria.pico_mb, 1),
+    }
+
+
+def main(lista_workers, procesos=0, duracion=20.0, ruta=None):
+    cpus = os.cpu_count() or 1
+    filas = []
+    for workers in lista_workers:
+        # Dos peticiones en vuelo por proceso que calcula mantienen a todos ocupados
+        concurrencia = 2 * workers * max(procesos, 1)
+        fila = medir(workers, procesos, duracion, concurrencia)
+        fila["aceleracion"] = fila["rendimiento_rps"] / filas[0]["rendimiento_rps"] if filas else 1.0
+        filas.append(fila)
+        print(f"workers {workers:>2}  concurrencia {concurrencia:>3}  {fila['rendimiento_rps']:7.1f} resp/s  "
+              f"x{fila['aceleracion']:.2f}  p50 {fila['latencia'].get('p50_ms', 0):7.1f} ms  "
+              f"p99 {fila['latencia'].get('p99_ms', 0):7.1f} ms  memoria {fila['memoria_pico_mb']} MB")
+    if max(lista_workers) * max(procesos, 1) > cpus:
+        print(f"\nAviso: esta máquina tiene {cpus} CPU(s); más procesos que CPUs no pueden escalar.")
+    informe = {"benchmark": "escalado", "entorno": entorno(),
+               "parametros": {"procesos": procesos, "duracion": duracion}, "resultados": filas}
+    if ruta:
+        guardar(informe, ruta)
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Escalado del rendimiento con el número de workers de gunicorn")
+    parser.add_argument("--workers", default=None,
+                        help="lista separada por comas (por defecto 1, 2, 4, ... hasta el número de CPUs)")
+    parser.add_argument("--procesos", type=int, default=0, help="procesos del pool por worker (0 = sin pool)")
+    parser.add_argument("--duracion", type=float, default=20.0, help="segundos de carga por medición")
+    parser.add_argument("--json", dest="ruta", help="guardar el informe JSON en esta ruta ('-' = salida estándar)")
+    args = parser.parse_args()
+    if args.workers:
+        lista = [int(w) for w in args.workers.split(",")]
+    else:
+        cpus = os.cpu_count() or 1
+        lista = [1]
+        while lista[-1] * 2 <= cpus:
+            lista.append(lista[-1] * 2)
+        if lista[-1] != cpus:
+            lista.append(cpus)
+    main(lista, args.procesos, args.duracion, args.ruta)
@@ -0,0 +1,70 @@
+# graficas.py - Latencia y memoria del renderizado de gráficas
+#
+# Uso: python -m benchmarks.graficas [renderizados] [hilos]
+import sys
+import threading
+import time
+
+import numpy as np
+
+from graficas import render_integral_plot
+
+
+def rss_mb():
+    """Memoria residente actual del proceso, en MB (Linux)"""
+    with open("/proc/self/statm") as statm:
+        paginas = int(statm.read().split()[1])
+    return paginas * 4096 / 2 ** 20
+
+
+def renderizar(i):
+    a, b = 0.0, 1.0 + (i % 7)
+    x_range = np.linspace(a - 1, b + 1, 1000)
+    x_integral = np.linspace(a, b, 1000)
+    return render_integral_plot(
+        x_range, np.sin(x_range) * x_range, x_integral, np.sin(x_integral) * x_integral,
+        a, b, etiqueta=r'$f(x) = x \sin{\left(x \right)}$',
+    )
+
+
+def main(renderizados=10000, hilos=1):
+    latencias = []
+    memoria = []
+    candado = threading.Lock()
+    siguiente = iter(range(renderizados))
+
+    def trabajador():
+        while True:
+            with candado:
+                i = next(siguiente, None)
+            if i is None:
+                return
+            inicio = time.perf_counter()
+            renderizar(i)
+            fin = time.perf_counter()
+            with candado:
+                latencias.append(fin - inicio)
+                if len(latencias) % max(1, renderizados // 10) == 0:
+                    memoria.append((len(latencias), rss_mb()))
+
+    renderizar(0)  # Calentar fuentes y mathtext
+    inicio = time.perf_counter()
+    threads = [threading.Thread(target=trabajador) for _ in range(hilos)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total = time.perf_counter() - inicio
+
+    ms = np.array(latencias) * 1e3
+    print(f"{renderizados} gráficas con {hilos} hilo(s) en {total:.1f} s")
+    print(f"latencia p50={np.percentile(ms, 50):.1f} ms  p95={np.percentile(ms, 95):.1f} ms  "
+          f"p99={np.percentile(ms, 99):.1f} ms")
+    print("RSS (MB) por avance:")
+    for n, mb in memoria:
+        print(f"  {n:>7}: {mb:.1f}")
+
+
+if __name__ == "__main__":
+    args = [int(a) for a in sys.argv[1:]]
+    main(*args)
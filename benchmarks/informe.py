@@ -0,0 +1,122 @@
+# informe.py - Utilidades comunes de los benchmarks: percentiles, memoria e informes JSON
+import json
+import os
+import platform
+import subprocess
+import threading
+import time
+
+import numpy as np
+
+
+def resumen(valores):
+    """Estadísticas de una lista de latencias en segundos, expresadas en milisegundos"""
+    if not valores:
+        return {"n": 0}
+    ms = np.asarray(valores, dtype=float) * 1e3
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {
+        "n": int(ms.size),
+        "media_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p95_ms": float(p95),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+def _rss_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as status:
+            for linea in status:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _descendientes(raiz):
+    """PIDs del proceso raiz y todos sus descendientes (Linux)"""
+    hijos = {}
+    for nombre in os.listdir("/proc"):
+        if not nombre.isdigit():
+            continue
+        try:
+            with open(f"/proc/{nombre}/stat") as stat:
+                # El nombre del proceso va entre paréntesis y puede contener espacios
+                ppid = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        hijos.setdefault(ppid, []).append(int(nombre))
+    pendientes, encontrados = [raiz], []
+    while pendientes:
+        pid = pendientes.pop()
+        encontrados.append(pid)
+        pendientes.extend(hijos.get(pid, []))
+    return encontrados
+
+
+class MemorySampler:
+    """
+    Muestrea en segundo plano la memoria residente de un árbol de procesos
+    (el proceso actual y sus trabajadores, o un gunicorn con sus workers) y
+    guarda el máximo de la suma.
+    """
+
+    def __init__(self, pid=None, intervalo=0.1):
+        self.pid = pid or os.getpid()
+        self.intervalo = intervalo
+        self.pico_mb = 0.0
+        self._parar = threading.Event()
+        self._hilo = None
+
+    def muestra_mb(self):
+        return sum(_rss_kb(pid) for pid in _descendientes(self.pid)) / 1024
+
+    def __enter__(self):
+        self._hilo = threading.Thread(target=self._bucle, daemon=True)
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._parar.set()
+        self._hilo.join()
+        self.pico_mb = max(self.pico_mb, self.muestra_mb())
+
+    def _bucle(self):
+        while not self._parar.is_set():
+            self.pico_mb = max(self.pico_mb, self.muestra_mb())
+            self._parar.wait(self.intervalo)
+
+
+def entorno():
+    """Datos del entorno para poder comparar informes de distintas máquinas o versiones"""
+    import matplotlib
+    import sympy
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "sympy": sympy.__version__,
+        "numpy": np.__version__,
+        "matplotlib": matplotlib.__version__,
+        "cpus": os.cpu_count(),
+        "plataforma": platform.platform(),
+    }
+
+
+def guardar(informe, ruta):
+    """Escribe el informe como JSON (ruta '-' = salida estándar)"""
+    texto = json.dumps(informe, ensure_ascii=False, indent=2)
+    if ruta == "-":
+        print(texto)
+        return
+    with open(ruta, "w", encoding="utf-8") as archivo:
+        archivo.write(texto + "\n")
+    print(f"\nInforme guardado en {ruta}")
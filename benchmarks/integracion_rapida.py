@@ -0,0 +1,77 @@
+# integracion_rapida.py - Integrador por reglas contra integrate de SymPy
+#
+# Uso: python -m benchmarks.integracion_rapida [repeticiones]
+import sys
+import time
+
+from sympy import integrate
+from sympy.core.cache import clear_cache
+
+from benchmarks.corpus import COMUNES
+from calculadora_logica import IntegralCalculator
+
+
+def solo_sympy(calculator, func, a, b):
+    """Vía simbólica sin reglas: integrate y búsqueda de singularidades"""
+    antiderivative = integrate(func, calculator.x)
+    result = calculator._definite_from_antiderivative(func, antiderivative, a, b)
+    if result is None:
+        result = integrate(func, (calculator.x, a, b))
+    return result.evalf()
+
+
+def con_reglas(calculator, func, a, b):
+    return calculator._integrate_symbolic(func, a, b)[0]
+
+
+def medir(fn, repeticiones, en_frio=True):
+    """
+    Devuelve el mejor tiempo (en milisegundos) y el último resultado.
+
+    En frío se vacía la caché interna de SymPy antes de cada llamada (proceso
+    recién arrancado); en caliente se conserva, como en un trabajador con
+    tráfico previo.
+    """
+    mejor = float("inf")
+    resultado = fn()
+    for _ in range(repeticiones):
+        if en_frio:
+            clear_cache()
+        inicio = time.perf_counter()
+        resultado = fn()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor * 1e3, resultado
+
+
+def main(repeticiones=3):
+    calculator = IntegralCalculator()
+    print(f"{'':<36}{'---- en frío (ms) ----':>26}{'--- en caliente (ms) ---':>26}")
+    print(f"{'función':<22}{'límites':<14}{'SymPy':>13}{'reglas':>13}{'SymPy':>13}{'reglas':>13}  regla")
+    rapidas = 0
+    totales = [0.0, 0.0, 0.0, 0.0]
+    for func_str, lower_str, upper_str in COMUNES:
+        func = calculator.parse_function(func_str)
+        a = calculator.parse_limit(lower_str)
+        b = calculator.parse_limit(upper_str)
+        antes = calculator.fast_integrator.stats()["reglas"]
+        tiempos = []
+        for en_frio in (True, False):
+            t_sympy, esperado = medir(lambda: solo_sympy(calculator, func, a, b), repeticiones, en_frio)
+            t_reglas, obtenido = medir(lambda: con_reglas(calculator, func, a, b), repeticiones, en_frio)
+            tiempos += [t_sympy, t_reglas]
+        despues = calculator.fast_integrator.stats()["reglas"]
+        reglas = ", ".join(nombre for nombre in despues if despues[nombre] > antes[nombre]) or "(SymPy)"
+        if abs(complex(esperado) - complex(obtenido)) > 1e-9 * max(1.0, abs(complex(esperado))):
+            reglas += f"  ¡DIFERENCIA! {esperado} != {obtenido}"
+        totales = [total + t for total, t in zip(totales, tiempos)]
+        rapidas += tiempos[3] < 1.0
+        print(f"{func_str:<22}{lower_str + ' .. ' + upper_str:<14}" +
+              "".join(f"{t:>13.2f}" for t in tiempos) + f"  {reglas}")
+
+    print(f"{'total':<36}" + "".join(f"{t:>13.1f}" for t in totales))
+    print(f"\nEn caliente, {rapidas}/{len(COMUNES)} integrales por debajo de 1 ms con reglas")
+    print(calculator.fast_integrator.stats())
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 3)
@@ -0,0 +1,55 @@
+# lambdify.py - Costo de lambdify por petición contra la caché de funciones compiladas
+#
+# Uso: python -m benchmarks.lambdify [repeticiones]
+import sys
+import time
+
+import numpy as np
+from sympy import lambdify
+
+from benchmarks.corpus import COMUNES
+from calculadora_logica import IntegralCalculator
+from compilador import FunctionCompiler, numexpr
+
+
+def por_llamada(fn, repeticiones):
+    """Tiempo medio por llamada, en microsegundos"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        fn()
+    return (time.perf_counter() - inicio) / repeticiones * 1e6
+
+
+def main(repeticiones=200):
+    calculadora = IntegralCalculator()
+    x = calculadora.x
+    puntos = np.linspace(0.1, 3.0, 1000)
+    backends = ["numpy"] + (["numexpr"] if numexpr is not None else [])
+    if numexpr is None:
+        print("numexpr no está instalado: solo se mide el backend numpy\n")
+
+    print(f"{'función':<22}{'lambdify (µs)':>15}{'caché (µs)':>12}" +
+          "".join(f"{'eval ' + b + ' (µs)':>22}" for b in backends))
+    vistas = set()
+    for func_str, _, _ in COMUNES:
+        if func_str in vistas:
+            continue
+        vistas.add(func_str)
+        func = calculadora.parse_function(func_str)
+        compilador = FunctionCompiler()
+        compilador.compile(func, x)
+
+        t_lambdify = por_llamada(lambda: lambdify(x, func, modules=["numpy"]), repeticiones)
+        t_cache = por_llamada(lambda: compilador.compile(func, x), repeticiones)
+        evaluaciones = []
+        for backend in backends:
+            f = compilador.compile(func, x, backend=backend)
+            with np.errstate(all="ignore"):
+                evaluaciones.append(por_llamada(lambda: f(puntos), repeticiones))
+
+        print(f"{func_str:<22}{t_lambdify:>15.1f}{t_cache:>12.1f}" +
+              "".join(f"{t:>22.1f}" for t in evaluaciones))
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
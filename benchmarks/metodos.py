@@ -0,0 +1,114 @@
+# metodos.py - Micro-benchmarks por método de IntegralCalculator sobre el corpus por categoría
+#
+# Uso: python -m benchmarks.metodos [--repeticiones N] [--en-frio] [--categorias a,b] [--json ruta]
+import argparse
+import time
+
+from sympy.core.cache import clear_cache
+
+from analizador import ExpressionParser
+from benchmarks.corpus import CATEGORIAS
+from benchmarks.informe import MemorySampler, entorno, guardar, resumen
+from cache_resultados import ResultCache
+from calculadora_logica import IntegralCalculator
+
+# Métodos medidos, en el orden en que los usa /calcular
+METODOS = ("parse_function", "parse_limit", "calculate_integral", "calculate_integral_cache",
+           "format_result_pretty", "sample_plot", "render_plot", "plot_data")
+
+
+def casos(calculator, cached, func_str, lower_str, upper_str):
+    """Una función sin argumentos por método para una entrada del corpus"""
+    func = calculator.parse_function(func_str)
+    a = calculator.parse_limit(lower_str)
+    b = calculator.parse_limit(upper_str)
+    # Resultado de referencia para formatear (y para llenar la caché)
+    result = cached.calculate_integral(func_str, lower_str, upper_str)
+    return {
+        "parse_function": lambda: calculator.parse_function(func_str),
+        "parse_limit": lambda: (calculator.parse_limit(lower_str), calculator.parse_limit(upper_str)),
+        "calculate_integral": lambda: calculator.calculate_integral(func_str, lower_str, upper_str),
+        "calculate_integral_cache": lambda: cached.calculate_integral(func_str, lower_str, upper_str),
+        "format_result_pretty": lambda: calculator.format_result_pretty(
+            result["definida"], result["indefinida"], a, b, func_str, result["error_estimado"],
+            result["motor"]),
+        "sample_plot": lambda: calculator.sample_plot(func, a, b),
+        "render_plot": lambda: calculator.render_plot(func, a, b),
+        "plot_data": lambda: calculator.plot_data(func, a, b),
+    }
+
+
+def main(repeticiones=3, en_frio=False, categorias=None, ruta=None):
+    # Sin caché de expresiones ni de resultados: se mide el trabajo real de cada método
+    calculator = IntegralCalculator(parser=ExpressionParser(maxsize=0))
+    cached = IntegralCalculator(cache=ResultCache(maxsize=1024, ttl=3600))
+    latencias = {metodo: {} for metodo in METODOS}
+    errores = {metodo: 0 for metodo in METODOS}
+
+    print("Mejor tiempo (ms) por entrada: " + ", ".join(METODOS))
+    with MemorySampler() as memoria:
+        for categoria in categorias or CATEGORIAS:
+            print(f"\n[{categoria}]")
+            for entrada in CATEGORIAS[categoria]:
+                try:
+                    medibles = casos(calculator, cached, *entrada)
+                except Exception as e:
+                    print(f"  {entrada[0]:<26} no se pudo preparar: {e}")
+                    for metodo in METODOS:
+                        errores[metodo] += 1
+                    continue
+                fila = []
+                for metodo, fn in medibles.items():
+                    tiempos = latencias[metodo].setdefault(categoria, [])
+                    mejor = float("inf")
+                    for _ in range(repeticiones):
+                        if en_frio:
+                            clear_cache()
+                        inicio = time.perf_counter()
+                        try:
+                            fn()
+                        except Exception:
+                            errores[metodo] += 1
+                            continue
+                        transcurrido = time.perf_counter() - inicio
+                        tiempos.append(transcurrido)
+                        mejor = min(mejor, transcurrido)
+                    fila.append(mejor * 1e3)
+                print(f"  {entrada[0]:<26}" + "".join(f"{t:>10.2f}" for t in fila))
+
+    informe = {
+        "benchmark": "metodos",
+        "entorno": entorno(),
+        "parametros": {"repeticiones": repeticiones, "en_frio": en_frio},
+        "metodos": {
+            metodo: {
+                "total": resumen([t for valores in por_categoria.values() for t in valores]),
+                "categorias": {categoria: resumen(valores) for categoria, valores in por_categoria.items()},
+                "errores": errores[metodo],
+            }
+            for metodo, por_categoria in latencias.items()
+        },
+        "memoria_pico_mb": round(memoria.pico_mb, 1),
+    }
+
+    print(f"\n{'método':<26}{'n':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errores':>9}")
+    for metodo, datos in informe["metodos"].items():
+        total = datos["total"]
+        if total["n"]:
+            print(f"{metodo:<26}{total['n']:>6}{total['p50_ms']:>10.2f}{total['p95_ms']:>10.2f}"
+                  f"{total['p99_ms']:>10.2f}{datos['errores']:>9}")
+    print(f"Memoria pico: {informe['memoria_pico_mb']} MB")
+    if ruta:
+        guardar(informe, ruta)
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Micro-benchmarks por método de IntegralCalculator")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--en-frio", action="store_true",
+                        help="vaciar la caché interna de SymPy antes de cada llamada")
+    parser.add_argument("--categorias", help=f"lista separada por comas de: {', '.join(CATEGORIAS)}")
+    parser.add_argument("--json", dest="ruta", help="guardar el informe JSON en esta ruta ('-' = salida estándar)")
+    args = parser.parse_args()
+    main(args.repeticiones, args.en_frio, args.categorias.split(",") if args.categorias else None, args.ruta)
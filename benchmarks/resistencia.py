@@ -0,0 +1,105 @@
+# resistencia.py - Prueba de resistencia de memoria: muchas expresiones aleatorias en un mismo proceso
+#
+# Uso: python -m benchmarks.resistencia [--expresiones N] [--sin-gobernador]
+#                                       [--limpieza-mb MB] [--limpieza-cada N] [--semilla S] [--json ruta]
+#
+# Integra N expresiones distintas (100 000 por defecto) en este proceso, sin
+# pool, como lo haría un proceso del pool a lo largo de su vida, y registra la
+# memoria residente y el tamaño de las cachés de SymPy. Con el gobernador
+# (memoria.MemoryGovernor, configurado como en producción) la memoria debe
+# quedar acotada; con --sin-gobernador se ve cuánto crece sin él.
+import argparse
+import os
+import random
+import time
+
+from benchmarks.informe import entorno, guardar
+
+PLANTILLAS = (
+    "{a}*x^{k}", "{a}*sin({k}*x)", "{a}*cos({k}*x)", "{a}*exp(-{k}*x)",
+    "x^{k}*exp({a}*x/100)", "{a}*x*sin({k}*x)", "1/(x + {a})", "sqrt(x + {a})",
+    "{a}*x^{k}/(x^2 + {k})", "log(x + {a})",
+)
+
+
+def expresiones(semilla):
+    """Genera (función, límite inferior, límite superior) aleatorios, casi todos distintos"""
+    rng = random.Random(semilla)
+    while True:
+        terminos = [rng.choice(PLANTILLAS).format(a=rng.randint(1, 99), k=rng.randint(1, 9))
+                    for _ in range(rng.randint(1, 3))]
+        yield " + ".join(terminos), str(rng.randint(-5, 0)), str(rng.randint(1, 5))
+
+
+def main(args):
+    if args.sin_gobernador:
+        os.environ["CALCULADORA_LIMPIEZA_MB"] = "0"
+        os.environ["CALCULADORA_LIMPIEZA_CADA"] = "0"
+    else:
+        if args.limpieza_mb is not None:
+            os.environ["CALCULADORA_LIMPIEZA_MB"] = str(args.limpieza_mb)
+        if args.limpieza_cada is not None:
+            os.environ["CALCULADORA_LIMPIEZA_CADA"] = str(args.limpieza_cada)
+    os.environ.setdefault("CALCULADORA_CACHE_DISCO", "")
+
+    import tareas
+    from memoria import rss_mb, sympy_cache_entries
+
+    tareas.calentar()
+    gobernador = tareas.obtener_gobernador()
+    cada = max(1, args.expresiones // 50)
+    muestras = []
+    errores = 0
+    inicio = time.perf_counter()
+    for i, (funcion, a, b) in enumerate(expresiones(args.semilla), 1):
+        try:
+            tareas._calcular(funcion, a, b, None, "datos", "png", "base64")
+        except Exception:
+            errores += 1
+        if i % cada == 0 or i == args.expresiones:
+            muestra = {"expresiones": i, "segundos": round(time.perf_counter() - inicio, 2),
+                       "rss_mb": round(rss_mb(), 1), "cache_sympy_entradas": sympy_cache_entries()}
+            muestras.append(muestra)
+            print(f"{i:>8} expresiones  {muestra['segundos']:8.1f} s  RSS {muestra['rss_mb']:7.1f} MB  "
+                  f"cachés SymPy {muestra['cache_sympy_entradas']:>7}", flush=True)
+        if i == args.expresiones:
+            break
+    transcurrido = time.perf_counter() - inicio
+
+    # La primera mitad incluye el llenado de cachés acotadas (resultados,
+    # expresiones, funciones compiladas); la segunda muestra si la memoria sigue creciendo
+    mitad = muestras[len(muestras) // 2]
+    informe = {
+        "benchmark": "resistencia",
+        "entorno": entorno(),
+        "parametros": {"expresiones": args.expresiones, "semilla": args.semilla,
+                       "gobernador": not args.sin_gobernador,
+                       "limpieza_mb": gobernador.max_rss_mb, "limpieza_cada": gobernador.every},
+        "duracion_s": round(transcurrido, 1),
+        "expresiones_por_s": args.expresiones / transcurrido,
+        "errores": errores,
+        "rss_final_mb": muestras[-1]["rss_mb"],
+        "rss_pico_mb": max(m["rss_mb"] for m in muestras),
+        "crecimiento_segunda_mitad_mb": round(muestras[-1]["rss_mb"] - mitad["rss_mb"], 1),
+        "gobernador": gobernador.stats(),
+        "muestras": muestras,
+    }
+    print(f"{args.expresiones} expresiones en {transcurrido:.0f} s ({informe['expresiones_por_s']:.0f}/s), "
+          f"{errores} errores")
+    print(f"RSS final {informe['rss_final_mb']} MB, pico {informe['rss_pico_mb']} MB, "
+          f"crecimiento en la segunda mitad {informe['crecimiento_segunda_mitad_mb']} MB, "
+          f"limpiezas {informe['gobernador']['limpiezas']}")
+    if args.ruta:
+        guardar(informe, args.ruta)
+    return informe
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prueba de resistencia de memoria con expresiones aleatorias")
+    parser.add_argument("--expresiones", type=int, default=100000)
+    parser.add_argument("--semilla", type=int, default=0)
+    parser.add_argument("--sin-gobernador", action="store_true", help="no limpiar nunca las cachés de SymPy")
+    parser.add_argument("--limpieza-mb", type=float, help="CALCULADORA_LIMPIEZA_MB para esta prueba")
+    parser.add_argument("--limpieza-cada", type=int, help="CALCULADORA_LIMPIEZA_CADA para esta prueba")
+    parser.add_argument("--json", dest="ruta", help="guardar el informe JSON en esta ruta ('-' = salida estándar)")
+    main(parser.parse_args())
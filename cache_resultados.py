@@ -0,0 +1,128 @@
+# cache_resultados.py - Caché de resultados de integrales
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from sympy import srepr
+
+from almacen_resultados import ResultStore
+
+
+def canonical_key(*exprs):
+    """
+    Genera una clave canónica a partir de expresiones ya parseadas.
+
+    Se usa ``srepr`` para que entradas equivalentes ("x^2", "x**2", " x ** 2 ")
+    compartan la misma clave.
+    """
+    canon = "|".join(srepr(expr) for expr in exprs)
+    return hashlib.sha256(canon.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Caché LRU con expiración (TTL) para los resultados de las integrales.
+
+    Cada entrada es un diccionario con la integral definida, la integral
+    indefinida y, cuando ya se generó, el texto formateado. Opcionalmente
+    se respalda en un almacén SQLite compartido por todos los procesos, que
+    sobrevive a los reinicios de los workers de gunicorn (ver
+    almacen_resultados.ResultStore); el TTL solo se aplica en memoria.
+    """
+
+    def __init__(self, maxsize=512, ttl=3600, disk_path=None, disk_max_bytes=256 * 2 ** 20, disk_ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.disk_path = disk_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.disk_hits = 0
+        self.disk = ResultStore(disk_path, max_bytes=disk_max_bytes, ttl=disk_ttl) if disk_path else None
+
+    def get(self, key):
+        """Devuelve la entrada asociada a la clave o None si no existe o expiró"""
+        now = time.monotonic()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None:
+                stored_at, entry = item
+                if self.ttl is None or now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry
+                del self._entries[key]
+
+        entry = self._disk_get(key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.disk_hits += 1
+            self._store(key, entry, now)
+        return entry
+
+    def peek(self, key):
+        """Consulta la memoria sin alterar contadores ni el orden LRU"""
+        with self._lock:
+            item = self._entries.get(key)
+            return item[1] if item is not None else None
+
+    def set(self, key, entry):
+        """Guarda (o reemplaza) la entrada asociada a la clave"""
+        with self._lock:
+            self._store(key, entry, time.monotonic())
+        self._disk_set(key, entry)
+
+    def update(self, key, **fields):
+        """Agrega campos a una entrada existente, si todavía está en caché"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return
+            item[1].update(fields)
+            entry = item[1]
+        self._disk_set(key, entry)
+
+    def clear(self):
+        """Vacía la caché en memoria (el respaldo en disco se conserva)"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Devuelve los contadores de uso de la caché"""
+        with self._lock:
+            total = self.hits + self.misses
+            data = {
+                "entradas": len(self._entries),
+                "capacidad": self.maxsize,
+                "aciertos": self.hits,
+                "aciertos_disco": self.disk_hits,
+                "fallos": self.misses,
+                "desalojos": self.evictions,
+                "tasa_aciertos": self.hits / total if total else 0.0,
+            }
+        if self.disk is not None:
+            data["disco"] = self.disk.stats()
+        return data
+
+    def _store(self, key, entry, now):
+        # Debe llamarse con el candado tomado
+        self._entries[key] = (now, entry)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    # --- Respaldo en disco ---
+
+    def _disk_get(self, key):
+        return self.disk.get(key) if self.disk is not None else None
+
+    def _disk_set(self, key, entry):
+        if self.disk is not None:
+            self.disk.set(key, entry)
@@ -1,46 +1,183 @@
 # calculadora_logica.py - Lógica de cálculo de integrales
+import base64
 import numpy as np
-from sympy import symbols, sympify, lambdify, integrate, latex, pi, exp, sin, cos, tan, log, sqrt, oo
-import matplotlib.pyplot as plt
-import os
-import uuid
-
-# Definir símbolo matemático
-x = symbols('x')
-
-# Diccionario de funciones matemáticas
-math_dict = {
-    'pi': pi,
-    'π': pi,
-    'e': exp(1),
-    'E': exp(1),
-    'exp': exp,
-    'sin': sin,
-    'cos': cos,
-    'tan': tan,
-    'ln': log,
-    'log': log,
-    'sqrt': sqrt,
-    'oo': oo,
-    '∞': oo,
-    'x': x
-}
+from sympy import Symbol, sympify, srepr, integrate, latex, limit, Float, oo, zoo, nan, Integral, Interval, EmptySet, FiniteSet, S
+from sympy.calculus.singularities import singularities
+import contextvars
+import mpmath
+import re
+import signal
+import threading
+import time
+from analizador import FUNCIONES, NOMBRES, NOMBRES_MULTIPLES, VARIABLES, ExpressionParser, ParseError, x
+from cache_resultados import canonical_key
+from compilador import FunctionCompiler
+from cuadratura_numerica import (QuadratureError, cumulative_gauss_kronrod, gauss_kronrod, gauss_kronrod_many,
+                                 mpmath_precision, tanh_sinh_precise)
+from cubatura_numerica import gauss_kronrod_cube, quasi_monte_carlo, unit_interval_map
+from integracion_rapida import FastIntegrator
+from metricas import Metrics
+from graficas import render_integral_plot, ESTILO
+from muestreo import adaptive_sample, evaluate
+from almacen_imagenes import ImageStore
+
+# Variables reales para la vía simbólica de las integrales múltiples: sin
+# suposiciones, SymPy resuelve mal integrandos como |x - y| (con y complejo)
+_REALES = {var: Symbol(var.name, real=True) for var in VARIABLES.values()}
+
+
+# Nombres válidos de los parámetros de un barrido (los mismos caracteres que
+# admite el analizador en un nombre)
+_PARAMETRO = re.compile(r"^[A-Za-z_]+$")
+
+
+class SymbolicTimeout(BaseException):
+    """
+    Se agotó el presupuesto de tiempo de la vía simbólica.
+
+    Hereda de BaseException para que los ``except Exception`` internos de
+    SymPy no la oculten.
+    """
+
+
+class NoClosedForm(Exception):
+    """SymPy no encontró una forma cerrada para la integral"""
+
+
+def _run_with_time_budget(fn, seconds):
+    """
+    Ejecuta fn con un límite de tiempo en segundos (None = sin límite).
+
+    En el hilo principal (workers sync de gunicorn) se interrumpe con SIGALRM.
+    En otros hilos no es posible interrumpir a SymPy, así que se ejecuta en
+    un hilo auxiliar que se abandona al agotarse el tiempo (con una copia del
+    contexto, para que sus etapas cuenten en la traza de la petición).
+    """
+    if not seconds:
+        return fn()
+
+    if threading.current_thread() is threading.main_thread() and hasattr(signal, "setitimer"):
+        def on_alarm(signum, frame):
+            raise SymbolicTimeout()
+
+        previous = signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, seconds)
+        try:
+            return fn()
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    outcome = {}
+
+    def target():
+        try:
+            outcome["value"] = fn()
+        except BaseException as e:
+            outcome["error"] = e
+
+    worker = threading.Thread(target=contextvars.copy_context().run, args=(target,), daemon=True)
+    worker.start()
+    worker.join(seconds)
+    if worker.is_alive():
+        raise SymbolicTimeout()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def _plot_window(a, b, margin):
+    """Rango de x a graficar; los límites infinitos se sustituyen por una ventana finita"""
+    a, b = sympify(a), sympify(b)
+    lower, upper = (a, b) if bool(a <= b) else (b, a)
+    if lower.is_infinite and upper.is_infinite:
+        return -5.0, 5.0
+    if lower.is_infinite:
+        return float(upper) - 5, float(upper) + margin
+    if upper.is_infinite:
+        return float(lower) - margin, float(lower) + 5
+    return float(lower) - margin, float(upper) + margin
+
+
+def _decimate(xs, ys, max_points):
+    """
+    Reduce una serie a unos max_points puntos conservando, en cada tramo,
+    el mínimo y el máximo (para no perder picos).
+    """
+    ys = np.asarray(ys, dtype=float)
+    if len(xs) <= max_points:
+        return xs, ys
+    buckets = np.array_split(np.arange(len(xs)), max(1, max_points // 2))
+    keep = []
+    for bucket in buckets:
+        values = ys[bucket]
+        if np.isnan(values).all():
+            keep.append(bucket[0])
+            continue
+        keep.extend(sorted({bucket[np.nanargmin(values)], bucket[np.nanargmax(values)]}))
+    keep = np.array(keep)
+    return xs[keep], ys[keep]
+
+
+def _tramo_continuo(xs, ys, t):
+    """
+    Máscara de las muestras del mismo tramo continuo que t: la gráfica corta
+    el trazo con un NaN en cada polo, y ∫_t^x no existe al otro lado.
+    """
+    valid = np.isfinite(ys)
+    # El identificador de tramo aumenta en cada corte
+    segment = np.cumsum(~valid)
+    j = min(np.searchsorted(xs, t), len(xs) - 1)
+    if not valid[j] and j > 0 and xs[j] > t:
+        j -= 1
+    if not valid[j]:
+        return np.zeros(len(xs), dtype=bool)
+    return valid & (segment == segment[j])
+
+
+def _json_floats(values):
+    """Convierte un arreglo a lista JSON, con null en lugar de NaN o infinito"""
+    return [float(v) if np.isfinite(v) else None for v in np.asarray(values, dtype=float)]
+
 
 class IntegralCalculator:
     """Clase para manejar los cálculos de integrales"""
     
-    def __init__(self):
+    def __init__(self, cache=None, symbolic_timeout=5.0, image_store_options=None, compiler=None,
+                 parser=None, metrics=None, multi_parser=None, fast_integrator=None):
         self.x = x
-        self.math_dict = math_dict
+        # Analizador de expresiones con caché (ver analizador.ExpressionParser)
+        self.parser = parser or ExpressionParser()
+        # Analizador de las integrales múltiples (admite también y, z)
+        self.multi_parser = multi_parser or ExpressionParser(names=NOMBRES_MULTIPLES)
+        # Reglas de integración para las formas comunes, antes de SymPy
+        self.fast_integrator = fast_integrator or FastIntegrator()
+        # Caché opcional de resultados (ver cache_resultados.ResultCache)
+        self.cache = cache
+        # Segundos permitidos a SymPy antes de pasar a la cuadratura numérica
+        self.symbolic_timeout = symbolic_timeout
+        # Límites de los almacenes de gráficas (ver almacen_imagenes.ImageStore)
+        self.image_store_options = image_store_options or {}
+        self._image_stores = {}
+        self._image_stores_lock = threading.Lock()
+        # Analizadores de los barridos, por conjunto de nombres de parámetros
+        self._sweep_parsers = {}
+        self._sweep_parsers_lock = threading.Lock()
+        # Funciones numéricas compiladas, compartidas entre integración y gráficas
+        self.compiler = compiler or FunctionCompiler()
+        # Duración de cada etapa y contadores de eventos (ver metricas.Metrics)
+        self.metrics = metrics or Metrics(enabled=False)
     
     def parse_function(self, func_str):
         """Convierte una cadena de texto a una función simbólica"""
-        func_str = func_str.strip().replace("^", "**")
-        return sympify(func_str, locals=self.math_dict)
+        return self.parser.parse(func_str)
     
     def parse_limit(self, limit_str):
         """Convierte una cadena de texto a un límite numérico"""
-        return sympify(limit_str.strip(), locals=self.math_dict)
+        limit_value = self.parser.parse(limit_str)
+        if limit_value.free_symbols:
+            raise ParseError(f"El límite '{limit_str.strip()}' debe ser un número")
+        return limit_value
     
     def calculate_definite_integral(self, func_str, lower_limit_str, upper_limit_str):
         """
@@ -54,21 +191,846 @@ class IntegralCalculator:
         Returns:
             tuple: (resultado_definida, integral_indefinida, función_parseada, límite_a, límite_b)
         """
+        result = self.calculate_integral(func_str, lower_limit_str, upper_limit_str)
+        return result["definida"], result["indefinida"], result["funcion"], result["a"], result["b"]
+    
+    def calculate_integral(self, func_str, lower_limit_str, upper_limit_str):
+        """
+        Calcula la integral definida en modo híbrido.
+        
+        Primero se intenta la vía simbólica dentro del presupuesto de tiempo
+        ``symbolic_timeout``; si se agota o no existe forma cerrada, se recurre
+        a la cuadratura numérica de Gauss-Kronrod.
+        
+        Returns:
+            dict: definida, indefinida (None si no hay forma cerrada), funcion,
+            a, b, motor ("simbolico", "numerico" o "mpmath"), error_estimado y,
+            en los resultados numéricos, convergio
+        """
         try:
             # Parsear función y límites
-            func = self.parse_function(func_str)
-            a = self.parse_limit(lower_limit_str)
-            b = self.parse_limit(upper_limit_str)
+            with self.metrics.stage("analisis"):
+                func = self.parse_function(func_str)
+                a = self.parse_limit(lower_limit_str)
+                b = self.parse_limit(upper_limit_str)
+            
+            # Consultar la caché antes de integrar
+            if self.cache is not None:
+                key = canonical_key(func, a, b)
+                entry = self.cache.get(key)
+                self.metrics.inc("calculadora_cache_total", cache="resultados",
+                                 resultado="fallo" if entry is None else "acierto")
+                if entry is not None:
+                    return dict(entry, funcion=func, a=a, b=b)
+            
+            entry = self._compute_entry(func, a, b)
+            
+            if self.cache is not None:
+                self.cache.set(key, entry)
+            
+            return dict(entry, funcion=func, a=a, b=b)
+            
+        except Exception as e:
+            self.metrics.inc("calculadora_errores_total", origen="calculo", tipo=type(e).__name__)
+            raise Exception(f"Error en el cálculo: {e}")
+    
+    def _compute_entry(self, func, a, b):
+        """Integra por la vía simbólica con presupuesto de tiempo o, si falla, numéricamente"""
+        try:
+            result_def, result_indef, exact = _run_with_time_budget(
+                lambda: self._integrate_symbolic(func, a, b), self.symbolic_timeout
+            )
+            # La forma exacta se conserva para volver a evaluarla con más dígitos
+            return {"definida": result_def, "indefinida": result_indef, "exacta": exact,
+                    "motor": "simbolico", "error_estimado": None}
+        except (SymbolicTimeout, NoClosedForm) as e:
+            if isinstance(e, SymbolicTimeout):
+                self.metrics.inc("calculadora_tiempos_agotados_total", origen="simbolico")
+            value, error, engine, converged = self._integrate_numeric(func, a, b)
+            return {"definida": Float(value), "indefinida": None,
+                    "motor": engine, "error_estimado": error, "convergio": converged}
+    
+    def calculate_precise(self, func_str, lower_limit_str, upper_limit_str, digits, time_budget=None):
+        """
+        Calcula la integral definida con ``digits`` dígitos significativos.
+        
+        Se parte del resultado de calculate_integral (normalmente en caché):
+        si tiene forma exacta, o una antiderivada de la que obtenerla, basta
+        volver a evaluarla con evalf a la precisión pedida; si no, se integra
+        con tanh-sinh de mpmath escalando la precisión
+        (ver cuadratura_numerica.tanh_sinh_precise). Todo el trabajo extra
+        cabe en ``time_budget`` segundos: al agotarse se devuelve la mejor
+        estimación obtenida, marcada como no convergida.
+        
+        Returns:
+            dict: el resultado de calculate_integral y "precisa", con valor
+            (cadena), digitos, motor ("simbolico" o "mpmath"), error_estimado
+            (cadena, None si es exacto) y convergio
+        """
+        result = self.calculate_integral(func_str, lower_limit_str, upper_limit_str)
+        func, a, b = result["funcion"], result["a"], result["b"]
+        key = canonical_key(func, a, b) if self.cache is not None else None
+        known = (result.get("precisas") or {}).get(str(digits))
+        if known is not None:
+            return dict(result, precisa=known)
+        
+        try:
+            deadline = time.monotonic() + time_budget if time_budget else None
+            with self.metrics.stage("precision"):
+                precise = self._evaluate_precise(result, func, a, b, digits, deadline)
+        except Exception as e:
+            self.metrics.inc("calculadora_errores_total", origen="precision", tipo=type(e).__name__)
+            raise Exception(f"Error en el cálculo de precisión: {e}")
+        
+        if key is not None and precise["convergio"]:
+            self.cache.update(key, precisas=dict(result.get("precisas") or {}, **{str(digits): precise}))
+        return dict(result, precisa=precise)
+    
+    def _evaluate_precise(self, result, func, a, b, digits, deadline):
+        """Reevalúa la forma exacta o, si no la hay, integra con mpmath dentro del plazo"""
+        def remaining():
+            return None if deadline is None else max(0.01, deadline - time.monotonic())
+        
+        exact = result.get("exacta")
+        try:
+            if exact is None and result["indefinida"] is not None:
+                exact = _run_with_time_budget(
+                    lambda: self._definite_from_antiderivative(func, result["indefinida"], a, b), remaining()
+                )
+            if exact is not None:
+                # strict: falla en lugar de devolver menos dígitos de los pedidos
+                value = _run_with_time_budget(lambda: exact.evalf(digits, strict=True), remaining())
+                return {"valor": str(value), "digitos": digits, "motor": "simbolico",
+                        "error_estimado": None, "convergio": True}
+        except SymbolicTimeout:
+            self.metrics.inc("calculadora_tiempos_agotados_total", origen="precision")
+            if deadline is not None and time.monotonic() >= deadline:
+                raise QuadratureError(f"No se alcanzaron {digits} dígitos en el tiempo permitido")
+        except Exception:
+            # PrecisionExhausted u otra falla de evalf: se integra numéricamente
+            pass
+        
+        f = self.compiler.compile(func, self.x, backend="mpmath")
+        with mpmath_precision(digits + 10, deadline):
+            bounds = [mpmath.inf if limit.is_infinite and limit > 0 else -mpmath.inf if limit.is_infinite
+                      else mpmath.mpf(limit.evalf(digits + 10)) for limit in (a, b)]
+        estimates = []
+        try:
+            value, error, converged = _run_with_time_budget(
+                lambda: tanh_sinh_precise(f, *bounds, digits, deadline=deadline, estimates=estimates), remaining()
+            )
+        except SymbolicTimeout:
+            self.metrics.inc("calculadora_tiempos_agotados_total", origen="precision")
+            if not estimates:
+                raise QuadratureError(f"No se alcanzaron {digits} dígitos en el tiempo permitido")
+            value, error, converged = estimates[-1]
+        if not (mpmath.isfinite(value) and mpmath.isfinite(error)):
+            raise QuadratureError("La integral numérica no converge")
+        return {"valor": mpmath.nstr(value, digits), "digitos": digits, "motor": "mpmath",
+                "error_estimado": mpmath.nstr(error, 3), "convergio": bool(converged)}
+    
+    def format_precise(self, precise):
+        """Línea del texto del resultado con el valor de precisión arbitraria"""
+        text = f"Con {precise['digitos']} dígitos: {precise['valor']}"
+        if precise["error_estimado"] is not None:
+            text += f" (± {precise['error_estimado']})"
+        if not precise["convergio"]:
+            text += "\nNo se alcanzó la precisión pedida en el tiempo permitido; es la mejor estimación obtenida."
+        return text
+    
+    def parse_region(self, func_str, limits):
+        """
+        Analiza una integral iterada en x, y, z.
+        
+        Args:
+            func_str: Función como cadena de texto
+            limits: Lista de (variable, límite_inferior, límite_superior) como
+                cadenas, de la integral más interna a la más externa; los
+                límites de cada variable pueden depender de las más externas
+                (regiones simples como 0 ≤ y ≤ x ≤ 1)
+            
+        Returns:
+            tuple: (función, tupla de (símbolo, inferior, superior))
+        """
+        if not 1 <= len(limits) <= len(VARIABLES):
+            raise ParseError(f"Se admiten de 1 a {len(VARIABLES)} variables de integración")
+        names = [str(name).strip() for name, _, _ in limits]
+        for name in names:
+            if name not in VARIABLES:
+                raise ParseError(f"Variable de integración desconocida '{name}' (se admiten x, y, z)")
+        if len(set(names)) != len(names):
+            raise ParseError("Cada variable se integra una sola vez")
+        
+        func = self.multi_parser.parse(func_str)
+        region = []
+        for i, (name, (_, lower_str, upper_str)) in enumerate(zip(names, limits)):
+            outer = {VARIABLES[other] for other in names[i + 1:]}
+            bounds = []
+            for limit_str in (lower_str, upper_str):
+                bound = self.multi_parser.parse(limit_str)
+                if not bound.free_symbols <= outer:
+                    raise ParseError(f"El límite '{str(limit_str).strip()}' de {name} solo puede "
+                                     f"depender de las variables que se integran después")
+                bounds.append(bound)
+            region.append((VARIABLES[name], *bounds))
+        
+        missing = func.free_symbols - {VARIABLES[name] for name in names}
+        if missing:
+            raise ParseError(f"La función depende de {', '.join(sorted(map(str, missing)))}, "
+                             f"que no se integra")
+        return func, tuple(region)
+    
+    def calculate_multiple(self, func_str, limits):
+        """
+        Calcula una integral iterada (doble o triple) en modo híbrido.
+        
+        Primero se integra simbólicamente variable por variable, de la más
+        interna a la más externa, dentro del presupuesto ``symbolic_timeout``;
+        si se agota o no hay forma cerrada, se integra numéricamente sobre el
+        cubo unidad (ver _integrate_numeric_multiple).
+        
+        Args:
+            func_str: Función como cadena de texto
+            limits: Ver parse_region
+            
+        Returns:
+            dict: definida, indefinida (siempre None), funcion, region, motor
+            ("simbolico", "numerico" o "cuasi_montecarlo") y error_estimado
+        """
+        try:
+            with self.metrics.stage("analisis"):
+                func, region = self.parse_region(func_str, limits)
+            
+            if self.cache is not None:
+                key = canonical_key(func, *(expr for limit_ in region for expr in limit_))
+                entry = self.cache.get(key)
+                self.metrics.inc("calculadora_cache_total", cache="resultados",
+                                 resultado="fallo" if entry is None else "acierto")
+                if entry is not None:
+                    return dict(entry, funcion=func, region=region)
             
-            # Calcular integrales
-            result_def = integrate(func, (self.x, a, b)).evalf()
-            result_indef = integrate(func, self.x)
+            entry = self._compute_multiple_entry(func, region)
             
-            return result_def, result_indef, func, a, b
+            if self.cache is not None:
+                self.cache.set(key, entry)
             
+            return dict(entry, funcion=func, region=region)
+        
         except Exception as e:
+            self.metrics.inc("calculadora_errores_total", origen="calculo", tipo=type(e).__name__)
             raise Exception(f"Error en el cálculo: {e}")
     
+    def _compute_multiple_entry(self, func, region):
+        """Integra variable por variable con presupuesto de tiempo o, si falla, numéricamente"""
+        try:
+            result_def = _run_with_time_budget(
+                lambda: self._integrate_symbolic_multiple(func, region), self.symbolic_timeout
+            )
+            return {"definida": result_def, "indefinida": None,
+                    "motor": "simbolico", "error_estimado": None}
+        except (SymbolicTimeout, NoClosedForm) as e:
+            if isinstance(e, SymbolicTimeout):
+                self.metrics.inc("calculadora_tiempos_agotados_total", origen="simbolico")
+            value, error, engine = self._integrate_numeric_multiple(func, region)
+            return {"definida": Float(value), "indefinida": None,
+                    "motor": engine, "error_estimado": error}
+    
+    def _integrate_symbolic_multiple(self, func, region):
+        """Vía simbólica: una integral definida por variable, de dentro hacia fuera"""
+        expr = func.xreplace(_REALES)
+        with self.metrics.stage("antiderivada"):
+            for var, lower, upper in region:
+                expr = self._integrate_level(expr, _REALES[var], lower.xreplace(_REALES), upper.xreplace(_REALES))
+        if expr.has(Integral) or expr.free_symbols:
+            raise NoClosedForm()
+        with self.metrics.stage("evaluacion"):
+            value = expr.evalf()
+        if value.has(nan, zoo):
+            raise NoClosedForm()
+        return value
+    
+    def _integrate_level(self, expr, var, lower, upper):
+        """
+        Integral definida en una variable, con las demás como parámetros.
+        
+        Si la regla encontrada no tiene polos y los límites son finitos basta
+        con sustituir en la antiderivada; si no, decide SymPy.
+        """
+        found = self.fast_integrator.antiderivative(expr, var)
+        if found is not None and found[1] == [] and not (lower.has(oo, -oo) or upper.has(oo, -oo)):
+            antiderivative = found[0]
+            return antiderivative.xreplace({var: upper}) - antiderivative.xreplace({var: lower})
+        result = integrate(expr, (var, lower, upper))
+        if result.has(Integral):
+            raise NoClosedForm()
+        return result
+    
+    def _integrate_numeric_multiple(self, func, region):
+        """
+        Vía numérica: la región se lleva al cubo unidad y se integra con la
+        regla producto de Gauss-Kronrod adaptativa; si no converge dentro de
+        su presupuesto (discontinuidades, singularidades), se prueba
+        cuasi-Monte Carlo y se queda el resultado con menor error estimado.
+        
+        Returns:
+            tuple: (valor, error_estimado, motor)
+        """
+        with self.metrics.stage("integracion_numerica"):
+            g = self._unit_cube_integrand(func, region)
+            value, error, converged = gauss_kronrod_cube(g, len(region))
+            if converged:
+                return value, error, "numerico"
+            try:
+                qmc_value, qmc_error = quasi_monte_carlo(g, len(region))
+                if not np.isfinite(error) or qmc_error < error:
+                    return qmc_value, qmc_error, "cuasi_montecarlo"
+            except QuadratureError:
+                pass
+            if not np.isfinite(error):
+                raise QuadratureError("La integral numérica no converge")
+            return value, error, "numerico"
+    
+    def _unit_cube_integrand(self, func, region):
+        """
+        Integrando equivalente sobre [0, 1]^n: cada columna del punto se
+        lleva al intervalo de su variable, de la más externa a la más interna
+        (cuyos límites dependen de las ya calculadas), y el resultado se
+        multiplica por el jacobiano del cambio de variables.
+        """
+        variables = tuple(var for var, _, _ in region)
+        f = self.compiler.compile(func, variables)
+        bounds = []
+        for i, (var, lower, upper) in enumerate(region):
+            outer = variables[i + 1:]
+            bounds.append((var, outer, self._compile_bound(lower, outer), self._compile_bound(upper, outer)))
+        
+        def integrand(points):
+            n = len(points)
+            values = {}
+            jacobian = np.ones(n)
+            for i in reversed(range(len(bounds))):
+                var, outer, lower, upper = bounds[i]
+                args = [values[v] for v in outer]
+                lo = np.broadcast_to(np.asarray(lower(*args), dtype=float), (n,))
+                hi = np.broadcast_to(np.asarray(upper(*args), dtype=float), (n,))
+                values[var], factor = unit_interval_map(points[:, i], lo, hi)
+                jacobian = jacobian * factor
+            result = np.asarray(f(*[values[v] for v in variables]), dtype=float)
+            return np.broadcast_to(result, (n,)) * jacobian
+        
+        return integrand
+    
+    def _compile_bound(self, bound, outer):
+        """Límite como función de las variables externas (o constante)"""
+        if not bound.free_symbols:
+            value = float(bound)
+            return lambda *args: value
+        return self.compiler.compile(bound, outer)
+    
+    def calculate_sweep(self, func_str, lower, upper, parameters=None):
+        """
+        Integral definida de f(x; parámetros) para muchos límites y valores
+        de los parámetros a la vez.
+        
+        La antiderivada paramétrica se calcula una sola vez (dentro del
+        presupuesto ``symbolic_timeout``), se compila y F(b) - F(a) se evalúa
+        en todos los puntos con una sola llamada vectorizada. Los puntos donde
+        eso no es seguro (un polo entre los límites, límites infinitos,
+        cancelación o valores no finitos), o todos si no hay forma cerrada, se
+        integran con la cuadratura vectorizada acumulada
+        (ver cuadratura_numerica.cumulative_gauss_kronrod).
+        
+        Args:
+            func_str: Función de x y de los parámetros, como cadena de texto
+            lower: Límite inferior o lista de límites (números o cadenas como "pi")
+            upper: Límite superior o lista de límites
+            parameters: Diccionario nombre -> valor o lista de valores
+            
+        Las listas deben tener todas la misma longitud (o un solo elemento).
+        
+        Returns:
+            dict: valores y errores (arreglos de NumPy; error 0 en los puntos
+            exactos, NaN donde la integral no converge), numericos (máscara de
+            los puntos integrados numéricamente), indefinida (antiderivada
+            paramétrica, o None) y funcion
+        """
+        try:
+            with self.metrics.stage("analisis"):
+                func, symbols, columns = self._parse_sweep(func_str, lower, upper, parameters or {})
+            a, b, *values = columns
+            n = len(a)
+            
+            try:
+                antiderivative, poles = _run_with_time_budget(
+                    lambda: self._parametric_antiderivative(func), self.symbolic_timeout
+                )
+            except SymbolicTimeout:
+                self.metrics.inc("calculadora_tiempos_agotados_total", origen="simbolico")
+                antiderivative, poles = None, None
+            
+            results = np.full(n, np.nan)
+            errors = np.zeros(n)
+            numeric = np.ones(n, dtype=bool)
+            if antiderivative is not None:
+                with self.metrics.stage("evaluacion"):
+                    try:
+                        exact = self._evaluate_sweep(antiderivative, poles, symbols, a, b, values)
+                    except Exception:
+                        # Funciones sin equivalente en NumPy (erf, Ci, ...): todo por cuadratura
+                        exact = np.full(n, np.nan)
+                numeric = np.isnan(exact)
+                results[~numeric] = exact[~numeric]
+            
+            pending = np.flatnonzero(numeric)
+            if pending.size:
+                with self.metrics.stage("integracion_numerica"):
+                    f = self.compiler.compile(func, (self.x, *symbols))
+                    finite = np.isfinite(a[pending]) & np.isfinite(b[pending])
+                    for subset, method in ((pending[finite], cumulative_gauss_kronrod),
+                                           (pending[~finite], gauss_kronrod_many)):
+                        if subset.size:
+                            results[subset], errors[subset] = method(
+                                f, a[subset], b[subset], [column[subset] for column in values]
+                            )
+            
+            return {"valores": results, "errores": errors, "numericos": numeric,
+                    "indefinida": antiderivative, "funcion": func}
+        
+        except Exception as e:
+            self.metrics.inc("calculadora_errores_total", origen="calculo", tipo=type(e).__name__)
+            raise Exception(f"Error en el cálculo: {e}")
+    
+    def sweep_fields(self, entry, encoding='base64'):
+        """
+        Campos serializables de un barrido (ver calculate_sweep).
+        
+        Args:
+            encoding: 'base64' (float64 little-endian codificado en base64,
+                con NaN donde no hay valor) o 'lista' (listas JSON con null)
+        
+        Returns:
+            dict: resultado, error_estimado, motor, puntos_numericos, n, indefinida y codificacion
+        """
+        numeric = int(entry["numericos"].sum())
+        n = len(entry["valores"])
+        data = {
+            "motor": "simbolico" if numeric == 0 else "numerico" if numeric == n else "mixto",
+            "puntos_numericos": numeric,
+            "n": n,
+            "indefinida": None if entry["indefinida"] is None else str(entry["indefinida"]),
+            "codificacion": encoding,
+        }
+        for name, values in (("resultado", entry["valores"]), ("error_estimado", entry["errores"])):
+            if encoding == 'base64':
+                data[name] = base64.b64encode(np.asarray(values, dtype='<f8').tobytes()).decode('ascii')
+            elif encoding == 'lista':
+                data[name] = _json_floats(values)
+            else:
+                raise ValueError(f"Codificación de datos desconocida: {encoding}")
+        return data
+    
+    def _parse_sweep(self, func_str, lower, upper, parameters):
+        """
+        Analiza la función y convierte límites y parámetros en columnas de
+        igual longitud.
+        
+        Returns:
+            tuple: (función, símbolos de los parámetros, [a, b, *valores])
+        """
+        names = tuple(parameters)
+        for name in names:
+            if not _PARAMETRO.match(name) or name in NOMBRES or name in FUNCIONES:
+                raise ParseError(f"Nombre de parámetro no válido: '{name}'")
+        parser = self._sweep_parser(names)
+        symbols = tuple(parser.names[name] for name in names)
+        func = parser.parse(func_str)
+        missing = func.free_symbols - {self.x, *symbols}
+        if missing:
+            raise ParseError(f"La función depende de {', '.join(sorted(map(str, missing)))}, "
+                             f"que no es x ni un parámetro")
+        
+        columns = [self._limit_column(lower), self._limit_column(upper)]
+        for name in names:
+            try:
+                columns.append(np.atleast_1d(np.asarray(parameters[name], dtype=float)))
+            except (TypeError, ValueError):
+                raise ParseError(f"Los valores del parámetro '{name}' deben ser números")
+        if any(column.ndim != 1 or column.size == 0 for column in columns):
+            raise ParseError("Los límites y los parámetros deben ser valores o listas no vacías")
+        try:
+            columns = [np.array(column) for column in np.broadcast_arrays(*columns)]
+        except ValueError:
+            raise ParseError("Las listas de límites y parámetros deben tener la misma longitud")
+        return func, symbols, columns
+    
+    def _sweep_parser(self, names):
+        """Analizador que reconoce además los parámetros (uno por conjunto de nombres)"""
+        key = tuple(sorted(names))
+        with self._sweep_parsers_lock:
+            parser = self._sweep_parsers.get(key)
+            if parser is None:
+                if len(self._sweep_parsers) >= 64:
+                    self._sweep_parsers.pop(next(iter(self._sweep_parsers)))
+                parser = ExpressionParser(
+                    names=dict(NOMBRES, **{name: Symbol(name, real=True) for name in key}),
+                    max_length=self.parser.max_length, max_depth=self.parser.max_depth,
+                    max_power_bits=self.parser.max_power_bits,
+                )
+                self._sweep_parsers[key] = parser
+            return parser
+    
+    def _limit_column(self, values):
+        """Límite o lista de límites (números o cadenas) como arreglo de floats"""
+        column = []
+        for value in values if isinstance(values, (list, tuple)) else [values]:
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                column.append(float(value))
+            elif isinstance(value, str):
+                column.append(float(self.parse_limit(value)))
+            else:
+                raise ParseError("Los límites deben ser números o cadenas")
+        return np.array(column, dtype=float)
+    
+    def _parametric_antiderivative(self, func):
+        """
+        Antiderivada de func en x con los parámetros como símbolos, y sus
+        polos reales (expresiones de los parámetros) o None si no se conocen.
+        
+        Returns:
+            tuple: (antiderivada o None si no hay forma cerrada, polos)
+        """
+        with self.metrics.stage("antiderivada"):
+            found = self.fast_integrator.antiderivative(func, self.x)
+            if found is not None:
+                return found
+            antiderivative = integrate(func, self.x)
+            if antiderivative.has(Integral):
+                return None, None
+            try:
+                poles = []
+                for expr in (func, antiderivative):
+                    points = singularities(expr, self.x, S.Reals)
+                    if points == EmptySet:
+                        continue
+                    if not isinstance(points, FiniteSet):
+                        return antiderivative, None
+                    poles.extend(points)
+            except Exception:
+                return antiderivative, None
+            return antiderivative, poles
+    
+    def _evaluate_sweep(self, antiderivative, poles, symbols, a, b, values):
+        """
+        F(b) - F(a) en todos los puntos a la vez.
+        
+        Returns:
+            Arreglo con NaN en los puntos que deben integrarse numéricamente
+        """
+        n = len(a)
+        if poles is None:
+            return np.full(n, np.nan)
+        variables = (self.x, *symbols)
+        lower, upper = np.minimum(a, b), np.maximum(a, b)
+        safe = np.isfinite(a) & np.isfinite(b)
+        with np.errstate(all="ignore"):
+            for pole in poles:
+                position = self.compiler.compile(pole, variables)(lower, *values)
+                position = np.broadcast_to(np.asarray(position, dtype=complex), (n,))
+                # Los polos no reales no afectan a la integral en la recta real
+                real = np.abs(position.imag) <= 1e-12 * (1 + np.abs(position.real))
+                safe &= ~(real & (position.real >= lower) & (position.real <= upper))
+            f_antiderivative = self.compiler.compile(antiderivative, variables)
+            upper_vals = np.broadcast_to(np.asarray(f_antiderivative(b, *values), dtype=complex), (n,))
+            lower_vals = np.broadcast_to(np.asarray(f_antiderivative(a, *values), dtype=complex), (n,))
+        results = upper_vals - lower_vals
+        # Como en los lotes: solo valores reales, finitos y sin cancelación severa
+        magnitude = np.abs(upper_vals) + np.abs(lower_vals)
+        safe &= np.isfinite(results) & (results.imag == 0) & (magnitude <= 1e6 * np.abs(results) + 1e-300)
+        return np.where(safe, results.real, np.nan)
+    
+    def calculate_many(self, items, plot=False, img_dir=None):
+        """
+        Calcula muchas integrales definidas agrupándolas por función.
+        
+        Para cada función distinta la antiderivada se calcula una sola vez y
+        todos sus pares de límites se evalúan en una única pasada vectorizada
+        de NumPy. Los pares que no pueden resolverse así (singularidades
+        dentro del intervalo, límites no reales, etc.) siguen la vía normal.
+        
+        Args:
+            items: Iterable de tuplas (función, límite_inferior, límite_superior) como cadenas
+            plot: Si es True se genera la gráfica de cada integral
+            img_dir: Directorio de las gráficas (requerido si plot es True)
+            
+        Yields:
+            dict: Resultado de cada integral, con su ``indice`` dentro de items,
+            en el orden en que se van terminando
+        """
+        groups = {}
+        for index, (func_str, lower_str, upper_str) in enumerate(items):
+            item = {"indice": index, "funcion": func_str,
+                    "limite_inferior": lower_str, "limite_superior": upper_str}
+            try:
+                func = self.parse_function(func_str)
+                a = self.parse_limit(lower_str)
+                b = self.parse_limit(upper_str)
+            except Exception as e:
+                yield dict(item, error=f"Error en el cálculo: {e}", exito=False)
+                continue
+            groups.setdefault(canonical_key(func), (func, []))[1].append((item, a, b))
+        
+        for func, members in groups.values():
+            for item, entry, a, b in self._calculate_group(func, members):
+                if entry is None:
+                    yield item
+                    continue
+                result = dict(item, **self.batch_fields(entry), exito=True)
+                if plot:
+                    result["grafica_url"] = self.generate_integral_plot(func, a, b, img_dir)
+                yield result
+    
+    def _calculate_group(self, func, members):
+        """Resuelve todos los pares de límites de una misma función"""
+        pending = []
+        for item, a, b in members:
+            key = canonical_key(func, a, b)
+            entry = self.cache.get(key) if self.cache is not None else None
+            if entry is not None:
+                yield item, entry, a, b
+            else:
+                pending.append((item, a, b, key))
+        if not pending:
+            return
+        
+        # Antiderivada única para todo el grupo
+        antiderivative, poles = self._antiderivative(func)
+        values = {}
+        if antiderivative is not None and not antiderivative.has(Integral):
+            try:
+                values = self._evaluate_limits_vectorized(func, antiderivative, pending, poles)
+            except Exception:
+                # Antiderivadas sin equivalente en NumPy (erf, Si, ...): cada par por separado
+                values = {}
+        
+        for item, a, b, key in pending:
+            try:
+                if item["indice"] in values:
+                    entry = {"definida": Float(values[item["indice"]]), "indefinida": antiderivative,
+                             "motor": "simbolico", "error_estimado": None}
+                else:
+                    entry = self._compute_entry(func, a, b)
+            except Exception as e:
+                yield dict(item, error=f"Error en el cálculo: {e}", exito=False), None, a, b
+                continue
+            if self.cache is not None:
+                self.cache.set(key, entry)
+            yield item, entry, a, b
+    
+    def _antiderivative(self, func):
+        """
+        Antiderivada por reglas o, si no hay regla, por SymPy con presupuesto.
+        
+        Returns:
+            tuple: (antiderivada o None si se agotó el tiempo, polos conocidos o None)
+        """
+        found = self.fast_integrator.antiderivative(func, self.x)
+        if found is not None:
+            return found
+        try:
+            return _run_with_time_budget(lambda: integrate(func, self.x), self.symbolic_timeout), None
+        except SymbolicTimeout:
+            return None, None
+    
+    def _evaluate_limits_vectorized(self, func, antiderivative, pending, poles=None):
+        """
+        Evalúa F(b) - F(a) para todos los pares seguros en una sola llamada.
+        
+        Returns:
+            dict: índice del item -> valor (solo para los pares resueltos)
+        """
+        points = self._real_singularities(func, antiderivative, poles)
+        if points is None:
+            return {}
+        
+        # Los límites infinitos usan el límite de F, calculado una sola vez
+        at_infinity = {}
+        
+        def side_value(point):
+            if point.is_infinite:
+                if point not in at_infinity:
+                    try:
+                        at_infinity[point] = float(limit(antiderivative, self.x, point))
+                    except Exception:
+                        at_infinity[point] = np.nan
+                return at_infinity[point]
+            return None
+        
+        indices, lowers, uppers, fixed_lower, fixed_upper = [], [], [], [], []
+        for item, a, b, _ in pending:
+            try:
+                lo, hi = sorted((float(a), float(b)))
+            except TypeError:
+                continue
+            if any(lo < p < hi for p in points):
+                continue
+            indices.append(item["indice"])
+            fixed_lower.append(side_value(a))
+            fixed_upper.append(side_value(b))
+            lowers.append(0.0 if a.is_infinite else float(a))
+            uppers.append(0.0 if b.is_infinite else float(b))
+        if not indices:
+            return {}
+        
+        f_antiderivative = self.compiler.compile(antiderivative, self.x)
+        with np.errstate(all="ignore"):
+            upper_vals = np.broadcast_to(np.asarray(f_antiderivative(np.array(uppers)), dtype=complex), len(uppers))
+            lower_vals = np.broadcast_to(np.asarray(f_antiderivative(np.array(lowers)), dtype=complex), len(lowers))
+        upper_vals = np.array([v if fixed is None else fixed for v, fixed in zip(upper_vals, fixed_upper)])
+        lower_vals = np.array([v if fixed is None else fixed for v, fixed in zip(lower_vals, fixed_lower)])
+        results = upper_vals - lower_vals
+        
+        # Si F(b) y F(a) casi se cancelan se perderían demasiados dígitos en float64
+        magnitude = np.abs(upper_vals) + np.abs(lower_vals)
+        
+        values = {}
+        for index, value, size in zip(indices, results, magnitude):
+            # Solo se aceptan valores reales, finitos y sin cancelación severa;
+            # el resto sigue la vía normal
+            if np.isfinite(value) and value.imag == 0 and size <= 1e6 * abs(value) + 1e-300:
+                values[index] = value.real
+        return values
+    
+    def _real_singularities(self, func, antiderivative, poles=None):
+        """Singularidades reales de f y F como lista de floats, o None si no son finitas"""
+        try:
+            if poles is not None:
+                return [float(p) for p in poles]
+            points = []
+            for expr in (func, antiderivative):
+                found = singularities(expr, self.x, S.Reals)
+                if found == EmptySet:
+                    continue
+                if not isinstance(found, FiniteSet):
+                    return None
+                points.extend(float(p) for p in found)
+            return points
+        except Exception:
+            return None
+    
+    def batch_fields(self, entry):
+        """Campos serializables del resultado de una integral (respuestas por lotes y múltiples)"""
+        value = entry["definida"]
+        try:
+            number = float(value)
+            value = number if np.isfinite(number) else str(value)
+        except TypeError:
+            value = str(value)
+        return {
+            "resultado": value,
+            "indefinida": None if entry["indefinida"] is None else str(entry["indefinida"]),
+            "motor": entry["motor"],
+            "error_estimado": entry["error_estimado"],
+            "convergio": entry.get("convergio", True),
+        }
+    
+    def _integrate_symbolic(self, func, a, b):
+        """Vía simbólica: antiderivada única y teorema fundamental del cálculo"""
+        # Calcular la antiderivada una sola vez (por reglas si es posible) y derivar de ella la definida
+        with self.metrics.stage("antiderivada"):
+            found = self.fast_integrator.antiderivative(func, self.x)
+            result_indef, poles = found if found is not None else (integrate(func, self.x), None)
+        with self.metrics.stage("definida"):
+            result_def = self._definite_from_antiderivative(func, result_indef, a, b, poles)
+            if result_def is None:
+                result_def = integrate(func, (self.x, a, b))
+        if result_def.has(Integral):
+            raise NoClosedForm()
+        if result_indef.has(Integral):
+            result_indef = None
+        with self.metrics.stage("evaluacion"):
+            return result_def.evalf(), result_indef, result_def
+    
+    def _integrate_numeric(self, func, a, b):
+        """
+        Vía numérica: Gauss-Kronrod adaptativo sobre la función compilada. Si
+        agota sus subintervalos sin alcanzar la tolerancia (singularidades en
+        los extremos, oscilaciones), se prueba tanh-sinh de mpmath dentro del
+        presupuesto simbólico y se queda la estimación con menor error.
+        
+        Returns:
+            tuple: (valor, error_estimado, motor, convergió)
+        """
+        with self.metrics.stage("integracion_numerica"):
+            f = self.compiler.compile(func, self.x)
+            value, error, converged = gauss_kronrod(f, float(a), float(b))
+            if converged:
+                return value, error, "numerico", True
+            try:
+                f_mp = self.compiler.compile(func, self.x, backend="mpmath")
+                deadline = time.monotonic() + self.symbolic_timeout
+                mp_value, mp_error, mp_converged = _run_with_time_budget(
+                    lambda: tanh_sinh_precise(f_mp, mpmath.mpf(float(a)), mpmath.mpf(float(b)), 15,
+                                              deadline=deadline),
+                    self.symbolic_timeout,
+                )
+                if mpmath.isfinite(mp_value) and mp_error < error:
+                    return float(mp_value), float(mp_error), "mpmath", bool(mp_converged)
+            except SymbolicTimeout:
+                self.metrics.inc("calculadora_tiempos_agotados_total", origen="cuadratura")
+            except Exception:
+                # Sin equivalente en mpmath o sin capacidad: queda la estimación de Gauss-Kronrod
+                pass
+            return value, error, "numerico", False
+    
+    def _definite_from_antiderivative(self, func, antiderivative, a, b, poles=None):
+        """
+        Obtiene la integral definida por el teorema fundamental del cálculo.
+
+        Devuelve None cuando no es seguro aplicarlo (sin forma cerrada o con
+        discontinuidades dentro de [a, b]); en ese caso se debe integrar de
+        forma directa.
+        """
+        if antiderivative.has(Integral):
+            return None
+        if self._has_interior_singularity(func, antiderivative, a, b, poles):
+            return None
+        try:
+            value = self._evaluate_at(antiderivative, b, '-') - self._evaluate_at(antiderivative, a, '+')
+        except Exception:
+            return None
+        if value.has(nan, zoo) or value.has(Integral):
+            return None
+        return value
+
+    def _has_interior_singularity(self, func, antiderivative, a, b, poles=None):
+        """
+        Indica si f o su antiderivada tienen singularidades dentro de (a, b).
+        
+        Si se conocen los polos (integrador por reglas) no hace falta buscarlos.
+        """
+        try:
+            lower, upper = (a, b) if bool(a <= b) else (b, a)
+            if poles is not None:
+                return any(bool(lower < p) and bool(p < upper) for p in poles)
+            interior = Interval.open(lower, upper)
+            for expr in (func, antiderivative):
+                if singularities(expr, self.x, interior) != EmptySet:
+                    return True
+            return False
+        except Exception:
+            # Si no se puede decidir, se asume lo peor
+            return True
+
+    def _evaluate_at(self, expr, point, direction):
+        """Evalúa la antiderivada en un límite, usando límites si es impropio"""
+        if point.is_infinite:
+            return limit(expr, self.x, point)
+        # xreplace sustituye sin la maquinaria de subs (basta para un símbolo)
+        value = expr.xreplace({self.x: point})
+        if value.has(nan, zoo, oo, -oo):
+            return limit(expr, self.x, point, direction)
+        return value
+
     def get_function_values(self, func, a, b, num_points=1000):
         """
         Obtiene valores numéricos de la función para graficar
@@ -77,30 +1039,24 @@ class IntegralCalculator:
             func: Función simbólica
             a: Límite inferior
             b: Límite superior
-            num_points: Número de puntos para la gráfica
+            num_points: Número máximo de puntos para la gráfica
             
         Returns:
-            tuple: (x_vals, y_vals)
+            tuple: (x_vals, y_vals), con NaN donde la curva se corta (polos)
         """
         try:
-            f = lambdify(self.x, func, modules=["numpy"])
+            f = self.compiler.compile(func, self.x)
             
             # Crear rango extendido para mejor visualización
-            x_start = float(a) - 2 if float(a) != -oo else float(b) - 5
-            x_end = float(b) + 2 if float(b) != oo else float(a) + 5
-            
-            x_vals = np.linspace(x_start, x_end, num_points)
-            y_vals = f(x_vals)
+            x_start, x_end = _plot_window(a, b, margin=2)
             
-            # Reemplazar valores infinitos o NaN con un valor seguro
-            y_vals = np.nan_to_num(y_vals, posinf=np.max(y_vals) if np.isfinite(np.max(y_vals)) else 100, neginf=np.min(y_vals) if np.isfinite(np.min(y_vals)) else -100)
-            
-            return x_vals, y_vals
+            # Muestreo adaptativo: los polos quedan separados por NaN en lugar de recortados
+            return adaptive_sample(f, x_start, x_end, max_points=num_points)
             
         except Exception as e:
             raise Exception(f"Error al generar valores de la función: {e}")
     
-    def generate_integral_plot(self, func, a, b, img_dir, num_points=1000):
+    def generate_integral_plot(self, func, a, b, img_dir, num_points=1000, cumulative=False):
         """
         Genera y guarda una gráfica de la función y su integral.
 
@@ -109,61 +1065,181 @@ class IntegralCalculator:
             a: Límite inferior de la integral.
             b: Límite superior de la integral.
             img_dir: Directorio donde se guardará la imagen.
-            num_points: Número de puntos para la curva.
+            num_points: Número máximo de puntos para la curva.
+            cumulative: Si es True se dibuja también F(x) = ∫_a^x f.
 
         Returns:
             La ruta del archivo de imagen si se genera con éxito, None en caso contrario.
         """
         try:
-            # Eliminar gráficas antiguas para evitar saturación del servidor
-            if os.path.exists(img_dir):
-                for filename in os.listdir(img_dir):
-                    if filename.endswith(".png"):
-                        os.remove(os.path.join(img_dir, filename))
+            # Las gráficas idénticas se sirven desde el almacén sin volver a renderizar
+            store = self.image_store(img_dir)
+            key = self.plot_key(func, a, b, num_points, cumulative)
+            filename = store.lookup(key)
+            self.metrics.inc("calculadora_cache_total", cache="graficas",
+                             resultado="fallo" if filename is None else "acierto")
+            if filename is not None:
+                return f"/static/img/{filename}"
 
-            f_numpy = lambdify(self.x, func, modules=["numpy"])
-            
-            # Definir un rango de x para la gráfica completa
-            x_range = np.linspace(float(a)-1, float(b)+1, num_points)
-            y_range = f_numpy(x_range)
-            
-            # Definir un rango de x para el área de la integral
-            x_integral = np.linspace(float(a), float(b), num_points)
-            y_integral = f_numpy(x_integral)
+            imagen = self.render_plot(func, a, b, num_points, cumulative=cumulative)
             
-            # Crear la gráfica
-            plt.figure(figsize=(8, 6))
-            
-            # Graficar la función completa
-            plt.plot(x_range, y_range, label=f'$f(x) = {latex(func)}$', color='#3498db')
-            
-            # Rellenar el área bajo la curva
-            plt.fill_between(x_integral, y_integral, color='#3498db', alpha=0.3, label='Área de la integral')
-            
-            # Límites de la integral
-            plt.axvline(x=a, color='red', linestyle='--', label=f'x = {a}')
-            plt.axvline(x=b, color='red', linestyle='--', label=f'x = {b}')
-            
-            plt.title('Gráfica de la función y área de la integral')
-            plt.xlabel('x')
-            plt.ylabel('f(x)')
-            plt.grid(True, linestyle=':', alpha=0.6)
-            plt.legend()
-            
-            # Generar un nombre de archivo único
-            filename = f"graph_{uuid.uuid4().hex}.png"
-            filepath = os.path.join(img_dir, filename)
-            
-            # Guardar la imagen
-            plt.savefig(filepath)
-            plt.close()
+            # Guardar la imagen de forma atómica
+            with self.metrics.stage("guardado"):
+                filename = store.save(key, imagen)
 
             return f"/static/img/{filename}"
 
         except Exception as e:
+            self.metrics.inc("calculadora_errores_total", origen="grafica", tipo=type(e).__name__)
             print(f"Error al generar la gráfica: {e}")
             return None
 
+    def plot_key(self, func, a, b, num_points=1000, cumulative=False):
+        """Clave que identifica una gráfica por su contenido lógico"""
+        extra = ("acumulada",) if cumulative else ()
+        return ImageStore.make_key(srepr(func), srepr(a), srepr(b), num_points, ESTILO, *extra)
+
+    def sample_plot(self, func, a, b, num_points=1000):
+        """
+        Muestrea la función para la curva completa y para el área de la integral.
+
+        Returns:
+            tuple: (x_range, y_range, x_integral, y_integral)
+        """
+        with self.metrics.stage("muestreo"):
+            # Una sola función compilada y una sola pasada de muestreo para ambos rangos
+            f_numpy = self.compiler.compile(func, self.x)
+            
+            # Definir un rango de x para la gráfica completa
+            x_start, x_end = _plot_window(a, b, margin=1)
+            x_range, y_range = adaptive_sample(f_numpy, x_start, x_end, max_points=num_points)
+            
+            # El rango del área se toma de las mismas muestras, más los límites exactos
+            lower, upper = sorted((max(float(min(a, b)), x_start), min(float(max(a, b)), x_end)))
+            inside = (x_range > lower) & (x_range < upper)
+            x_integral = np.concatenate([[lower], x_range[inside], [upper]])
+            y_integral = np.concatenate([evaluate(f_numpy, np.array([lower])), y_range[inside],
+                                         evaluate(f_numpy, np.array([upper]))])
+        
+        return x_range, y_range, x_integral, y_integral
+
+    def cumulative_curve(self, func, a, b, x_range, y_range):
+        """
+        F(x) = ∫_a^x f(t) dt sobre las muestras ya tomadas para la gráfica.
+
+        Se usa la antiderivada simbólica si está disponible (en la caché de
+        resultados o por las reglas rápidas, nunca llamando a SymPy); si no,
+        una sola pasada de la regla del trapecio sobre y_range. Si a es
+        infinito la curva se ancla en b con el valor de la integral definida
+        guardado en la caché. Al otro lado de un polo la curva es NaN.
+
+        Returns:
+            numpy.ndarray: F en cada punto de x_range
+        """
+        with self.metrics.stage("acumulada"):
+            antiderivative, definite = None, None
+            if self.cache is not None:
+                entry = self.cache.peek(canonical_key(func, a, b))
+                if entry is not None:
+                    antiderivative, definite = entry["indefinida"], entry["definida"]
+            if antiderivative is None:
+                found = self.fast_integrator.antiderivative(func, self.x)
+                antiderivative = found[0] if found is not None else None
+            
+            xs = np.asarray(x_range, dtype=float)
+            ys = np.asarray(y_range, dtype=float)
+            curve = np.full(len(xs), np.nan)
+            # Punto de anclaje: a, o b con el valor de la definida si a es infinito
+            if a.is_finite:
+                anchor, offset = float(a), 0.0
+            elif b.is_finite and definite is not None and definite.is_real:
+                anchor, offset = float(b), float(definite)
+            else:
+                return curve
+            inside = _tramo_continuo(xs, ys, anchor)
+            if not inside.any():
+                return curve
+            
+            values = None
+            if antiderivative is not None:
+                try:
+                    F = self.compiler.compile(antiderivative, self.x)
+                    values = evaluate(F, xs) - evaluate(F, np.array([anchor]))[0] + offset
+                    # Una rama compleja u otra constante en algún punto: se descarta entera
+                    if not np.isfinite(values[inside]).all():
+                        values = None
+                except Exception:
+                    values = None
+            if values is None:
+                # Trapecio acumulado sobre las muestras del tramo del ancla
+                xt, yt = xs[inside], ys[inside]
+                accumulated = np.concatenate([[0.0], np.cumsum(0.5 * (yt[1:] + yt[:-1]) * np.diff(xt))])
+                values = np.full(len(xs), np.nan)
+                values[inside] = accumulated - np.interp(anchor, xt, accumulated) + offset
+            curve[inside] = values[inside]
+        return curve
+
+    def render_plot(self, func, a, b, num_points=1000, formato='png', cumulative=False):
+        """Renderiza la gráfica en memoria y devuelve los bytes de la imagen"""
+        x_range, y_range, x_integral, y_integral = self.sample_plot(func, a, b, num_points)
+        acumulada = self.cumulative_curve(func, a, b, x_range, y_range) if cumulative else None
+        
+        # Renderizar con figuras propias (seguro entre hilos); incluye savefig
+        with self.metrics.stage("renderizado"):
+            return render_integral_plot(
+                x_range, y_range, x_integral, y_integral, a, b,
+                etiqueta=f'$f(x) = {latex(func)}$', formato=formato, acumulada=acumulada,
+            )
+
+    def plot_data(self, func, a, b, num_points=1000, encoding='base64', max_points=400, cumulative=False):
+        """
+        Devuelve los puntos de la gráfica para que el navegador la dibuje.
+
+        Args:
+            encoding: 'base64' (float32 little-endian codificado en base64) o
+                'lista' (listas JSON diezmadas a max_points puntos)
+            cumulative: Si es True se incluye y_acumulada, F(x) = ∫_a^x f
+                en los mismos puntos x
+
+        Returns:
+            dict: x, y, x_area, y_area, a, b y codificacion (e y_acumulada);
+            a o b es None (null) si el límite es infinito
+        """
+        x_range, y_range, x_integral, y_integral = self.sample_plot(func, a, b, num_points)
+        series = {
+            "x": x_range, "y": y_range, "x_area": x_integral, "y_area": y_integral,
+        }
+        if cumulative:
+            series["y_acumulada"] = self.cumulative_curve(func, a, b, x_range, y_range)
+        # JSON no admite infinito: un límite infinito no tiene línea que dibujar
+        limit_a, limit_b = _json_floats([a, b])
+        data = {"a": limit_a, "b": limit_b, "codificacion": encoding}
+        if encoding == 'base64':
+            for name, values in series.items():
+                raw = np.asarray(values, dtype='<f4').tobytes()
+                data[name] = base64.b64encode(raw).decode('ascii')
+        elif encoding == 'lista':
+            if cumulative:
+                # Los mismos puntos que la curva: se diezma con ella
+                keep = _decimate(np.arange(len(x_range)), y_range, max_points)[0]
+                data["y_acumulada"] = _json_floats(series["y_acumulada"][keep])
+            for prefix in ("", "_area"):
+                xs, ys = _decimate(series["x" + prefix], series["y" + prefix], max_points)
+                data["x" + prefix] = _json_floats(xs)
+                data["y" + prefix] = _json_floats(ys)
+        else:
+            raise ValueError(f"Codificación de datos desconocida: {encoding}")
+        return data
+
+    def image_store(self, img_dir):
+        """Devuelve el almacén de gráficas asociado a un directorio"""
+        with self._image_stores_lock:
+            store = self._image_stores.get(img_dir)
+            if store is None:
+                store = ImageStore(img_dir, **self.image_store_options)
+                self._image_stores[img_dir] = store
+            return store
+
     # (El resto de la clase permanece igual)
     def format_result(self, result_def, result_indef, a, b):
         return f"∫ de {a} a {b} de f(x) dx = {result_def}\nIntegral indefinida: ∫f(x)dx = {latex(result_indef)} + C"
@@ -202,31 +1278,88 @@ class IntegralCalculator:
             expr_str = re.sub(pattern, replacement, expr_str)
         return expr_str
     
-    def format_result_pretty(self, result_def, result_indef, a, b, func_str):
+    def format_result_pretty(self, result_def, result_indef, a, b, func_str, error_estimate=None, engine=None,
+                             converged=True):
+        """
+        Texto del resultado para el frontend. engine es el "motor" que obtuvo
+        el valor; sin él, un valor con error estimado se toma como numérico.
+        Con converged=False se advierte que el valor es solo la mejor estimación.
+        """
+        with self.metrics.stage("formato"):
+            return self._format_result_pretty(result_def, result_indef, a, b, func_str, error_estimate, engine,
+                                              converged)
+    
+    def _format_result_pretty(self, result_def, result_indef, a, b, func_str, error_estimate, engine=None,
+                              converged=True):
+        key = None
+        if self.cache is not None:
+            try:
+                key = canonical_key(self.parse_function(func_str), a, b)
+                entry = self.cache.peek(key)
+                if entry is not None and "texto" in entry:
+                    return entry["texto"]
+            except Exception:
+                key = None
         try:
-            func_formatted = self.pretty_print_expression(sympify(func_str, locals=self.math_dict))
+            func_formatted = self.pretty_print_expression(self.parse_function(func_str))
             a_formatted = self.pretty_print_expression(a)
             b_formatted = self.pretty_print_expression(b)
-            if isinstance(result_def, (int, float, complex)):
-                if abs(float(result_def)) < 1e-12:
-                    result_def_formatted = "0"
-                elif abs(float(result_def)) > 1e6:
-                    result_def_formatted = f"{float(result_def):.4e}"
-                else:
-                    result_def_formatted = f"{float(result_def):.8f}".rstrip('0').rstrip('.')
-            else:
-                result_def_formatted = self.pretty_print_expression(result_def)
-            
-            result_indef_formatted = self.pretty_print_expression(result_indef)
+            result_def_formatted = self._format_value(result_def, error_estimate)
             
             result_text = f"✅ RESULTADO DE LA INTEGRACIÓN\n\n"
             result_text += f"Función: f(x) = {func_formatted}\n"
             result_text += f"Límites: [{a_formatted}, {b_formatted}]\n\n"
             result_text += f"∫[{a_formatted} → {b_formatted}] f(x) dx = {result_def_formatted}\n\n"
+            if not converged:
+                result_text += ("⚠ La cuadratura no alcanzó la tolerancia pedida: el valor es la mejor "
+                                "estimación obtenida (ver el error estimado).\n\n")
             result_text += f"Integral indefinida:\n"
-            result_text += f"∫ f(x) dx = {result_indef_formatted} + C"
+            numeric = engine != "simbolico" if engine is not None else error_estimate is not None
+            if result_indef is None and numeric:
+                result_text += "Sin forma cerrada; el resultado se obtuvo por cuadratura numérica."
+            elif result_indef is None:
+                result_text += "Sin forma cerrada elemental; el valor definido se obtuvo de forma simbólica."
+            else:
+                result_indef_formatted = self.pretty_print_expression(result_indef)
+                result_text += f"∫ f(x) dx = {result_indef_formatted} + C"
+            
+            if key is not None:
+                self.cache.update(key, texto=result_text)
             
             return result_text
             
         except Exception as e:
-            return f"∫ de {a} a {b} de f(x) dx = {result_def}\nIntegral indefinida: ∫f(x)dx = {result_indef} + C"
\ No newline at end of file
+            return f"∫ de {a} a {b} de f(x) dx = {result_def}\nIntegral indefinida: ∫f(x)dx = {result_indef} + C"
+
+    def _format_value(self, result_def, error_estimate):
+        """Valor de una integral definida, con su error estimado si es numérico"""
+        if isinstance(result_def, (int, float, complex)):
+            if abs(float(result_def)) < 1e-12:
+                formatted = "0"
+            elif abs(float(result_def)) > 1e6:
+                formatted = f"{float(result_def):.4e}"
+            else:
+                formatted = f"{float(result_def):.8f}".rstrip('0').rstrip('.')
+        else:
+            formatted = self.pretty_print_expression(result_def)
+        if error_estimate is not None:
+            formatted += f" (± {error_estimate:.1e})"
+        return formatted
+
+    def format_multiple_result(self, result_def, func, region, error_estimate=None):
+        """Texto del resultado de una integral iterada (ver calculate_multiple)"""
+        with self.metrics.stage("formato"):
+            variables = ", ".join(sorted(str(var) for var, _, _ in region))
+            limits = ", ".join(
+                f"{var} ∈ [{self.pretty_print_expression(lower)}, {self.pretty_print_expression(upper)}]"
+                for var, lower, upper in region
+            )
+            differentials = " ".join(f"d{var}" for var, _, _ in region)
+            result_text = "✅ RESULTADO DE LA INTEGRACIÓN\n\n"
+            result_text += f"Función: f({variables}) = {self.pretty_print_expression(func)}\n"
+            result_text += f"Región: {limits}\n\n"
+            result_text += f"{'∫' * len(region)} f {differentials} = {self._format_value(result_def, error_estimate)}\n\n"
+            result_text += f"Orden de integración: {' → '.join(str(var) for var, _, _ in region)}"
+            if error_estimate is not None:
+                result_text += "\nSin forma cerrada; el resultado se obtuvo por cubatura numérica."
+            return result_text
@@ -0,0 +1,253 @@
+# coalescencia.py - Deduplicación de cálculos idénticos en curso (single-flight)
+import base64
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo coalescencia entre hilos
+    fcntl = None
+
+
+def default_lock_dir(name):
+    """
+    Directorio por defecto de los candados: dentro de XDG_RUNTIME_DIR (privado
+    del usuario) si existe, o en el directorio temporal con el uid del
+    usuario en el nombre.
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, name)
+    uid = os.geteuid() if hasattr(os, "geteuid") else os.getpid()
+    return os.path.join(tempfile.gettempdir(), f"{name}_{uid}")
+
+
+def private_directory(path):
+    """
+    Crea el directorio (0700) si no existe y comprueba que sea privado: un
+    directorio real, no un enlace, del usuario actual y sin permisos para
+    nadie más. Así otro usuario de la máquina no puede dejar en él resultados
+    que este proceso leería como propios.
+
+    Raises:
+        PermissionError: Si el directorio existe pero no es privado
+    """
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    info = os.lstat(path)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"{path} no es un directorio")
+    if info.st_uid != os.geteuid():
+        raise PermissionError(f"{path} pertenece a otro usuario")
+    if info.st_mode & 0o077:
+        raise PermissionError(f"{path} tiene permisos para otros usuarios")
+    return path
+
+
+def _json_default(value):
+    # Bytes (imágenes en modo memoria) como base64 marcado
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": base64.b64encode(value).decode("ascii")}
+    raise TypeError(f"{type(value).__name__} no es serializable")
+
+
+def _json_object(data):
+    if len(data) == 1 and "__bytes__" in data:
+        return base64.b64decode(data["__bytes__"])
+    return data
+
+
+def encode_json(value):
+    """
+    Serializa un resultado en JSON (los bytes, como base64 marcado).
+
+    Raises:
+        TypeError, ValueError: Si el resultado no es serializable
+    """
+    return json.dumps(value, default=_json_default)
+
+
+def decode_json(text):
+    """Inversa de encode_json"""
+    return json.loads(text, object_hook=_json_object)
+
+
+class _Call:
+    """Cálculo en curso dentro de este proceso"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Ejecuta una sola vez los cálculos idénticos que coinciden en el tiempo.
+
+    Entre hilos, el primero con una clave la calcula y los demás esperan su
+    resultado. Si se indica ``lock_dir``, además se coordina con otros
+    procesos (workers del pool o de gunicorn): el cálculo se hace con un
+    ``flock`` sobre un archivo por clave, y el resultado se deja ``ttl``
+    segundos junto al candado para que quien esperaba lo reutilice en lugar
+    de repetirlo. Si un proceso muere, el sistema libera su candado.
+
+    Los resultados compartidos entre procesos se guardan en JSON (nunca con
+    pickle), en un directorio que debe ser privado del usuario (ver
+    private_directory); si no lo es, solo se coalescen los hilos. Un
+    resultado que no se puede serializar no se comparte: los demás procesos
+    lo calculan por su cuenta.
+
+    Args:
+        lock_dir: Directorio compartido para los candados (None = solo hilos)
+        ttl: Segundos durante los que un resultado sirve a otros procesos
+        retry_on: Excepciones del líder tras las que los que esperaban
+            reintentan por su cuenta (por ejemplo, una cancelación)
+    """
+
+    # Cada cuánto revisa la cancelación quien espera (segundos)
+    CANCEL_POLL = 0.1
+
+    def __init__(self, lock_dir=None, ttl=30.0, retry_on=()):
+        self.lock_dir = lock_dir if fcntl is not None else None
+        self.ttl = ttl
+        self.retry_on = tuple(retry_on)
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._last_sweep = 0.0
+
+        self.leaders = 0
+        self.thread_shared = 0
+        self.process_shared = 0
+
+        if self.lock_dir is not None:
+            try:
+                private_directory(self.lock_dir)
+            except OSError as e:
+                print(f"Coalescencia solo entre hilos: {e}")
+                self.lock_dir = None
+
+    def do(self, key, fn, cancel=None):
+        """
+        Devuelve (resultado de fn(), compartido) calculándolo una sola vez por clave.
+
+        Args:
+            key: Clave canónica del cálculo
+            fn: Función sin argumentos que hace el cálculo
+            cancel: threading.Event opcional; si se activa mientras se espera
+                a otro, se lanza la primera excepción de retry_on
+        """
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+                leader = call is None
+                if leader:
+                    call = self._calls[key] = _Call()
+
+            if leader:
+                try:
+                    call.result, shared = self._run(key, fn)
+                    return call.result, shared
+                except BaseException as e:
+                    call.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        del self._calls[key]
+                    call.done.set()
+
+            while not call.done.wait(self.CANCEL_POLL if cancel is not None else None):
+                if cancel.is_set() and self.retry_on:
+                    raise self.retry_on[0]("El cálculo fue cancelado.")
+            if call.error is not None and isinstance(call.error, self.retry_on):
+                # El líder se canceló: otro de los que esperaban toma su lugar
+                continue
+            with self._lock:
+                self.thread_shared += 1
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+    def stats(self):
+        """Devuelve los contadores de coalescencia"""
+        with self._lock:
+            return {
+                "en_curso": len(self._calls),
+                "calculadas": self.leaders,
+                "coalescidas_hilos": self.thread_shared,
+                "coalescidas_procesos": self.process_shared,
+                "entre_procesos": self.lock_dir is not None,
+            }
+
+    def _run(self, key, fn):
+        if self.lock_dir is None:
+            with self._lock:
+                self.leaders += 1
+            return fn(), False
+
+        path = os.path.join(self.lock_dir, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+        with open(path + ".lock", "ab") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                found = self._load(path + ".res")
+                if found is not None:
+                    with self._lock:
+                        self.process_shared += 1
+                    return found[0], True
+                with self._lock:
+                    self.leaders += 1
+                result = fn()
+                self._store(path + ".res", result)
+                return result, False
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load(self, path):
+        """Devuelve (resultado,) si otro proceso lo dejó hace menos de ttl, o None"""
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl:
+                return None
+            with open(path, encoding="utf-8") as f:
+                return (decode_json(f.read()),)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, path, result):
+        """Escribe el resultado de forma atómica para los procesos que esperan"""
+        try:
+            data = encode_json(result)
+        except (TypeError, ValueError):
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.lock_dir, prefix=".tmp_")
+            with os.fdopen(fd, "w", encoding="utf-8") as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, path)
+        except OSError:
+            return
+        self._sweep()
+
+    def _sweep(self):
+        """Borra los resultados vencidos y los candados sin uso reciente"""
+        now = time.time()
+        with self._lock:
+            if now - self._last_sweep < self.ttl:
+                return
+            self._last_sweep = now
+        # Un candado solo se borra mucho después de que cualquier cálculo
+        # con él pudo terminar (las tareas tienen un tiempo máximo)
+        max_age = {".res": self.ttl, ".lock": max(10 * self.ttl, 600)}
+        with os.scandir(self.lock_dir) as entries:
+            for entry in entries:
+                ext = os.path.splitext(entry.name)[1] if not entry.name.startswith(".tmp_") else ".res"
+                try:
+                    if ext in max_age and now - entry.stat().st_mtime > max_age[ext]:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
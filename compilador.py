@@ -0,0 +1,111 @@
+# compilador.py - Caché de funciones numéricas compiladas con lambdify
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sympy import lambdify
+
+try:
+    import numexpr
+except ImportError:  # Dependencia opcional
+    numexpr = None
+
+
+class FunctionCompiler:
+    """
+    Compila expresiones de SymPy a funciones vectorizadas y las reutiliza.
+
+    ``lambdify`` genera y ejecuta código Python en cada llamada; aquí se hace
+    una sola vez por (expresión, variables, backend) y el resultado
+    se guarda en una caché LRU.
+
+    Backends:
+        numpy: lambdify con el módulo numpy (por defecto)
+        numexpr: usa numexpr si está instalado; si no lo está, o si la
+            expresión usa funciones que numexpr no soporta, se usa numpy
+        mpmath: función escalar de precisión arbitraria (solo por llamada,
+            con ``backend="mpmath"``; no sirve como backend por defecto)
+    """
+
+    BACKENDS = ("numpy", "numexpr")
+
+    def __init__(self, maxsize=256, backend="numpy"):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Backend numérico desconocido: {backend}")
+        self.maxsize = maxsize
+        self.backend = backend
+        self._functions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.fallbacks = 0
+
+    def compile(self, expr, variables, backend=None):
+        """
+        Devuelve la función numérica de expr en las variables dadas.
+
+        Args:
+            expr: Expresión de SymPy
+            variables: Símbolo o tupla de símbolos de la función
+            backend: Backend a usar (por defecto, el del compilador)
+        """
+        backend = backend or self.backend
+        if not isinstance(variables, (tuple, list)):
+            variables = (variables,)
+        # Las expresiones de SymPy son inmutables y su hash se guarda en caché,
+        # así que sirven directamente como clave canónica (igualdad estructural)
+        key = (expr, tuple(variables), backend)
+
+        with self._lock:
+            function = self._functions.get(key)
+            if function is not None:
+                self._functions.move_to_end(key)
+                self.hits += 1
+                return function
+            self.misses += 1
+
+        function = self._lambdify(expr, variables, backend)
+
+        with self._lock:
+            self._functions[key] = function
+            self._functions.move_to_end(key)
+            while len(self._functions) > self.maxsize:
+                self._functions.popitem(last=False)
+                self.evictions += 1
+        return function
+
+    def stats(self):
+        """Devuelve los contadores de la caché de funciones"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "backend": self.backend,
+                "numexpr_disponible": numexpr is not None,
+                "funciones": len(self._functions),
+                "aciertos": self.hits,
+                "fallos": self.misses,
+                "desalojos": self.evictions,
+                "respaldos_numpy": self.fallbacks,
+                "tasa_aciertos": self.hits / total if total else 0.0,
+            }
+
+    def _lambdify(self, expr, variables, backend):
+        args = variables[0] if len(variables) == 1 else variables
+        if backend == "mpmath":
+            return lambdify(args, expr, modules="mpmath")
+        if backend == "numexpr" and numexpr is not None:
+            try:
+                function = lambdify(args, expr, modules="numexpr")
+                # numexpr solo detecta las funciones no soportadas al evaluar
+                with np.errstate(all="ignore"):
+                    function(*[np.linspace(0.5, 1.5, 3)] * len(variables))
+                return function
+            except Exception:
+                # numexpr no soporta todas las funciones (erf, gamma, ...)
+                with self._lock:
+                    self.fallbacks += 1
+        elif backend == "numexpr":
+            with self._lock:
+                self.fallbacks += 1
+        return lambdify(args, expr, modules=["numpy"])
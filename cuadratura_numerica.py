@@ -0,0 +1,370 @@
+# cuadratura_numerica.py - Cuadratura adaptativa de Gauss-Kronrod vectorizada con NumPy
+# (y tanh-sinh de precisión arbitraria con mpmath)
+import threading
+import time
+from contextlib import contextmanager
+
+import mpmath
+import numpy as np
+
+# Nodos y pesos de la regla de Kronrod de 15 puntos (los nodos impares
+# coinciden con la regla de Gauss de 7 puntos)
+_XGK = np.array([
+    0.991455371120812639206854697526329, 0.949107912342758524526189684047851,
+    0.864864423359769072789712788640926, 0.741531185599394439863864773280788,
+    0.586087235467691130294144845693013, 0.405845151377397166906606412076961,
+    0.207784955007898467600689403773245, 0.000000000000000000000000000000000,
+])
+_WGK = np.array([
+    0.022935322010529224963732008058970, 0.063092092629978553290700663189204,
+    0.104790010322250183839876322541518, 0.140653259715525918745189590510238,
+    0.169004726639267902826583426598550, 0.190350578064785409913256402421014,
+    0.204432940075298892414161999234649, 0.209482141084727828012999174891714,
+])
+_WG = np.array([
+    0.129484966168869693270611432679082, 0.279705391489276667901467771423780,
+    0.381830050505118944950369775488975, 0.417959183673469387755102040816327,
+])
+
+# Nodos completos en [-1, 1] y pesos correspondientes
+_NODOS = np.concatenate([-_XGK[:-1], _XGK[::-1]])
+_PESOS_K = np.concatenate([_WGK[:-1], _WGK[::-1]])
+_PESOS_G = np.zeros(15)
+_PESOS_G[1::2] = np.concatenate([_WG[:-1], _WG[::-1]])
+
+
+class QuadratureError(Exception):
+    """Error producido cuando la cuadratura numérica no puede completarse"""
+
+
+def _evaluar_intervalos(f, izq, der):
+    """
+    Aplica la regla G7-K15 a todos los intervalos en una sola llamada a f.
+
+    Returns:
+        tuple: (estimaciones, errores) por intervalo
+    """
+    centro = 0.5 * (izq + der)
+    radio = 0.5 * (der - izq)
+    puntos = centro[:, None] + radio[:, None] * _NODOS[None, :]
+    valores = np.asarray(f(puntos), dtype=float)
+    valores = np.broadcast_to(valores, puntos.shape)
+
+    no_finitos = ~np.isfinite(valores).all(axis=1)
+    valores = np.where(np.isfinite(valores), valores, 0.0)
+
+    kronrod = radio * (valores @ _PESOS_K)
+    gauss = radio * (valores @ _PESOS_G)
+    errores = np.abs(kronrod - gauss)
+    # Un intervalo con valores no finitos (o cuya suma se desborda) nunca se
+    # considera convergido; un error NaN impediría además subdividirlo
+    errores[no_finitos | ~np.isfinite(errores)] = np.inf
+    return kronrod, errores
+
+
+def _transformar(f, a, b):
+    """Reduce los intervalos infinitos a intervalos finitos por cambio de variable"""
+    if np.isfinite(a) and np.isfinite(b):
+        return f, a, b
+    if np.isfinite(a):
+        # x = a + t / (1 - t), t en [0, 1)
+        return (lambda t: f(a + t / (1 - t)) / (1 - t) ** 2), 0.0, 1.0
+    if np.isfinite(b):
+        # x = b - t / (1 - t), t en [0, 1)
+        return (lambda t: f(b - t / (1 - t)) / (1 - t) ** 2), 0.0, 1.0
+    # x = t / (1 - t^2), t en (-1, 1)
+    return (lambda t: f(t / (1 - t ** 2)) * (1 + t ** 2) / (1 - t ** 2) ** 2), -1.0, 1.0
+
+
+def gauss_kronrod(f, a, b, rel_tol=1e-10, abs_tol=1e-12, max_intervals=500):
+    """
+    Integra numéricamente f en [a, b] con Gauss-Kronrod adaptativo.
+
+    En cada iteración se subdividen a la vez todos los intervalos cuyo error
+    supera su parte proporcional de la tolerancia, evaluando f sobre un único
+    arreglo de NumPy.
+
+    Args:
+        f: Función vectorizada (por ejemplo, el resultado de lambdify)
+        a: Límite inferior (puede ser -inf)
+        b: Límite superior (puede ser inf)
+        rel_tol: Tolerancia relativa objetivo
+        abs_tol: Tolerancia absoluta objetivo
+        max_intervals: Número máximo de subintervalos
+
+    Returns:
+        tuple: (valor, error_estimado, convergió); convergió es False si se
+        agotaron los subintervalos antes de alcanzar la tolerancia
+    """
+    a = float(a)
+    b = float(b)
+    if a == b:
+        return 0.0, 0.0, True
+    signo = 1.0
+    if a > b:
+        a, b, signo = b, a, -1.0
+
+    g, a, b = _transformar(f, a, b)
+
+    izq = np.array([a])
+    der = np.array([b])
+    with np.errstate(all="ignore"):
+        estim, errores = _evaluar_intervalos(g, izq, der)
+        while True:
+            total = estim.sum()
+            error = errores.sum()
+            tolerancia = max(abs_tol, rel_tol * abs(total))
+            if error <= tolerancia or len(izq) >= max_intervals:
+                break
+
+            # Subdividir los intervalos que exceden su parte de la tolerancia
+            dividir = errores > tolerancia / len(izq)
+            espacio = max_intervals - len(izq)
+            if dividir.sum() > espacio:
+                peores = np.argsort(errores)[::-1][:espacio]
+                dividir = np.zeros_like(dividir)
+                dividir[peores] = True
+
+            medio = 0.5 * (izq[dividir] + der[dividir])
+            nuevos_izq = np.concatenate([izq[dividir], medio])
+            nuevos_der = np.concatenate([medio, der[dividir]])
+            nuevos_estim, nuevos_err = _evaluar_intervalos(g, nuevos_izq, nuevos_der)
+
+            conservar = ~dividir
+            izq = np.concatenate([izq[conservar], nuevos_izq])
+            der = np.concatenate([der[conservar], nuevos_der])
+            estim = np.concatenate([estim[conservar], nuevos_estim])
+            errores = np.concatenate([errores[conservar], nuevos_err])
+
+    if not np.isfinite(total):
+        raise QuadratureError("La integral numérica no converge")
+    return signo * float(total), float(error), bool(error <= tolerancia)
+
+
+def _integrar_tramos(f, izq, der, params, rel_tol, abs_tol, max_intervals):
+    """
+    Gauss-Kronrod adaptativo para muchos tramos independientes a la vez.
+
+    Cada tramo k integra f(x, *[p[k] for p in params]) en [izq[k], der[k]];
+    los subintervalos de todos los tramos se evalúan juntos en una sola
+    llamada a f por iteración, y cada tramo se subdivide hasta alcanzar su
+    propia tolerancia.
+
+    Returns:
+        tuple: (estimaciones, errores) por tramo
+    """
+    m = len(izq)
+    ancho_tramo = der - izq
+    dueno = np.arange(m)
+
+    def evaluar(izq_i, der_i, dueno_i):
+        columnas = [p[dueno_i][:, None] for p in params]
+        return _evaluar_intervalos(lambda x: f(x, *columnas), izq_i, der_i)
+
+    i_izq, i_der = izq.copy(), der.copy()
+    with np.errstate(all="ignore"):
+        estim, errores = evaluar(i_izq, i_der, dueno)
+        while True:
+            total = np.bincount(dueno, estim, minlength=m)
+            error = np.bincount(dueno, errores, minlength=m)
+            tolerancia = np.maximum(abs_tol, rel_tol * np.abs(total))
+            pendientes = error > tolerancia
+            espacio = max_intervals - len(i_izq)
+            if not pendientes.any() or espacio <= 0:
+                break
+
+            # En los tramos pendientes, subdividir los intervalos que exceden
+            # la parte de la tolerancia que les corresponde por su ancho
+            parte = tolerancia[dueno] * (i_der - i_izq) / ancho_tramo[dueno]
+            dividir = pendientes[dueno] & (errores > parte)
+            if not dividir.any():
+                dividir = pendientes[dueno]
+            if dividir.sum() > espacio:
+                peores = np.argsort(np.where(dividir, errores, -1.0))[::-1][:espacio]
+                dividir = np.zeros_like(dividir)
+                dividir[peores] = True
+
+            medio = 0.5 * (i_izq[dividir] + i_der[dividir])
+            nuevos_izq = np.concatenate([i_izq[dividir], medio])
+            nuevos_der = np.concatenate([medio, i_der[dividir]])
+            nuevos_dueno = np.concatenate([dueno[dividir], dueno[dividir]])
+            nuevos_estim, nuevos_err = evaluar(nuevos_izq, nuevos_der, nuevos_dueno)
+
+            conservar = ~dividir
+            i_izq = np.concatenate([i_izq[conservar], nuevos_izq])
+            i_der = np.concatenate([i_der[conservar], nuevos_der])
+            dueno = np.concatenate([dueno[conservar], nuevos_dueno])
+            estim = np.concatenate([estim[conservar], nuevos_estim])
+            errores = np.concatenate([errores[conservar], nuevos_err])
+    return total, error
+
+
+def cumulative_gauss_kronrod(f, a, b, params=(), rel_tol=1e-10, abs_tol=1e-12, max_intervals=200_000):
+    """
+    Integra f(x, *p_i) en [a_i, b_i] (límites finitos) para muchos puntos i a la vez.
+
+    Los puntos con los mismos parámetros comparten el trabajo: sus límites se
+    ordenan, se integra cada tramo entre dos límites consecutivos y cada
+    integral sale de la suma acumulada de los tramos, así que F(b) para
+    miles de b cuesta casi lo mismo que la integral hasta el mayor de
+    ellos. Los tramos de todos los grupos se integran juntos (ver
+    _integrar_tramos).
+
+    Args:
+        f: Función vectorizada f(x, *params)
+        a: Arreglo (n,) de límites inferiores
+        b: Arreglo (n,) de límites superiores
+        params: Secuencia de arreglos (n,), uno por parámetro
+
+    Returns:
+        tuple: (valores, errores) arreglos (n,), con NaN donde la integral no converge
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    params = [np.asarray(p, dtype=float) for p in params]
+    n = len(a)
+    if params:
+        _, grupo = np.unique(np.stack(params, axis=1), axis=0, return_inverse=True)
+        grupo = grupo.ravel()
+    else:
+        grupo = np.zeros(n, dtype=int)
+
+    # Límites distintos de cada grupo, ordenados por (grupo, límite)
+    claves = np.concatenate([grupo, grupo])
+    limites = np.concatenate([a, b])
+    orden = np.lexsort((limites, claves))
+    g_orden, l_orden = claves[orden], limites[orden]
+    nuevo = np.ones(len(orden), dtype=bool)
+    nuevo[1:] = (g_orden[1:] != g_orden[:-1]) | (l_orden[1:] != l_orden[:-1])
+    g_puntos, l_puntos = g_orden[nuevo], l_orden[nuevo]
+    posicion = np.empty(len(orden), dtype=int)
+    posicion[orden] = np.cumsum(nuevo) - 1
+    pos_a, pos_b = posicion[:n], posicion[n:]
+
+    # Tramos entre límites consecutivos del mismo grupo
+    mismo = g_puntos[1:] == g_puntos[:-1]
+    representante = np.empty(grupo.max() + 1, dtype=int)
+    representante[grupo] = np.arange(n)
+    params_tramo = [p[representante[g_puntos[:-1][mismo]]] for p in params]
+    estim, error = _integrar_tramos(f, l_puntos[:-1][mismo], l_puntos[1:][mismo], params_tramo,
+                                    rel_tol, abs_tol, max_intervals)
+
+    # Sumas acumuladas por grupo (un tramo no finito invalida los puntos que lo cruzan)
+    malos = ~np.isfinite(estim) | ~np.isfinite(error)
+    aporte = np.zeros((3, len(l_puntos)))
+    aporte[0, 1:][mismo] = np.where(malos, 0.0, estim)
+    aporte[1, 1:][mismo] = np.where(malos, 0.0, error)
+    aporte[2, 1:][mismo] = malos
+    acumulado = np.cumsum(aporte, axis=1)
+    inicio = np.maximum.accumulate(np.where(np.concatenate([[True], ~mismo]), np.arange(len(l_puntos)), 0))
+    acumulado -= acumulado[:, inicio]
+
+    valores = acumulado[0, pos_b] - acumulado[0, pos_a]
+    errores = np.abs(acumulado[1, pos_b] - acumulado[1, pos_a])
+    invalidos = acumulado[2, pos_b] != acumulado[2, pos_a]
+    valores[invalidos] = np.nan
+    errores[invalidos] = np.nan
+    return valores, errores
+
+
+def gauss_kronrod_many(f, a, b, params=(), rel_tol=1e-10, abs_tol=1e-12, max_intervals=200_000):
+    """
+    Como cumulative_gauss_kronrod, pero sin compartir tramos: cada punto se
+    integra por separado y sus límites pueden ser infinitos (con el mismo
+    cambio de variable que gauss_kronrod, elegido punto a punto).
+
+    Returns:
+        tuple: (valores, errores) arreglos (n,), con NaN donde la integral no converge
+    """
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    params = [np.asarray(p, dtype=float) for p in params]
+    signo = np.where(a > b, -1.0, 1.0)
+    inferior, superior = np.minimum(a, b), np.maximum(a, b)
+    fin_inf, fin_sup = np.isfinite(inferior), np.isfinite(superior)
+    # 0: [a, b]; 1: [a, ∞); 2: (-∞, b]; 3: (-∞, ∞)
+    tipo = np.select([fin_inf & fin_sup, fin_inf, fin_sup], [0, 1, 2], 3).astype(float)
+    extremo = np.where(fin_inf, inferior, np.where(fin_sup, superior, 0.0))
+    izq = np.where(tipo == 0, inferior, np.where(tipo == 3, -1.0, 0.0))
+    der = np.where(tipo == 0, superior, 1.0)
+
+    def g(t, tipo, extremo, *p):
+        s = t / (1 - t)
+        x = np.select([tipo == 0, tipo == 1, tipo == 2], [t, extremo + s, extremo - s], t / (1 - t ** 2))
+        jacobiano = np.select([tipo == 0, tipo == 1, tipo == 2], [1.0, 1 / (1 - t) ** 2, 1 / (1 - t) ** 2],
+                              (1 + t ** 2) / (1 - t ** 2) ** 2)
+        return f(x, *p) * jacobiano
+
+    valores, errores = _integrar_tramos(g, izq, der, [tipo, extremo] + params, rel_tol, abs_tol, max_intervals)
+    malos = ~np.isfinite(valores) | ~np.isfinite(errores)
+    valores = np.where(malos, np.nan, signo * valores)
+    errores = np.where(malos, np.nan, errores)
+    return valores, errores
+
+
+# mpmath fija la precisión de trabajo en un contexto global: una integración
+# de precisión arbitraria a la vez por proceso
+_bloqueo_mpmath = threading.Lock()
+
+
+@contextmanager
+def mpmath_precision(dps, deadline=None):
+    """
+    mpmath.workdps(dps) con el candado de mpmath tomado, para que otro hilo
+    no cambie la precisión global en medio del bloque.
+
+    Raises:
+        QuadratureError: Si el candado no se libera antes de deadline
+    """
+    if not _bloqueo_mpmath.acquire(timeout=max(0.0, deadline - time.monotonic()) if deadline else -1):
+        raise QuadratureError("No hay capacidad para integrar con precisión arbitraria")
+    try:
+        with mpmath.workdps(dps):
+            yield
+    finally:
+        _bloqueo_mpmath.release()
+
+
+def tanh_sinh_precise(f, a, b, digits, deadline=None, estimates=None):
+    """
+    Integra f con ``digits`` dígitos significativos con la cuadratura
+    tanh-sinh de mpmath, escalando la precisión.
+
+    mpmath estima el error comparando los dos últimos niveles de la regla;
+    si no queda por debajo de 10^-digits (relativo), cada ronda siguiente
+    sube la precisión de trabajo y el grado máximo, y el error pasa a incluir
+    también la diferencia con la ronda anterior. Entre
+    rondas se respeta ``deadline`` (time.monotonic()); cada estimación se
+    agrega a ``estimates`` para que quien interrumpa el cálculo pueda
+    quedarse con la mejor.
+
+    Args:
+        f: Función escalar de mpmath (lambdify con modules="mpmath")
+        a, b: Límites como mpf o ±mpmath.inf
+        digits: Dígitos significativos pedidos
+
+    Returns:
+        tuple: (valor, error_estimado, convergió), valor y error como mpf
+    """
+    estimates = [] if estimates is None else estimates
+    guarda = 10 + digits // 10
+    if not _bloqueo_mpmath.acquire(timeout=max(0.0, deadline - time.monotonic()) if deadline else -1):
+        raise QuadratureError("No hay capacidad para integrar con precisión arbitraria")
+    try:
+        anterior = None
+        ronda = 0
+        while True:
+            with mpmath.workdps(digits + guarda * (ronda + 1)):
+                grado = int(4 + max(0, mpmath.log(mpmath.mp.prec / 30.0, 2))) + 2 + ronda
+                valor, error = mpmath.quad(f, [a, b], method="tanh-sinh", error=True, maxdegree=grado)
+                if anterior is not None:
+                    error = max(error, abs(valor - anterior))
+                tolerancia = mpmath.mpf(10) ** (-digits) * max(1, abs(valor))
+                convergio = error <= tolerancia
+                estimates.append((valor, error, convergio))
+            if convergio or (deadline is not None and time.monotonic() >= deadline) or ronda >= 6:
+                return valor, error, convergio
+            anterior = valor
+            ronda += 1
+    finally:
+        _bloqueo_mpmath.release()
@@ -0,0 +1,169 @@
+# graficas.py - Renderizado de gráficas con la API orientada a objetos de matplotlib
+import io
+import queue
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+
+# Estilo de la gráfica de la integral
+COLOR_CURVA = '#3498db'
+COLOR_LIMITES = 'red'
+COLOR_ACUMULADA = '#e67e22'
+TAMANO_FIGURA = (8, 6)
+# Identifica el estilo en las claves del almacén de imágenes
+ESTILO = f"{COLOR_CURVA}|{COLOR_LIMITES}|{COLOR_ACUMULADA}|{TAMANO_FIGURA}"
+
+
+_matplotlib = None
+_matplotlib_lock = threading.Lock()
+
+
+def _cargar_matplotlib():
+    """
+    Importa matplotlib al primer renderizado (cuesta casi medio segundo): los
+    procesos que nunca grafican, o que solo envían datos, no lo pagan.
+
+    Returns:
+        tuple: (Figure, FigureCanvasAgg)
+    """
+    global _matplotlib
+    with _matplotlib_lock:
+        if _matplotlib is None:
+            import matplotlib
+            # Backend sin interfaz gráfica, fijado antes de cualquier uso de matplotlib
+            matplotlib.use("Agg")
+            from matplotlib.backends.backend_agg import FigureCanvasAgg
+            from matplotlib.figure import Figure
+            _matplotlib = (Figure, FigureCanvasAgg)
+    return _matplotlib
+
+
+def _crear_plantilla():
+    """Crea una figura con ejes, títulos y cuadrícula ya configurados"""
+    Figure, FigureCanvasAgg = _cargar_matplotlib()
+    fig = Figure(figsize=TAMANO_FIGURA)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+    ax.set_title('Gráfica de la función y área de la integral')
+    ax.set_xlabel('x')
+    ax.set_ylabel('f(x)')
+    ax.grid(True, linestyle=':', alpha=0.6)
+    return fig, ax
+
+
+def _limpiar(ax):
+    """Quita los datos de una figura usada y conserva su estilo"""
+    for artista in list(ax.lines) + list(ax.collections):
+        artista.remove()
+    leyenda = ax.get_legend()
+    if leyenda is not None:
+        leyenda.remove()
+    # set_ylim desactiva el autoescalado; la siguiente gráfica lo necesita
+    ax.set_autoscale_on(True)
+
+
+def _percentiles_ponderados(x, y, qs):
+    """
+    Percentiles de y ponderados por el ancho de x que representa cada punto,
+    para que las zonas muy muestreadas (cerca de los polos) no dominen.
+    """
+    pesos = np.gradient(x) if len(x) > 1 else np.ones_like(x)
+    validos = np.isfinite(y)
+    orden = np.argsort(y[validos])
+    y_ordenada = y[validos][orden]
+    acumulado = np.cumsum(pesos[validos][orden])
+    acumulado /= acumulado[-1]
+    return [y_ordenada[min(np.searchsorted(acumulado, q / 100), len(y_ordenada) - 1)] for q in qs]
+
+
+def _limitar_eje_y(ax, x_range, *series):
+    """
+    Evita que los valores enormes cerca de un polo aplasten el resto de las
+    curvas (todas muestreadas en x_range).
+    """
+    x = np.asarray(x_range, dtype=float)
+    series = [np.asarray(y, dtype=float) for y in series]
+    series = [y for y in series if np.isfinite(y).any()]
+    if not series:
+        return
+    percentiles = np.array([_percentiles_ponderados(x, y, [2, 98]) for y in series])
+    bajo, alto = percentiles[:, 0].min(), percentiles[:, 1].max()
+    amplitud = max(alto - bajo, 1e-12)
+    if min(np.nanmin(y) for y in series) < bajo - 10 * amplitud \
+            or max(np.nanmax(y) for y in series) > alto + 10 * amplitud:
+        margen = 0.25 * amplitud
+        ax.set_ylim(min(bajo, 0) - margen, max(alto, 0) + margen)
+
+
+class FigurePool:
+    """
+    Pool de figuras ya estilizadas.
+
+    Cada figura la usa un solo hilo a la vez, por lo que varios renderizados
+    concurrentes no comparten estado (a diferencia de ``pyplot``).
+    """
+
+    def __init__(self, size=4):
+        self.size = size
+        self._libres = queue.LifoQueue()
+
+    @contextmanager
+    def figura(self):
+        """Presta una figura limpia; siempre se limpia y se devuelve al pool"""
+        try:
+            fig, ax = self._libres.get_nowait()
+        except queue.Empty:
+            fig, ax = _crear_plantilla()
+        try:
+            yield fig, ax
+        finally:
+            _limpiar(ax)
+            if self._libres.qsize() < self.size:
+                self._libres.put((fig, ax))
+
+
+_pool_figuras = FigurePool()
+
+
+def render_integral_plot(x_range, y_range, x_integral, y_integral, a, b, etiqueta, formato='png',
+                         acumulada=None):
+    """
+    Dibuja la función, el área de la integral y los límites.
+
+    Args:
+        x_range, y_range: Puntos de la curva completa
+        x_integral, y_integral: Puntos del área entre a y b
+        a: Límite inferior de la integral
+        b: Límite superior de la integral
+        etiqueta: Texto de la leyenda de la curva
+        formato: Formato de salida de matplotlib ('png' o 'svg')
+        acumulada: Valores opcionales de F(x) = ∫_a^x f en los puntos x_range
+
+    Returns:
+        bytes: La imagen codificada
+    """
+    with _pool_figuras.figura() as (fig, ax):
+        # Graficar la función completa
+        ax.plot(x_range, y_range, label=etiqueta, color=COLOR_CURVA)
+
+        # Rellenar el área bajo la curva
+        ax.fill_between(x_integral, y_integral, color=COLOR_CURVA, alpha=0.3, label='Área de la integral')
+
+        # Límites de la integral
+        ax.axvline(x=a, color=COLOR_LIMITES, linestyle='--', label=f'x = {a}')
+        ax.axvline(x=b, color=COLOR_LIMITES, linestyle='--', label=f'x = {b}')
+
+        # Integral acumulada, con NaN fuera del tramo donde existe
+        if acumulada is not None:
+            ax.plot(x_range, acumulada, color=COLOR_ACUMULADA, linestyle='-.',
+                    label=r'$F(x) = \int_a^x f(t)\,dt$')
+
+        ax.relim()
+        ax.autoscale_view()
+        _limitar_eje_y(ax, x_range, y_range, *([] if acumulada is None else [acumulada]))
+        ax.legend()
+
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=formato)
+        return buffer.getvalue()
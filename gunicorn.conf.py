@@ -0,0 +1,80 @@
+# gunicorn.conf.py - Configuración de producción: gunicorn -c gunicorn.conf.py app:app
+#
+# La aplicación se importa una sola vez en el proceso maestro, antes del
+# fork, y los workers heredan ese estado (copy-on-write). Sin pool también se
+# calienta ahí (cálculos y gráficas de prueba); con pool, los workers web no
+# analizan ni integran nada y se calientan los procesos del pool.
+#
+# El tamaño se deriva del número de CPUs y del pool de procesos de cálculo:
+# - Con pool (CALCULADORA_PROCESOS > 0), el trabajo pesado ocurre en los
+#   procesos del pool y los workers de gunicorn casi solo esperan: workers
+#   gthread, tantos como para que workers × procesos ≈ CPUs, con hilos
+#   suficientes para llenar su pool y su cola, y para sondeos y eventos.
+# - Sin pool, cada worker calcula: workers sync, uno por CPU (en el hilo
+#   principal el presupuesto simbólico se interrumpe con SIGALRM).
+#
+# Los trabajos asíncronos guardan su estado en un directorio compartido (ver
+# app.trabajos), así que /resultado/<id> puede llegar a cualquier worker.
+#
+# Todo se puede ajustar con variables de entorno (ver más abajo) o con las
+# opciones de la línea de comandos, que tienen prioridad.
+import os
+
+_cpus = os.cpu_count() or 1
+_procesos = int(os.environ.get('CALCULADORA_PROCESOS', 2))
+_cola = int(os.environ.get('CALCULADORA_COLA_MAXIMA', 8))
+_tiempo_tarea = float(os.environ.get('CALCULADORA_TIEMPO_TAREA', 30))
+
+bind = os.environ.get('CALCULADORA_DIRECCION', '127.0.0.1:8000')
+
+worker_class = os.environ.get('CALCULADORA_GUNICORN_CLASE', 'gthread' if _procesos > 0 else 'sync')
+workers = int(os.environ.get('CALCULADORA_GUNICORN_WORKERS', max(1, _cpus // max(_procesos, 1))))
+threads = int(os.environ.get('CALCULADORA_GUNICORN_HILOS', _procesos + _cola + 4 if worker_class == 'gthread' else 1))
+
+preload_app = True
+
+# Las cachés internas de SymPy las acota el gobernador de memoria de cada
+# proceso (CALCULADORA_LIMPIEZA_MB, CALCULADORA_LIMPIEZA_CADA); reciclar los
+# workers (y con ellos su pool) es la red de seguridad para cualquier otra
+# fuga. El jitter evita que todos se reinicien a la vez
+max_requests = int(os.environ.get('CALCULADORA_GUNICORN_MAX_PETICIONES', 1000))
+max_requests_jitter = max(1, max_requests // 10) if max_requests else 0
+
+# Un cálculo puede tardar hasta el tiempo máximo de la tarea; el worker no
+# debe darse por colgado antes, y al apagarse se le deja terminar lo que tenga
+timeout = int(_tiempo_tarea + 15)
+graceful_timeout = int(_tiempo_tarea + 5)
+keepalive = 5
+
+# Latido de los workers en memoria: un disco lento no los hace parecer colgados
+if os.path.isdir('/dev/shm'):
+    worker_tmp_dir = '/dev/shm'
+
+accesslog = os.environ.get('CALCULADORA_GUNICORN_ACCESOS') or None
+errorlog = '-'
+
+
+def when_ready(server):
+    """Corre en el maestro, con la aplicación ya importada y antes de crear los workers"""
+    import app
+    import tareas
+    if app.pool is None:
+        server.log.info("Precalentando SymPy y matplotlib antes del fork")
+    else:
+        # Con pool los workers web no calculan: se calientan los procesos del pool
+        server.log.info("Congelando el heap del maestro antes del fork")
+    tareas.precalentar(calcular=app.pool is None)
+
+
+def post_worker_init(worker):
+    """Arranca el pool de procesos de cada worker para que se caliente antes de la primera petición"""
+    import app
+    if app.pool is not None:
+        app.pool.start()
+
+
+def worker_exit(server, worker):
+    """Detiene los procesos del pool al reciclar o apagar el worker"""
+    import app
+    if app.pool is not None:
+        app.pool.shutdown()
@@ -0,0 +1,318 @@
+# integracion_rapida.py - Integrador por reglas para las formas más comunes
+import threading
+
+from sympy import Add, Mul, Poly, S, atan, cos, exp, log, sin, sqrt, tan
+from sympy.core.function import expand_mul
+
+
+class FastIntegrator:
+    """
+    Integra por tabla las formas habituales antes de recurrir a ``integrate``.
+
+    Los polinomios se integran directamente como ``Poly`` (aritmética en el
+    dominio de los coeficientes, sin el motor de suposiciones) hasta el grado
+    ``max_polynomial_degree``: expandir uno de grado mayor, como
+    (3x + 7)^1000, lleva segundos, y esta vía no tiene presupuesto de
+    tiempo. Los de más grado siguen por las reglas de los términos. El resto se
+    pre-simplifica (se distribuyen los productos sobre las sumas y se expanden
+    potencias pequeñas de polinomios) y se integra término a término: cada
+    término, sin su coeficiente constante, debe coincidir con alguna regla de
+    ``REGLAS``. Si uno solo no coincide, el resultado es None y la integral
+    sigue por SymPy.
+
+    Además de la antiderivada, cada regla informa de los polos reales de f y
+    de F; así la integral definida no necesita ``singularities`` (que es
+    costoso). Cuando no se conocen (por ejemplo, tan), se devuelve None.
+    """
+
+    # Grado máximo de los polinomios que se expanden o integran por partes
+    MAX_DEGREE = 12
+
+    def __init__(self, max_polynomial_degree=200):
+        self.max_polynomial_degree = max_polynomial_degree
+        self._lock = threading.Lock()
+        self.rule_hits = {"polinomio": 0}
+        self.rule_hits.update((name, 0) for name, _ in REGLAS)
+        self.resolved = 0
+        self.fallbacks = 0
+
+    def antiderivative(self, expr, x):
+        """
+        Busca la antiderivada de expr con las reglas de la tabla.
+
+        Returns:
+            tuple: (antiderivada, polos) donde polos es una lista de los puntos
+            singulares reales de f y F (None si no se conocen), o None si
+            alguna parte de expr no está cubierta por las reglas
+        """
+        if expr.is_polynomial(x) and _degree_bound(expr, x) <= self.max_polynomial_degree:
+            with self._lock:
+                self.resolved += 1
+                self.rule_hits["polinomio"] += 1
+            return Poly(expr, x).integrate().as_expr(), []
+
+        terms = Add.make_args(self._presimplify(expr, x))
+        parts = []
+        points = []
+        used = []
+        for term in terms:
+            found = self._integrate_term(term, x)
+            if found is None:
+                with self._lock:
+                    self.fallbacks += 1
+                return None
+            name, antiderivative, term_points = found
+            parts.append(antiderivative)
+            used.append(name)
+            if points is not None:
+                points = None if term_points is None else points + term_points
+        with self._lock:
+            self.resolved += 1
+            for name in used:
+                self.rule_hits[name] += 1
+        return Add(*parts), None if points is None else list(dict.fromkeys(points))
+
+    def stats(self):
+        """Devuelve los contadores del integrador por reglas"""
+        with self._lock:
+            total = self.resolved + self.fallbacks
+            return {
+                "resueltas": self.resolved,
+                "respaldos_sympy": self.fallbacks,
+                "tasa_aciertos": self.resolved / total if total else 0.0,
+                "reglas": dict(self.rule_hits),
+            }
+
+    def _presimplify(self, expr, x):
+        """Distribuye productos sobre sumas y expande potencias enteras pequeñas de polinomios"""
+        # Solo hace falta distribuir si algún producto contiene una suma
+        if any(factor.is_Add for term in Add.make_args(expr) for factor in Mul.make_args(term)):
+            expr = expand_mul(expr)
+        expanded = []
+        for term in Add.make_args(expr):
+            factors = Mul.make_args(term)
+            # (a*x + b)^n sola la cubre su regla; dentro de un producto se expande
+            alone = len(factors) == 1
+            if any(self._expandable(factor, x, alone) for factor in factors):
+                term = expand_mul(Mul(*[
+                    factor.expand(deep=False) if self._expandable(factor, x, alone) else factor
+                    for factor in factors
+                ]))
+            expanded.append(term)
+        return Add(*expanded)
+
+    def _expandable(self, factor, x, alone):
+        return (factor.is_Pow and factor.base.is_Add and factor.exp.is_Integer
+                and 1 < factor.exp <= self.MAX_DEGREE and factor.base.is_polynomial(x)
+                and not (alone and _linear(factor.base, x) is not None))
+
+    def _integrate_term(self, term, x):
+        coefficient, rest = term.as_independent(x, as_Add=False)
+        for name, rule in REGLAS:
+            found = rule(rest, x)
+            if found is not None:
+                antiderivative, points = found
+                return name, coefficient * antiderivative, points
+        return None
+
+
+def _degree_bound(expr, x):
+    """Cota del grado en x de un polinomio, sin expandirlo"""
+    if not expr.has(x):
+        return 0
+    if expr == x:
+        return 1
+    if expr.is_Add:
+        return max(_degree_bound(arg, x) for arg in expr.args)
+    if expr.is_Mul:
+        return sum(_degree_bound(arg, x) for arg in expr.args)
+    if expr.is_Pow and expr.exp.is_Integer and expr.exp > 0:
+        return int(expr.exp) * _degree_bound(expr.base, x)
+    return float('inf')
+
+
+def _linear(expr, x):
+    """Devuelve (a, b) si expr = a*x + b con a, b constantes y a != 0; si no, None"""
+    if expr == x:
+        return S.One, S.Zero
+    b, ax = expr.as_independent(x, as_Add=True)
+    a, rest = ax.as_independent(x, as_Add=False)
+    if rest != x or a == 0:
+        return None
+    return a, b
+
+
+# --- Reglas: cada una recibe el término sin coeficiente y devuelve (F, polos) o None ---
+
+def _constante(term, x):
+    if term == 1:
+        return x, []
+    return None
+
+
+def _potencia_lineal(term, x):
+    """(a*x + b)^n, incluido x^n y 1/(x + c)"""
+    if term.is_Pow:
+        base, n = term.base, term.exp
+    else:
+        base, n = term, S.One
+    if n.has(x):
+        return None
+    linear = _linear(base, x)
+    if linear is None:
+        return None
+    a, b = linear
+    pole = -b / a
+    if n == -1:
+        return log(base) / a, [pole]
+    if n.is_nonnegative:
+        points = []
+    elif n.is_negative:
+        points = [pole]
+    else:
+        points = None
+    return base ** (n + 1) / (a * (n + 1)), points
+
+
+def _trigonometrica(term, x):
+    """sin(a*x + b), cos(a*x + b) y tan(a*x + b)"""
+    if not isinstance(term, (sin, cos, tan)):
+        return None
+    linear = _linear(term.args[0], x)
+    if linear is None:
+        return None
+    a = linear[0]
+    u = term.args[0]
+    if isinstance(term, sin):
+        return -cos(u) / a, []
+    if isinstance(term, cos):
+        return sin(u) / a, []
+    # Los polos de tan son infinitos: se deja que los busque singularities
+    return -log(cos(u)) / a, None
+
+
+def _logaritmo(term, x):
+    """log(a*x + b)"""
+    if not isinstance(term, log) or len(term.args) != 1:
+        return None
+    linear = _linear(term.args[0], x)
+    if linear is None:
+        return None
+    a, b = linear
+    u = term.args[0]
+    return (u * log(u) - u) / a, [-b / a]
+
+
+def _arcotangente(term, x):
+    """1/(a*x^2 + c) con a, c > 0"""
+    if not (term.is_Pow and term.exp == -1 and term.base.is_Add):
+        return None
+    c, ax2 = term.base.as_independent(x, as_Add=True)
+    a, rest = ax2.as_independent(x, as_Add=False)
+    if rest != x ** 2 or not (a.is_positive and c.is_positive):
+        return None
+    return atan(x * sqrt(a / c)) / sqrt(a * c), []
+
+
+def _exponencial(term, x):
+    """exp(a*x + b) y c^(a*x + b) con c constante"""
+    found = _exponential_parts(term, x)
+    if found is None:
+        return None
+    a, growth = found
+    return term / (a * growth), []
+
+
+def _polinomio_por_funcion(term, x):
+    """P(x)·g(a*x + b) con g exponencial, seno o coseno (integración por partes tabular)"""
+    if not term.is_Mul:
+        return None
+    polynomial = []
+    function = None
+    for factor in term.args:
+        if factor.is_polynomial(x):
+            polynomial.append(factor)
+        elif function is None and (isinstance(factor, (sin, cos)) or _exponential_parts(factor, x)):
+            function = factor
+        else:
+            return None
+    if function is None:
+        return None
+    p = Mul(*polynomial)
+    if p.as_poly(x).degree() > FastIntegrator.MAX_DEGREE:
+        return None
+    if isinstance(function, (sin, cos)):
+        linear = _linear(function.args[0], x)
+        if linear is None:
+            return None
+        repeated = _trig_antiderivatives(function, linear[0])
+    else:
+        a, growth = _exponential_parts(function, x)
+        repeated = (function / (a * growth) ** (k + 1) for k in range(FastIntegrator.MAX_DEGREE + 1))
+    # ∫ P·g = Σ (-1)^k P^(k) G_(k+1), con G_j la j-ésima antiderivada de g
+    parts = []
+    sign = 1
+    for g_k in repeated:
+        if p == 0:
+            break
+        parts.append(sign * p * g_k)
+        p = p.diff(x)
+        sign = -sign
+    return Add(*parts), []
+
+
+def _exponencial_por_trigonometrica(term, x):
+    """exp(a*x + b)·sin(c*x + d) y exp(a*x + b)·cos(c*x + d)"""
+    if not term.is_Mul or len(term.args) != 2:
+        return None
+    first, second = term.args
+    if isinstance(first, (sin, cos)):
+        first, second = second, first
+    if not isinstance(second, (sin, cos)):
+        return None
+    found = _exponential_parts(first, x)
+    trig_linear = _linear(second.args[0], x)
+    if found is None or trig_linear is None:
+        return None
+    a, growth = found
+    a = a * growth
+    c = trig_linear[0]
+    u = second.args[0]
+    if isinstance(second, sin):
+        result = first * (a * sin(u) - c * cos(u)) / (a ** 2 + c ** 2)
+    else:
+        result = first * (a * cos(u) + c * sin(u)) / (a ** 2 + c ** 2)
+    return result, []
+
+
+def _exponential_parts(term, x):
+    """Para exp(a*x + b) o c^(a*x + b) devuelve (a, log(c)); si no, None"""
+    if isinstance(term, exp):
+        linear = _linear(term.args[0], x)
+        return None if linear is None else (linear[0], S.One)
+    if term.is_Pow and not term.base.has(x) and term.base.is_positive and term.base != 1:
+        linear = _linear(term.exp, x)
+        return None if linear is None else (linear[0], log(term.base))
+    return None
+
+
+def _trig_antiderivatives(function, a):
+    """Antiderivadas sucesivas de sin(u) o cos(u), con u = a*x + b"""
+    u = function.args[0]
+    cycle = [-cos(u), -sin(u), cos(u), sin(u)] if isinstance(function, sin) else \
+        [sin(u), -cos(u), -sin(u), cos(u)]
+    for k in range(FastIntegrator.MAX_DEGREE + 1):
+        yield cycle[k % 4] / a ** (k + 1)
+
+
+# Tabla de reglas, en orden de prueba
+REGLAS = [
+    ("constante", _constante),
+    ("potencia", _potencia_lineal),
+    ("trigonometrica", _trigonometrica),
+    ("exponencial", _exponencial),
+    ("logaritmo", _logaritmo),
+    ("arcotangente", _arcotangente),
+    ("polinomio_por_funcion", _polinomio_por_funcion),
+    ("exponencial_por_trigonometrica", _exponencial_por_trigonometrica),
+]
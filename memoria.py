@@ -0,0 +1,107 @@
+# memoria.py - Control de la memoria de los procesos de cálculo (cachés internas de SymPy)
+import ctypes
+import ctypes.util
+import gc
+import threading
+import time
+
+from sympy.core.cache import CACHE, clear_cache
+
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+    _malloc_trim = _libc.malloc_trim
+except (OSError, AttributeError):  # Sin glibc (macOS, musl, Windows)
+    _malloc_trim = None
+
+
+def rss_mb():
+    """Memoria residente actual del proceso, en MB (None si no se puede medir)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * 4096 / 2 ** 20
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def sympy_cache_entries():
+    """Entradas guardadas en todas las cachés ``cacheit`` de SymPy"""
+    return sum(function.cache_info().currsize for function in CACHE)
+
+
+class MemoryGovernor:
+    """
+    Acota la memoria de un proceso de larga vida.
+
+    Cada función de SymPy decorada con ``cacheit`` guarda hasta
+    SYMPY_CACHE_SIZE resultados, y hay más de un centenar: con expresiones
+    siempre distintas la memoria crece durante horas. Tras cada tarea se
+    revisa la memoria residente y, si supera ``max_rss_mb`` o se completaron
+    ``every`` tareas desde la última limpieza, se vacían esas cachés (y las
+    de ``extra``), se recolecta la basura y se devuelve al sistema la memoria
+    libre del montículo.
+
+    Para no limpiar en cada tarea cuando la memoria base ya supera el umbral,
+    entre dos limpiezas por umbral pasan al menos ``min_tasks`` tareas.
+    """
+
+    def __init__(self, max_rss_mb=None, every=None, extra=(), min_tasks=50):
+        self.max_rss_mb = max_rss_mb
+        self.every = every
+        self.extra = list(extra)
+        self.min_tasks = min_tasks
+        self._lock = threading.Lock()
+        self.tasks = 0
+        self.since_clean = 0
+        self.cleanings = {"umbral": 0, "periodica": 0, "manual": 0}
+        self.last = None
+
+    def after_task(self):
+        """Registra una tarea terminada y limpia si corresponde; devuelve el motivo o None"""
+        with self._lock:
+            self.tasks += 1
+            self.since_clean += 1
+            reason = None
+            if self.every and self.since_clean >= self.every:
+                reason = "periodica"
+            elif self.max_rss_mb and self.since_clean >= self.min_tasks:
+                current = rss_mb()
+                if current is not None and current > self.max_rss_mb:
+                    reason = "umbral"
+        if reason is not None:
+            self.clean(reason)
+        return reason
+
+    def clean(self, reason="manual"):
+        """Vacía las cachés y devuelve la memoria libre al sistema"""
+        before_mb = rss_mb()
+        entries = sympy_cache_entries()
+        clear_cache()
+        for clear in self.extra:
+            clear()
+        gc.collect()
+        if _malloc_trim is not None:
+            _malloc_trim(0)
+        with self._lock:
+            self.since_clean = 0
+            self.cleanings[reason] += 1
+            self.last = {
+                "motivo": reason,
+                "momento": time.time(),
+                "antes_mb": before_mb,
+                "despues_mb": rss_mb(),
+                "entradas_sympy": entries,
+            }
+
+    def stats(self):
+        """Tamaños actuales y contadores del gobernador"""
+        with self._lock:
+            return {
+                "rss_mb": rss_mb(),
+                "cache_sympy_entradas": sympy_cache_entries(),
+                "umbral_mb": self.max_rss_mb,
+                "limpiar_cada": self.every,
+                "tareas": self.tasks,
+                "tareas_desde_limpieza": self.since_clean,
+                "limpiezas": dict(self.cleanings),
+                "ultima_limpieza": dict(self.last) if self.last else None,
+            }
@@ -0,0 +1,194 @@
+# metricas.py - Histogramas y contadores en memoria con exposición en formato de texto de Prometheus
+import bisect
+import contextlib
+import contextvars
+import threading
+import time
+
+# Límites (en segundos) de los histogramas de duración
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Tipo y descripción de cada métrica conocida
+METRICAS = {
+    "calculadora_etapa_segundos": ("histogram", "Duración de cada etapa del cálculo y de la gráfica"),
+    "calculadora_peticion_segundos": ("histogram", "Duración de las peticiones HTTP por ruta"),
+    "calculadora_peticiones_total": ("counter", "Peticiones HTTP por ruta y código de respuesta"),
+    "calculadora_errores_total": ("counter", "Errores por origen y tipo de excepción"),
+    "calculadora_cache_total": ("counter", "Consultas a las cachés por resultado (acierto o fallo)"),
+    "calculadora_tiempos_agotados_total": ("counter", "Tiempos máximos agotados por origen"),
+}
+
+_NULL = contextlib.nullcontext()
+
+# Traza del cálculo en curso (ver trace); los hilos que copian el contexto la comparten
+_trace = contextvars.ContextVar("calculadora_traza", default=None)
+
+
+class Trace:
+    """Etapas medidas durante un cálculo concreto y los hilos que las ejecutaron"""
+
+    __slots__ = ("etapas", "hilos")
+
+    def __init__(self):
+        self.etapas = []
+        self.hilos = {threading.get_ident()}
+
+
+@contextlib.contextmanager
+def trace():
+    """
+    Registra en una Trace las etapas que se midan dentro del bloque, aunque
+    las métricas estén desactivadas: ``with trace() as traza: ...``
+    """
+    current = Trace()
+    token = _trace.set(current)
+    try:
+        yield current
+    finally:
+        _trace.reset(token)
+
+
+class _Timer:
+    """Mide una etapa y la registra al salir (también si termina con una excepción)"""
+
+    __slots__ = ("metrics", "etapa", "start", "trace")
+
+    def __init__(self, metrics, etapa):
+        self.metrics = metrics
+        self.etapa = etapa
+
+    def __enter__(self):
+        self.trace = _trace.get()
+        if self.trace is not None:
+            self.trace.hilos.add(threading.get_ident())
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        self.metrics.observe("calculadora_etapa_segundos", elapsed, etapa=self.etapa)
+        if self.trace is not None:
+            self.trace.etapas.append((self.etapa, elapsed))
+        return False
+
+
+class Metrics:
+    """
+    Registro de métricas de un proceso.
+
+    Las duraciones se guardan en histogramas de límites fijos y los eventos
+    (errores, aciertos de caché, tiempos agotados) en contadores, ambos
+    identificados por nombre y etiquetas. Desactivado, ``stage`` devuelve un
+    contexto nulo compartido y ``inc``/``observe`` vuelven de inmediato.
+
+    Los procesos del pool acumulan sus métricas y las entregan con ``drain``
+    tras cada tarea; el proceso web las suma con ``merge``. Con varios workers
+    de gunicorn, cada uno expone solo las suyas.
+    """
+
+    def __init__(self, enabled=True, buckets=BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._counters = {}
+        # (nombre, etiquetas) -> [cuentas por intervalo (no acumuladas)..., suma]
+        self._histograms = {}
+
+    def stage(self, etapa):
+        """Contexto que mide la duración de una etapa: ``with metrics.stage('formato'): ...``"""
+        if not self.enabled and _trace.get() is None:
+            return _NULL
+        return _Timer(self, etapa)
+
+    def observe(self, name, value, **labels):
+        """Registra un valor (en segundos) en un histograma"""
+        if not self.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            histogram[index] += 1
+            histogram[-1] += value
+
+    def inc(self, name, amount=1, **labels):
+        """Incrementa un contador"""
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def drain(self):
+        """Devuelve lo acumulado desde la última llamada y lo reinicia (None si no hay nada)"""
+        with self._lock:
+            if not self._counters and not self._histograms:
+                return None
+            delta = {"contadores": self._counters, "histogramas": self._histograms}
+            self._counters = {}
+            self._histograms = {}
+        return delta
+
+    def merge(self, delta):
+        """Suma las métricas entregadas por otro proceso (resultado de drain)"""
+        if not delta or not self.enabled:
+            return
+        with self._lock:
+            for key, value in delta["contadores"].items():
+                self._counters[key] = self._counters.get(key, 0) + value
+            for key, values in delta["histogramas"].items():
+                histogram = self._histograms.get(key)
+                if histogram is None or len(histogram) != len(values):
+                    self._histograms[key] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        histogram[i] += value
+
+    def render(self, gauges=()):
+        """
+        Texto en el formato de exposición de Prometheus.
+
+        Args:
+            gauges: Iterable de (nombre, descripción, valor) calculados al momento
+        """
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items())
+        lines = []
+        described = set()
+
+        def header(name, kind, text=None):
+            if name not in described:
+                described.add(name)
+                kind, text = METRICAS.get(name, (kind, text or name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{name}{_labels(labels)} {value}")
+        for (name, labels), values in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), values):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {values[-1]!r}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        for name, text, value in gauges:
+            header(name, "gauge", text)
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
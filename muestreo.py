@@ -0,0 +1,116 @@
+# muestreo.py - Muestreo adaptativo de funciones para graficar
+import numpy as np
+
+
+def evaluate(f, xs):
+    """
+    Evalúa f sobre un arreglo y devuelve floats; los valores no reales o no
+    finitos se convierten en NaN.
+    """
+    with np.errstate(all="ignore"):
+        ys = np.broadcast_to(f(xs), np.shape(xs))
+        if np.iscomplexobj(ys):
+            ys = np.where(np.abs(ys.imag) <= 1e-12 * np.maximum(1.0, np.abs(ys.real)), ys.real, np.nan)
+        ys = np.array(ys, dtype=float)
+    ys[~np.isfinite(ys)] = np.nan
+    return ys
+
+
+def _scale(ys):
+    """Escala vertical robusta de la curva (ignora los picos de los polos)"""
+    finite = ys[np.isfinite(ys)]
+    if finite.size == 0:
+        return 1.0
+    low, high = np.percentile(finite, [5, 95])
+    span = high - low
+    if span <= 0:
+        span = np.max(np.abs(finite))
+    return span if span > 0 else 1.0
+
+
+def adaptive_sample(f, start, end, max_points=1000, initial_points=None,
+                    rel_tol=2e-3, max_depth=12, jump_factor=0.25):
+    """
+    Muestrea f en [start, end] refinando donde la curva se aleja de una recta.
+
+    Se parte de una malla gruesa y, en cada pasada, se evalúa de una sola vez
+    el punto medio de todos los intervalos activos; se subdividen aquellos
+    cuyo punto medio se desvía de la interpolación lineal más de
+    ``rel_tol`` veces la escala de la curva. Los intervalos que siguen
+    mostrando un salto grande al agotarse la profundidad se consideran polos
+    o discontinuidades y se separan con un NaN para cortar el trazo.
+
+    Args:
+        f: Función vectorizada (por ejemplo, el resultado de lambdify)
+        start: Inicio del rango
+        end: Fin del rango
+        max_points: Número máximo de puntos evaluados
+
+    Returns:
+        tuple: (xs, ys) con NaN en los cortes entre segmentos
+    """
+    max_points = max(3, int(max_points))
+    # Parte del presupuesto se reserva para los cortes entre segmentos
+    reserve = max(1, max_points // 20)
+    if initial_points is None:
+        initial_points = min(max(17, max_points // 4), max_points)
+    xs = np.linspace(start, end, initial_points)
+    ys = evaluate(f, xs)
+    active = np.ones(len(xs) - 1, dtype=bool)
+
+    for _ in range(max_depth):
+        idx = np.nonzero(active)[0]
+        budget = max_points - reserve - len(xs)
+        if idx.size == 0 or budget <= 0:
+            break
+
+        xm = 0.5 * (xs[idx] + xs[idx + 1])
+        ym = evaluate(f, xm)
+        left, right = ys[idx], ys[idx + 1]
+        finite = np.isfinite(left) & np.isfinite(right) & np.isfinite(ym)
+        known = np.isfinite(left) | np.isfinite(right) | np.isfinite(ym)
+        with np.errstate(invalid="ignore"):
+            error = np.where(finite, np.abs(ym - 0.5 * (left + right)), np.where(known, np.inf, 0.0))
+
+        refine = error > rel_tol * _scale(ys)
+        if refine.sum() > budget:
+            worst = np.argsort(error)[::-1][:budget]
+            refine = np.zeros_like(refine)
+            refine[worst] = True
+        if not refine.any():
+            active[:] = False
+            break
+
+        idx, xm, ym = idx[refine], xm[refine], ym[refine]
+        xs = np.insert(xs, idx + 1, xm)
+        ys = np.insert(ys, idx + 1, ym)
+        # Solo las dos mitades de cada intervalo subdividido siguen activas
+        left_half = idx + np.arange(idx.size)
+        active = np.zeros(len(xs) - 1, dtype=bool)
+        active[left_half] = True
+        active[left_half + 1] = True
+
+    return _split_discontinuities(xs, ys, active, jump_factor * _scale(ys), max_points - len(xs))
+
+
+def _split_discontinuities(xs, ys, unresolved, jump_threshold, max_breaks):
+    """
+    Inserta NaN en los intervalos sin resolver que contienen un polo o un salto.
+
+    Un intervalo se corta si su salto es grande y, además, la función cambia
+    de signo (polo de orden impar) o el salto domina claramente a los de sus
+    vecinos (discontinuidad de salto o polo de orden par).
+    """
+    with np.errstate(invalid="ignore"):
+        jumps = np.abs(np.diff(ys))
+        neighbours = np.maximum(np.concatenate([[0.0], jumps[:-1]]), np.concatenate([jumps[1:], [0.0]]))
+        sign_change = np.sign(ys[:-1]) * np.sign(ys[1:]) < 0
+        dominant = jumps >= 10 * neighbours
+        candidates = unresolved & (jumps > jump_threshold) & (sign_change | dominant)
+    breaks = np.nonzero(candidates)[0]
+    if breaks.size == 0 or max_breaks <= 0:
+        return xs, ys
+    if breaks.size > max_breaks:
+        breaks = np.sort(breaks[np.argsort(jumps[breaks])[::-1][:max_breaks]])
+    xm = 0.5 * (xs[breaks] + xs[breaks + 1])
+    return np.insert(xs, breaks + 1, xm), np.insert(ys, breaks + 1, np.nan)
@@ -0,0 +1,268 @@
+# perfilador.py - Perfilado de los cálculos lentos y registro en disco de los casos capturados
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import re
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from collections import Counter
+
+from metricas import trace
+
+# Identificadores válidos de las entradas del registro (también son nombres de archivo)
+_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def new_id():
+    return uuid.uuid4().hex
+
+
+class StackSampler:
+    """
+    Perfilador estadístico por muestreo de pilas.
+
+    Cada ``interval`` segundos toma la pila de los hilos de ``threads`` (un
+    conjunto que puede crecer mientras se muestrea) y cuenta cada pila
+    completa en el formato "plegado" de los flame graphs (``a;b;c muestras``).
+    Su costo no depende de cuántas llamadas haga SymPy, así que puede quedar
+    activo en todas las peticiones. ``on_tick`` se llama cada ``tick_every``
+    segundos desde el hilo de muestreo.
+    """
+
+    def __init__(self, threads, interval=0.005, on_tick=None, tick_every=1.0):
+        self.threads = threads
+        self.interval = interval
+        self.on_tick = on_tick
+        self.tick_every = tick_every
+        self.samples = 0
+        self._stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="perfilador")
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+    def folded(self):
+        """Pilas plegadas, de la más a la menos frecuente"""
+        with self._lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+    def top(self, n=15):
+        """
+        Las n funciones presentes en más muestras (tiempo inclusivo), como
+        [función, fracción], sin las que están en todas (el camino común hasta fn)
+        """
+        inclusive = Counter()
+        with self._lock:
+            total = sum(self._stacks.values())
+            for stack, count in self._stacks.items():
+                for frame in set(stack.split(";")):
+                    inclusive[frame] += count
+        ranked = [(frame, count) for frame, count in inclusive.most_common() if count < total]
+        return [[frame, round(count / total, 4)] for frame, count in ranked[:n]]
+
+    def _loop(self):
+        me = threading.get_ident()
+        next_tick = time.monotonic() + self.tick_every
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            stacks = [_fold(frames[ident]) for ident in tuple(self.threads)
+                      if ident != me and ident in frames]
+            with self._lock:
+                self._stacks.update(stacks)
+                self.samples += 1
+            if self.on_tick is not None and time.monotonic() >= next_tick:
+                next_tick += self.tick_every
+                self.on_tick(self)
+
+
+_short_names = {}
+
+
+def _short(filename):
+    """Ruta corta de un módulo: desde site-packages, o solo el nombre del archivo"""
+    name = _short_names.get(filename)
+    if name is None:
+        _, found, rest = filename.rpartition("site-packages" + os.sep)
+        name = _short_names[filename] = rest if found else os.path.basename(filename)
+    return name
+
+
+def _fold(frame):
+    labels = []
+    while frame is not None:
+        code = frame.f_code
+        labels.append(f"{_short(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class SlowRequestLog:
+    """
+    Registro en disco, de tamaño acotado, de los cálculos perfilados.
+
+    Cada entrada son dos archivos en ``directory``: ``<id>.json`` con los
+    datos de entrada, la duración total y por etapa y un resumen del perfil,
+    y ``<id>.prof`` (cProfile, legible con pstats o snakeviz) o ``<id>.txt``
+    (pilas plegadas del muestreo). Al superar ``max_entries`` se borran las
+    más antiguas. Varios procesos pueden escribir en el mismo directorio.
+    """
+
+    def __init__(self, directory, max_entries=50):
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+
+    def save(self, entry_id, meta, profile=None, extension="txt"):
+        """Guarda (o reemplaza) una entrada; profile son bytes o texto"""
+        if profile is not None:
+            meta = dict(meta, archivo_perfil=f"{entry_id}.{extension}")
+            self._write(f"{entry_id}.{extension}", profile if isinstance(profile, bytes) else profile.encode("utf-8"))
+        self._write(f"{entry_id}.json", json.dumps(meta, ensure_ascii=False, indent=1, default=str).encode("utf-8"))
+        self._prune()
+
+    def list(self):
+        """Datos de todas las entradas, de la más reciente a la más antigua"""
+        entries = []
+        for name in os.listdir(self.directory):
+            entry_id, extension = os.path.splitext(name)
+            if extension == ".json" and _ID.match(entry_id):
+                meta = self.get(entry_id)
+                if meta is not None:
+                    entries.append(meta)
+        return sorted(entries, key=lambda meta: meta.get("creado", 0), reverse=True)
+
+    def get(self, entry_id):
+        """Datos de una entrada, o None si no existe"""
+        if not _ID.match(entry_id or ""):
+            return None
+        try:
+            with open(os.path.join(self.directory, f"{entry_id}.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def profile_path(self, entry_id):
+        """Ruta del archivo de perfil de una entrada, o None"""
+        meta = self.get(entry_id)
+        if meta is None or not meta.get("archivo_perfil"):
+            return None
+        path = os.path.join(self.directory, os.path.basename(meta["archivo_perfil"]))
+        return path if os.path.exists(path) else None
+
+    def _write(self, name, content):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp_")
+        with os.fdopen(fd, "wb") as tmp:
+            tmp.write(content)
+        os.replace(tmp_path, os.path.join(self.directory, name))
+
+    def _prune(self):
+        try:
+            files = [entry for entry in os.scandir(self.directory) if not entry.name.startswith(".")]
+            by_id = {}
+            for entry in files:
+                entry_id = os.path.splitext(entry.name)[0]
+                by_id.setdefault(entry_id, []).append(entry)
+            if len(by_id) <= self.max_entries:
+                return
+            oldest = sorted(by_id.values(), key=lambda group: max(e.stat().st_mtime for e in group))
+            for group in oldest[:len(by_id) - self.max_entries]:
+                for entry in group:
+                    os.remove(entry.path)
+        except FileNotFoundError:
+            # Otro proceso borró a la vez; basta con que alguno recorte
+            pass
+
+
+def profile_call(fn, log, datos, threshold=5.0, deterministic=False, entry_id=None, interval=0.005):
+    """
+    Ejecuta fn() perfilándola y guarda en log los casos lentos.
+
+    Por defecto perfila por muestreo y solo guarda la entrada si el cálculo
+    tarda al menos ``threshold`` segundos; mientras sigue corriendo pasado el
+    umbral, la entrada se actualiza cada segundo (estado "en_curso"), así que
+    queda registro aunque su proceso se mate por tiempo. Con
+    ``deterministic`` usa cProfile (más preciso y más costoso, solo el hilo
+    que llama) y guarda siempre.
+
+    Returns:
+        El valor devuelto por fn
+    """
+    entry_id = entry_id or new_id()
+    created = time.time()
+    start = time.perf_counter()
+    lock = threading.Lock()
+
+    def save(estado, traza, profile, extension, resumen, error=None):
+        meta = {
+            "id": entry_id, "creado": created, "datos": datos, "estado": estado,
+            "duracion_s": round(time.perf_counter() - start, 4),
+            "etapas": [[etapa, round(segundos, 6)] for etapa, segundos in traza.etapas],
+            "perfil": "cprofile" if deterministic else "muestreo",
+            "resumen": resumen, "error": error, "pid": os.getpid(),
+        }
+        with lock:
+            log.save(entry_id, meta, profile, extension)
+
+    with trace() as traza:
+        if deterministic:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Ya hay otro perfilador determinista activo en este proceso
+                deterministic = False
+        if deterministic:
+            error = None
+            try:
+                return fn()
+            except BaseException as e:
+                error = f"{type(e).__name__}: {e}"
+                raise
+            finally:
+                profiler.disable()
+                save("error" if error else "completado", traza, _marshal_stats(profiler), "prof",
+                     _stats_summary(profiler), error)
+
+        def partial(sampler):
+            if time.perf_counter() - start >= threshold:
+                save("en_curso", traza, sampler.folded(), "txt", sampler.top())
+
+        sampler = StackSampler(traza.hilos, interval=interval, on_tick=partial)
+        error = None
+        try:
+            with sampler:
+                return fn()
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if time.perf_counter() - start >= threshold:
+                save("error" if error else "completado", traza, sampler.folded(), "txt", sampler.top(), error)
+
+
+def _marshal_stats(profiler):
+    """Perfil en el formato binario de pstats (el mismo que escribe dump_stats)"""
+    profiler.create_stats()
+    return marshal.dumps(profiler.stats)
+
+
+def _stats_summary(profiler, n=15):
+    """Las n funciones con más tiempo acumulado, como texto de pstats"""
+    buffer = io.StringIO()
+    pstats.Stats(profiler, stream=buffer).strip_dirs().sort_stats("cumulative").print_stats(n)
+    return buffer.getvalue()
@@ -0,0 +1,285 @@
+# pool_procesos.py - Pool de procesos aislados para el trabajo pesado de SymPy
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class PoolSaturated(Exception):
+    """No hay capacidad en el pool ni lugar en la cola de espera"""
+
+    def __init__(self, retry_after):
+        super().__init__("El servidor está ocupado, inténtalo de nuevo en unos segundos.")
+        self.retry_after = retry_after
+
+
+class TaskTimeout(Exception):
+    """La tarea excedió su tiempo máximo y su proceso fue reemplazado"""
+
+
+class WorkerCrashed(Exception):
+    """El proceso trabajador terminó de forma inesperada (por ejemplo, sin memoria)"""
+
+
+class TaskCancelled(Exception):
+    """La tarea se canceló; si ya estaba en ejecución, su proceso fue reemplazado"""
+
+
+def _virtual_memory_bytes():
+    """Tamaño actual del espacio de direcciones del proceso (Linux)"""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmSize:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _worker_main(conn, memory_limit_mb, initializer, collect):
+    """Bucle principal de cada proceso trabajador"""
+    if initializer is not None:
+        initializer()
+        if collect is not None:
+            # Lo acumulado al precalentar no corresponde a ninguna tarea
+            collect()
+
+    # El límite se aplica sobre lo ya reservado tras importar y precalentar
+    if resource is not None and memory_limit_mb:
+        limit = _virtual_memory_bytes() + memory_limit_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+        if message is None:
+            break
+        fn, args, kwargs = message
+        try:
+            reply = ("ok", fn(*args, **kwargs))
+        except MemoryError:
+            conn.send(("error", "La operación excedió la memoria permitida.", None))
+            # El estado del proceso ya no es confiable: terminar y dejar que se reemplace
+            break
+        except Exception as e:
+            reply = ("error", str(e))
+        conn.send(reply + (collect() if collect is not None else None,))
+    conn.close()
+
+
+class _Worker:
+    """Proceso trabajador y su extremo de la tubería"""
+
+    def __init__(self, ctx, memory_limit_mb, initializer, collect):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main, args=(child_conn, memory_limit_mb, initializer, collect), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join(1)
+        self.conn.close()
+
+
+class WorkerProcessPool:
+    """
+    Pool de procesos precalentados con límites de tiempo y memoria por tarea.
+
+    - Cada tarea tiene un tiempo máximo; si lo excede, el proceso se mata y
+      se reemplaza por uno nuevo.
+    - Cada proceso tiene un tope de memoria (RLIMIT_AS).
+    - La cola de espera es acotada: al saturarse se lanza PoolSaturated en
+      lugar de acumular peticiones.
+    - Si se indica ``collect`` (función a nivel de módulo), cada trabajador
+      la llama tras cada tarea y su resultado (por ejemplo, las métricas
+      acumuladas) se entrega a ``on_collect`` en este proceso.
+
+    El pool se inicia de forma perezosa en el proceso que lo usa, por lo que
+    es seguro crearlo antes de que gunicorn haga fork de sus workers.
+    """
+
+    # Cada cuánto se revisa la señal de cancelación mientras se espera (segundos)
+    CANCEL_POLL = 0.1
+
+    def __init__(self, processes=2, task_timeout=30.0, memory_limit_mb=1024,
+                 max_queue=8, initializer=None, retry_after=5, collect=None, on_collect=None,
+                 preload=("tareas",)):
+        self.processes = processes
+        self.task_timeout = task_timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.max_queue = max_queue
+        self.initializer = initializer
+        self.retry_after = retry_after
+        self.collect = collect
+        self.on_collect = on_collect
+        self.preload = list(preload)
+
+        self._lock = threading.Lock()
+        self._pid = None
+        self._idle = None
+        self._slots = None
+        self._ctx = None
+
+        self.tasks = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self.respawns = 0
+        self.saturations = 0
+        self.cancellations = 0
+
+    def start(self):
+        """Arranca (o re-arranca tras un fork) los procesos trabajadores"""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if "forkserver" in mp.get_all_start_methods():
+                # Los hijos se bifurcan desde un servidor que ya importó los módulos de preload
+                self._ctx = mp.get_context("forkserver")
+                self._ctx.set_forkserver_preload(self.preload)
+            else:
+                self._ctx = mp.get_context("spawn")
+            self._idle = queue.Queue()
+            self._slots = threading.BoundedSemaphore(self.processes + self.max_queue)
+            for _ in range(self.processes):
+                self._idle.put(self._spawn())
+            self._pid = os.getpid()
+
+    def shutdown(self):
+        """Detiene todos los procesos ociosos"""
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            while True:
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    pass
+                worker.process.join(1)
+                if worker.process.is_alive():
+                    worker.kill()
+            self._pid = None
+
+    def run(self, fn, *args, timeout=None, cancel=None, **kwargs):
+        """
+        Ejecuta fn(*args, **kwargs) en un proceso del pool.
+
+        Args:
+            fn: Función definida a nivel de módulo (debe poder serializarse)
+            timeout: Tiempo máximo en segundos (por defecto, task_timeout)
+            cancel: threading.Event opcional; si se activa, la tarea se
+                abandona con TaskCancelled y su proceso se reemplaza
+
+        Returns:
+            El valor devuelto por fn
+        """
+        self.start()
+        timeout = timeout or self.task_timeout
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.saturations += 1
+            raise PoolSaturated(self.retry_after)
+
+        try:
+            deadline = time.monotonic() + timeout
+            worker = self._wait(lambda wait: self._idle.get(timeout=wait), deadline, cancel, queue.Empty)
+            if worker is None:
+                with self._lock:
+                    self.saturations += 1
+                raise PoolSaturated(self.retry_after)
+
+            with self._lock:
+                self.tasks += 1
+            try:
+                worker.conn.send((fn, args, kwargs))
+                try:
+                    ready = self._wait(worker.conn.poll, deadline, cancel)
+                except TaskCancelled:
+                    self._replace(worker)
+                    raise
+                if not ready:
+                    with self._lock:
+                        self.timeouts += 1
+                    self._replace(worker)
+                    raise TaskTimeout("La operación excedió el tiempo máximo permitido.")
+                status, value, collected = worker.conn.recv()
+            except (EOFError, OSError):
+                with self._lock:
+                    self.crashes += 1
+                self._replace(worker)
+                raise WorkerCrashed("El proceso de cálculo terminó inesperadamente.")
+
+            if worker.process.is_alive():
+                self._idle.put(worker)
+            else:
+                self._replace(worker)
+        finally:
+            self._slots.release()
+
+        if collected is not None and self.on_collect is not None:
+            self.on_collect(collected)
+        if status == "error":
+            raise Exception(value)
+        return value
+
+    def stats(self):
+        """Devuelve los contadores del pool"""
+        with self._lock:
+            return {
+                "procesos": self.processes,
+                "ociosos": self._idle.qsize() if self._idle is not None else 0,
+                "tareas": self.tasks,
+                "tiempos_agotados": self.timeouts,
+                "caidas": self.crashes,
+                "reemplazos": self.respawns,
+                "saturaciones": self.saturations,
+                "cancelaciones": self.cancellations,
+            }
+
+    def _wait(self, wait, deadline, cancel, empty=None):
+        """
+        Llama a wait(segundos) hasta que devuelva un valor verdadero o se
+        alcance deadline (devuelve None o False), revisando la cancelación.
+        """
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            try:
+                result = wait(remaining if cancel is None else min(remaining, self.CANCEL_POLL))
+            except Exception as e:
+                if empty is None or not isinstance(e, empty):
+                    raise
+                result = None
+            if result:
+                return result
+            if cancel is not None and cancel.is_set():
+                with self._lock:
+                    self.cancellations += 1
+                raise TaskCancelled("El cálculo fue cancelado.")
+
+    def _spawn(self):
+        return _Worker(self._ctx, self.memory_limit_mb, self.initializer, self.collect)
+
+    def _replace(self, worker):
+        """Mata un proceso y pone uno nuevo en su lugar"""
+        worker.kill()
+        with self._lock:
+            self.respawns += 1
+        self._idle.put(self._spawn())
@@ -196,6 +196,8 @@ document.addEventListener('DOMContentLoaded', () => {
                     const limiteSuperior = document.getElementById('limite_superior').value;
                     const resultadoContent = document.getElementById('resultado').innerHTML;
                     const graficaImg = document.querySelector('#graph-placeholder img');
+                    const graficaCanvas = document.querySelector('#graph-placeholder canvas');
+                    const graficaSrc = graficaImg ? graficaImg.src : (graficaCanvas ? graficaCanvas.toDataURL('image/png') : null);
                     
                     // Crear el contenido del PDF
                     pdfContainer.innerHTML = `
@@ -223,11 +225,11 @@ document.addEventListener('DOMContentLoaded', () => {
                             </div>
                         </div>
                         
-                        ${graficaImg ? `
+                        ${graficaSrc ? `
                             <div style="margin-bottom: 25px;">
                                 <h3 style="color: #2c3e50; margin-bottom: 15px; font-size: 18px;">Gráfica:</h3>
                                 <div style="text-align: center; background: #f8f9fa; padding: 20px; border-radius: 8px;">
-                                    <img src="${graficaImg.src}" style="max-width: 100%; height: auto; border-radius: 8px; border: 1px solid #dfe6e9;" />
+                                    <img src="${graficaSrc}" style="max-width: 100%; height: auto; border-radius: 8px; border: 1px solid #dfe6e9;" />
                                 </div>
                             </div>
                         ` : ''}
@@ -293,10 +295,203 @@ document.addEventListener('DOMContentLoaded', () => {
                 }
             }
 
+            // --- Funciones para dibujar la gráfica en el navegador ---
+
+            // Decodificar un arreglo float32 (little-endian) enviado en base64
+            function decodificarFloat32(b64) {
+                const binario = atob(b64);
+                const bytes = new Uint8Array(binario.length);
+                for (let i = 0; i < binario.length; i++) {
+                    bytes[i] = binario.charCodeAt(i);
+                }
+                return new Float32Array(bytes.buffer);
+            }
+
+            // Obtener las series x/y sin importar la codificación usada por el servidor
+            function leerSerie(datos, nombre) {
+                const valores = datos[nombre];
+                if (datos.codificacion === 'base64') {
+                    return Array.from(decodificarFloat32(valores));
+                }
+                return valores.map(v => (v === null ? NaN : v));
+            }
+
+            // Dibujar la curva, el área de la integral y los límites en un canvas
+            function dibujarGrafica(datos) {
+                const xs = leerSerie(datos, 'x');
+                const ys = leerSerie(datos, 'y');
+                const xsArea = leerSerie(datos, 'x_area');
+                const ysArea = leerSerie(datos, 'y_area');
+                // Integral acumulada F(x) = ∫_a^x f, en los mismos puntos x (opcional)
+                const ysAcumulada = datos.y_acumulada ? leerSerie(datos, 'y_acumulada') : [];
+
+                const canvas = document.createElement('canvas');
+                canvas.width = 800;
+                canvas.height = 600;
+                const ctx = canvas.getContext('2d');
+                const margen = { izq: 60, der: 20, arriba: 40, abajo: 50 };
+                const ancho = canvas.width - margen.izq - margen.der;
+                const alto = canvas.height - margen.arriba - margen.abajo;
+
+                // Rango vertical con percentiles para que los polos no aplasten la curva
+                const finitos = ys.concat(ysArea, ysAcumulada).filter(Number.isFinite).sort((a, b) => a - b);
+                let yMin = finitos.length ? finitos[Math.floor(finitos.length * 0.02)] : -1;
+                let yMax = finitos.length ? finitos[Math.ceil(finitos.length * 0.98) - 1] : 1;
+                yMin = Math.min(yMin, 0);
+                yMax = Math.max(yMax, 0);
+                if (yMax - yMin < 1e-12) { yMax += 1; yMin -= 1; }
+                const relleno = (yMax - yMin) * 0.05;
+                yMin -= relleno;
+                yMax += relleno;
+                const xMin = xs[0];
+                const xMax = xs[xs.length - 1];
+
+                const px = x => margen.izq + (x - xMin) / (xMax - xMin) * ancho;
+                const py = y => margen.arriba + (yMax - Math.min(Math.max(y, yMin), yMax)) / (yMax - yMin) * alto;
+
+                ctx.fillStyle = '#ffffff';
+                ctx.fillRect(0, 0, canvas.width, canvas.height);
+
+                // Cuadrícula y etiquetas de los ejes
+                ctx.strokeStyle = '#dfe6e9';
+                ctx.fillStyle = '#34495e';
+                ctx.font = '12px Poppins, sans-serif';
+                ctx.setLineDash([2, 3]);
+                for (let i = 0; i <= 8; i++) {
+                    const gx = xMin + (xMax - xMin) * i / 8;
+                    const gy = yMin + (yMax - yMin) * i / 8;
+                    ctx.beginPath(); ctx.moveTo(px(gx), margen.arriba); ctx.lineTo(px(gx), margen.arriba + alto); ctx.stroke();
+                    ctx.beginPath(); ctx.moveTo(margen.izq, py(gy)); ctx.lineTo(margen.izq + ancho, py(gy)); ctx.stroke();
+                    ctx.fillText(gx.toFixed(2), px(gx) - 12, margen.arriba + alto + 18);
+                    ctx.fillText(gy.toFixed(2), 5, py(gy) + 4);
+                }
+                ctx.setLineDash([]);
+                ctx.strokeStyle = '#7f8c8d';
+                ctx.strokeRect(margen.izq, margen.arriba, ancho, alto);
+
+                // Área bajo la curva entre a y b
+                ctx.fillStyle = 'rgba(52, 152, 219, 0.3)';
+                ctx.beginPath();
+                ctx.moveTo(px(xsArea[0]), py(0));
+                xsArea.forEach((x, i) => {
+                    if (Number.isFinite(ysArea[i])) ctx.lineTo(px(x), py(ysArea[i]));
+                });
+                ctx.lineTo(px(xsArea[xsArea.length - 1]), py(0));
+                ctx.closePath();
+                ctx.fill();
+
+                // Curvas; los valores no finitos cortan el trazo (polos)
+                function trazar(valores) {
+                    ctx.beginPath();
+                    let trazando = false;
+                    xs.forEach((x, i) => {
+                        if (!Number.isFinite(valores[i])) { trazando = false; return; }
+                        if (trazando) ctx.lineTo(px(x), py(valores[i]));
+                        else ctx.moveTo(px(x), py(valores[i]));
+                        trazando = true;
+                    });
+                    ctx.stroke();
+                }
+                ctx.strokeStyle = '#3498db';
+                ctx.lineWidth = 2;
+                trazar(ys);
+                if (ysAcumulada.length) {
+                    ctx.strokeStyle = '#e67e22';
+                    ctx.setLineDash([8, 3, 2, 3]);
+                    trazar(ysAcumulada);
+                    ctx.setLineDash([]);
+                }
+
+                // Límites de la integral
+                ctx.strokeStyle = 'red';
+                ctx.lineWidth = 1;
+                ctx.setLineDash([6, 4]);
+                // Un límite infinito llega como null y no tiene línea
+                [datos.a, datos.b].filter(limite => limite !== null && limite !== undefined).forEach(limite => {
+                    ctx.beginPath(); ctx.moveTo(px(limite), margen.arriba); ctx.lineTo(px(limite), margen.arriba + alto); ctx.stroke();
+                });
+                ctx.setLineDash([]);
+
+                // Leyenda (esquina superior derecha), como en la imagen PNG
+                const leyenda = [{ texto: 'f(x)', color: '#3498db', trazo: [] }];
+                if (ysAcumulada.length) {
+                    leyenda.push({ texto: 'F(x) = ∫ₐˣ f(t) dt', color: '#e67e22', trazo: [8, 3, 2, 3] });
+                }
+                ctx.font = '12px Poppins, sans-serif';
+                const anchoLeyenda = Math.max(...leyenda.map(e => ctx.measureText(e.texto).width)) + 44;
+                const xLeyenda = margen.izq + ancho - anchoLeyenda - 8;
+                ctx.fillStyle = 'rgba(255, 255, 255, 0.85)';
+                ctx.fillRect(xLeyenda, margen.arriba + 8, anchoLeyenda, 18 * leyenda.length + 8);
+                ctx.lineWidth = 2;
+                leyenda.forEach((entrada, i) => {
+                    const yEntrada = margen.arriba + 24 + 18 * i;
+                    ctx.strokeStyle = entrada.color;
+                    ctx.setLineDash(entrada.trazo);
+                    ctx.beginPath(); ctx.moveTo(xLeyenda + 8, yEntrada - 4); ctx.lineTo(xLeyenda + 32, yEntrada - 4); ctx.stroke();
+                    ctx.fillStyle = '#2c3e50';
+                    ctx.fillText(entrada.texto, xLeyenda + 38, yEntrada);
+                });
+                ctx.setLineDash([]);
+
+                ctx.fillStyle = '#2c3e50';
+                ctx.font = '16px Poppins, sans-serif';
+                ctx.fillText('Gráfica de la función y área de la integral', margen.izq, 25);
+
+                return canvas;
+            }
+
+            // --- Trabajos asíncronos ---
+
+            // Trabajo en curso (para cancelarlo si se envía otra función)
+            let trabajoActual = null;
+            let peticionActual = 0;
+
+            function cancelarTrabajoActual() {
+                if (!trabajoActual) return;
+                if (trabajoActual.fuente) trabajoActual.fuente.close();
+                fetch(trabajoActual.resultado_url, { method: 'DELETE', keepalive: true }).catch(() => {});
+                trabajoActual = null;
+            }
+
+            // Sondea /resultado/<id> con espera creciente hasta que el trabajo termine
+            async function consultarTrabajo(url) {
+                let espera = 250;
+                while (true) {
+                    const response = await fetch(url);
+                    if (response.status !== 202) return response.json();
+                    await new Promise(resolve => setTimeout(resolve, espera));
+                    espera = Math.min(espera * 2, 2000);
+                }
+            }
+
+            // Espera el resultado por Server-Sent Events, o por sondeo si no están disponibles
+            function esperarTrabajo(trabajo) {
+                if (!window.EventSource) return consultarTrabajo(trabajo.resultado_url);
+                return new Promise((resolve, reject) => {
+                    const fuente = new EventSource(trabajo.eventos_url);
+                    trabajo.fuente = fuente;
+                    fuente.addEventListener('estado', (evento) => {
+                        if (JSON.parse(evento.data).estado === 'ejecutando') updateStatus('Calculando la integral (en proceso)...');
+                    });
+                    fuente.addEventListener('resultado', (evento) => {
+                        fuente.close();
+                        resolve(JSON.parse(evento.data));
+                    });
+                    fuente.onerror = () => {
+                        fuente.close();
+                        consultarTrabajo(trabajo.resultado_url).then(resolve, reject);
+                    };
+                });
+            }
+
             // --- Lógica de la Calculadora ---
             formulario.addEventListener('submit', async (e) => {
                 e.preventDefault();
 
+                // Una nueva función reemplaza al cálculo anterior
+                cancelarTrabajoActual();
+                const idPeticion = ++peticionActual;
+
                 resultadoDiv.innerHTML = '';
                 graficaPlaceholder.innerHTML = '<p>Calculando...</p>';
                 updateStatus('Calculando la integral...');
@@ -305,6 +500,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 const funcion = document.getElementById('funcion').value;
                 const limiteInferior = document.getElementById('limite_inferior').value;
                 const limiteSuperior = document.getElementById('limite_superior').value;
+                const acumulada = document.getElementById('acumulada').checked;
 
                 if (!funcion || !limiteInferior || !limiteSuperior) {
                     resultadoDiv.innerHTML = `<h3 class="error">Error de Validación</h3><p>Todos los campos son obligatorios.</p>`;
@@ -318,14 +514,30 @@ document.addEventListener('DOMContentLoaded', () => {
                     const response = await fetch('/calcular', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
-                        body: JSON.stringify({ funcion, limite_inferior: limiteInferior, limite_superior: limiteSuperior }),
+                        // Pedir solo los puntos de la gráfica: el navegador la dibuja.
+                        // Si el cálculo tarda, el servidor responde 202 con un trabajo
+                        body: JSON.stringify({ funcion, limite_inferior: limiteInferior, limite_superior: limiteSuperior, modo_grafica: 'datos', acumulada, asincrono: true }),
                     });
 
-                    const data = await response.json();
+                    let data = await response.json();
+                    if (response.status === 202) {
+                        trabajoActual = data;
+                        data = await esperarTrabajo(data);
+                    }
+                    // Descartar resultados de cálculos reemplazados por uno más nuevo
+                    if (idPeticion !== peticionActual) return;
+                    trabajoActual = null;
 
                     if (data.exito) {
                         resultadoDiv.innerHTML = data.resultado_texto;
-                        graficaPlaceholder.innerHTML = `<img src="${data.grafica_url}" alt="Gráfica de la función">`;
+                        if (data.grafica_datos) {
+                            graficaPlaceholder.innerHTML = '';
+                            graficaPlaceholder.appendChild(dibujarGrafica(data.grafica_datos));
+                        } else if (data.grafica_url) {
+                            graficaPlaceholder.innerHTML = `<img src="${data.grafica_url}" alt="Gráfica de la función">`;
+                        } else {
+                            graficaPlaceholder.innerHTML = '<p>No se pudo generar la gráfica.</p>';
+                        }
                         updateStatus('Cálculo completado exitosamente.');
                         downloadPdfBtn.style.display = 'block';
 
@@ -343,6 +555,7 @@ document.addEventListener('DOMContentLoaded', () => {
                         downloadPdfBtn.style.display = 'none';
                     }
                 } catch (error) {
+                    if (idPeticion !== peticionActual) return;
                     console.error('Error al enviar la solicitud:', error);
                     resultadoDiv.innerHTML = `<h3 class="error">Error del Servidor</h3><p>No se pudo conectar con el servidor. Para esta demostración, aquí tienes un ejemplo de resultado:</p><div style="background: #e8f4fd; padding: 15px; border-radius: 8px; margin-top: 10px;"><p><strong>✅ RESULTADO DE LA INTEGRACIÓN</strong></p><p>Función: f(x) = ${funcion}</p><p>Límites: [${limiteInferior}, ${limiteSuperior}]</p><p>∫[${limiteInferior} → ${limiteSuperior}] f(x) dx = [Resultado calculado]</p></div>`;
                     graficaPlaceholder.innerHTML = '<div style="background: #f8f9fa; padding: 40px; border-radius: 8px; text-align: center; color: #7f8c8d;"><i class="fas fa-chart-line" style="font-size: 48px; margin-bottom: 15px;"></i><p>Gráfica de demostración<br>En producción aparecería la gráfica real</p></div>';
@@ -0,0 +1,455 @@
+# tareas.py - Tareas de cálculo ejecutables en el proceso web o en el pool de procesos
+import functools
+import gc
+import hashlib
+import json
+import os
+import tempfile
+
+from analizador import NOMBRES_MULTIPLES, ExpressionParser
+from cache_resultados import ResultCache, canonical_key
+from coalescencia import SingleFlight, default_lock_dir
+from calculadora_logica import IntegralCalculator
+from compilador import FunctionCompiler
+from integracion_rapida import FastIntegrator
+from memoria import MemoryGovernor
+from metricas import Metrics
+from perfilador import SlowRequestLog, profile_call
+
+# Una calculadora por proceso, creada al primer uso
+_calculadora = None
+_coalescedor = None
+_registro_lentos = None
+_gobernador = None
+
+# Métricas por etapa de este proceso (CALCULADORA_METRICAS=0 las desactiva).
+# Los procesos del pool las envían al proceso web con cada resultado.
+metricas = Metrics(enabled=os.environ.get('CALCULADORA_METRICAS', '1') != '0')
+
+
+def obtener_calculadora():
+    """Devuelve la calculadora del proceso actual, configurada por variables de entorno"""
+    global _calculadora
+    if _calculadora is None:
+        # Caché de resultados: tamaño, expiración y respaldo opcional en un almacén
+        # SQLite compartido entre procesos (ver almacen_resultados.ResultStore)
+        opciones_analizador = {
+            'maxsize': int(os.environ.get('CALCULADORA_EXPRESIONES_CACHE', 1024)),
+            'max_length': int(os.environ.get('CALCULADORA_EXPRESION_LONGITUD', 1000)),
+            'max_depth': int(os.environ.get('CALCULADORA_EXPRESION_PROFUNDIDAD', 50)),
+        }
+        cache = ResultCache(
+            maxsize=int(os.environ.get('CALCULADORA_CACHE_TAMANO', 512)),
+            ttl=float(os.environ.get('CALCULADORA_CACHE_TTL', 3600)),
+            disk_path=os.environ.get('CALCULADORA_CACHE_DISCO') or None,
+            disk_max_bytes=int(float(os.environ.get('CALCULADORA_CACHE_DISCO_MB', 256)) * 2 ** 20),
+            disk_ttl=float(os.environ.get('CALCULADORA_CACHE_DISCO_TTL', 0)) or None,
+        )
+        _calculadora = IntegralCalculator(
+            cache=cache,
+            symbolic_timeout=float(os.environ.get('CALCULADORA_TIEMPO_SIMBOLICO', 5)),
+            image_store_options={
+                'max_bytes': int(float(os.environ.get('CALCULADORA_IMAGENES_MB', 200)) * 2 ** 20),
+                'max_files': int(os.environ.get('CALCULADORA_IMAGENES_MAXIMO', 2000)),
+            },
+            compiler=FunctionCompiler(
+                maxsize=int(os.environ.get('CALCULADORA_FUNCIONES_COMPILADAS', 256)),
+                backend=os.environ.get('CALCULADORA_BACKEND_NUMERICO', 'numpy'),
+            ),
+            parser=ExpressionParser(**opciones_analizador),
+            fast_integrator=FastIntegrator(
+                max_polynomial_degree=int(os.environ.get('CALCULADORA_GRADO_POLINOMIO', 200)),
+            ),
+            multi_parser=ExpressionParser(names=NOMBRES_MULTIPLES, **opciones_analizador),
+            metrics=metricas,
+        )
+    return _calculadora
+
+
+def obtener_gobernador():
+    """
+    Devuelve el gobernador de memoria del proceso actual: vacía las cachés
+    internas de SymPy al superar CALCULADORA_LIMPIEZA_MB de memoria residente
+    o cada CALCULADORA_LIMPIEZA_CADA tareas (0 desactiva cada criterio).
+    """
+    global _gobernador
+    if _gobernador is None:
+        _gobernador = MemoryGovernor(
+            max_rss_mb=float(os.environ.get('CALCULADORA_LIMPIEZA_MB', 512)) or None,
+            every=int(os.environ.get('CALCULADORA_LIMPIEZA_CADA', 5000)) or None,
+        )
+    return _gobernador
+
+
+def recoger_informe():
+    """
+    Entrega y reinicia las métricas acumuladas en este proceso, junto con el
+    estado de su memoria (ver WorkerProcessPool.collect)
+    """
+    return {'pid': os.getpid(), 'metricas': metricas.drain(), 'memoria': obtener_gobernador().stats()}
+
+
+def obtener_coalescedor():
+    """
+    Devuelve el coalescedor del proceso actual. Con CALCULADORA_COALESCENCIA=0
+    solo se coalescen los hilos de un mismo proceso.
+    """
+    global _coalescedor
+    if _coalescedor is None:
+        # Candados compartidos por los procesos del pool y los workers de
+        # gunicorn, en un directorio privado del usuario del servicio
+        directorio = os.environ.get('CALCULADORA_COALESCENCIA_DIR') or \
+            default_lock_dir('calculadora_coalescencia')
+        entre_procesos = os.environ.get('CALCULADORA_COALESCENCIA', '1') != '0'
+        _coalescedor = SingleFlight(
+            lock_dir=directorio if entre_procesos else None,
+            ttl=float(os.environ.get('CALCULADORA_COALESCENCIA_TTL', 30)),
+        )
+    return _coalescedor
+
+
+def obtener_registro_lentos():
+    """Devuelve el registro en disco de los cálculos lentos perfilados (compartido por los procesos)"""
+    global _registro_lentos
+    if _registro_lentos is None:
+        _registro_lentos = SlowRequestLog(
+            os.environ.get('CALCULADORA_PERFILADO_DIR') or
+            os.path.join(tempfile.gettempdir(), 'calculadora_perfiles'),
+            max_entries=int(os.environ.get('CALCULADORA_PERFILADO_MAXIMO', 50)),
+        )
+    return _registro_lentos
+
+
+# Formas de entregar la gráfica al cliente:
+# - archivo: PNG guardado en static/img (grafica_url)
+# - memoria: bytes de la imagen que el proceso web sirve desde /grafica/<clave>
+# - datos: puntos muestreados para que el navegador dibuje la curva (grafica_datos)
+MODOS_GRAFICA = ('archivo', 'memoria', 'datos')
+
+
+def _normalizar(valor):
+    if isinstance(valor, str):
+        return ' '.join(valor.split()).replace('**', '^')
+    if isinstance(valor, (list, tuple)):
+        return [_normalizar(parte) for parte in valor]
+    return valor
+
+
+def clave_peticion(*partes):
+    """
+    Clave de coalescencia de una petición a partir de los datos tal como
+    llegaron (espacios colapsados y ** como ^), sin analizar la expresión.
+
+    Se usa en el proceso web: analizar una entrada maliciosa ahí bloquearía
+    al worker fuera del alcance de los límites del pool. Las entradas
+    equivalentes escritas de otra forma se coalescen igualmente dentro del
+    pool, con clave_calculo.
+    """
+    canon = json.dumps(_normalizar(list(partes)), ensure_ascii=False, default=str)
+    return 'peticion|' + hashlib.sha256(canon.encode('utf-8')).hexdigest()
+
+
+def clave_calculo(funcion_str, limite_inferior_str, limite_superior_str, img_dir,
+                  modo_grafica='archivo', formato='png', codificacion='base64', acumulada=False,
+                  precision=None):
+    """
+    Clave canónica de una petición a calcular (x^2 y x**2 comparten clave),
+    o None si la entrada no se puede analizar.
+    """
+    calculadora = obtener_calculadora()
+    try:
+        func = calculadora.parse_function(funcion_str)
+        a = calculadora.parse_limit(limite_inferior_str)
+        b = calculadora.parse_limit(limite_superior_str)
+    except Exception:
+        return None
+    return '|'.join([canonical_key(func, a, b), img_dir, modo_grafica, formato, codificacion,
+                     'acumulada' if acumulada else '', str(precision or '')])
+
+
+def calcular(funcion_str, limite_inferior_str, limite_superior_str, img_dir,
+             modo_grafica='archivo', formato='png', codificacion='base64', acumulada=False,
+             precision=None):
+    """
+    Parsea, integra, formatea y grafica; devuelve datos simples serializables.
+
+    Las peticiones idénticas simultáneas (en este u otros procesos) comparten
+    un único cálculo (ver coalescencia.SingleFlight).
+
+    Con acumulada, la gráfica (o sus datos) incluye también la integral
+    acumulada F(x) = ∫_a^x f. Con precision (dígitos), el resultado se
+    calcula además con esa precisión (ver IntegralCalculator.calculate_precise)
+    dentro de CALCULADORA_PRECISION_TIEMPO segundos.
+
+    Returns:
+        dict: resultado_texto, motor, error_estimado y los campos de la gráfica
+        según modo_grafica (ver MODOS_GRAFICA)
+    """
+    argumentos = (funcion_str, limite_inferior_str, limite_superior_str, img_dir,
+                  modo_grafica, formato, codificacion, acumulada, precision)
+    clave = clave_calculo(*argumentos)
+    if clave is None:
+        # La entrada no es válida: el cálculo produce el error correspondiente
+        return _calcular(*argumentos)
+    return obtener_coalescedor().do(clave, lambda: _calcular(*argumentos))[0]
+
+
+def clave_multiple(funcion_str, limites):
+    """Clave canónica de una integral múltiple, o None si la entrada no se puede analizar"""
+    try:
+        func, region = obtener_calculadora().parse_region(funcion_str, limites)
+    except Exception:
+        return None
+    return 'multiple|' + canonical_key(func, *(expr for limite in region for expr in limite))
+
+
+def calcular_multiple(funcion_str, limites):
+    """
+    Calcula una integral iterada en x, y, z (ver IntegralCalculator.calculate_multiple);
+    limites es una lista de (variable, inferior, superior) de dentro hacia fuera.
+
+    Returns:
+        dict: resultado_texto, resultado, motor, error_estimado y grafica_url (None:
+        las integrales múltiples no tienen gráfica)
+    """
+    clave = clave_multiple(funcion_str, limites)
+    if clave is None:
+        return _calcular_multiple(funcion_str, limites)
+    return obtener_coalescedor().do(clave, lambda: _calcular_multiple(funcion_str, limites))[0]
+
+
+def _gobernado(fn):
+    """Tras cada tarea, da al gobernador de memoria la ocasión de limpiar las cachés"""
+    @functools.wraps(fn)
+    def envoltura(*args, **kwargs):
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            obtener_gobernador().after_task()
+    return envoltura
+
+
+def calcular_perfilado(perfil_id, funcion_str, limite_inferior_str, limite_superior_str, img_dir,
+                       modo_grafica='archivo', formato='png', codificacion='base64', acumulada=False,
+                       precision=None):
+    """
+    Como calcular, pero perfilando el cálculo (ver perfilador.profile_call).
+
+    Con perfil_id se usa cProfile, sin coalescer, y el perfil se guarda con
+    ese identificador aunque el cálculo sea rápido; sin él se perfila por
+    muestreo y solo se guardan los cálculos que superan
+    CALCULADORA_PERFILADO_UMBRAL segundos.
+    """
+    argumentos = (funcion_str, limite_inferior_str, limite_superior_str, img_dir,
+                  modo_grafica, formato, codificacion, acumulada, precision)
+    datos = {'funcion': funcion_str, 'limite_inferior': limite_inferior_str,
+             'limite_superior': limite_superior_str, 'modo_grafica': modo_grafica}
+    return profile_call(
+        (lambda: _calcular(*argumentos)) if perfil_id else (lambda: calcular(*argumentos)),
+        obtener_registro_lentos(), datos,
+        threshold=float(os.environ.get('CALCULADORA_PERFILADO_UMBRAL', 5)),
+        deterministic=bool(perfil_id), entry_id=perfil_id,
+    )
+
+
+@_gobernado
+def _calcular(funcion_str, limite_inferior_str, limite_superior_str, img_dir,
+              modo_grafica, formato, codificacion, acumulada=False, precision=None):
+    calculadora = obtener_calculadora()
+
+    # Usar tu lógica de cálculo (simbólica con respaldo numérico)
+    if precision:
+        resultado = calculadora.calculate_precise(
+            funcion_str, limite_inferior_str, limite_superior_str, precision,
+            time_budget=float(os.environ.get('CALCULADORA_PRECISION_TIEMPO', 10)),
+        )
+    else:
+        resultado = calculadora.calculate_integral(
+            funcion_str, limite_inferior_str, limite_superior_str
+        )
+    func, a, b = resultado['funcion'], resultado['a'], resultado['b']
+
+    # Formatear el resultado para el frontend
+    resultado_formateado = calculadora.format_result_pretty(
+        resultado['definida'], resultado['indefinida'], a, b, funcion_str,
+        error_estimate=resultado['error_estimado'], engine=resultado['motor'],
+        converged=resultado.get('convergio', True),
+    )
+
+    datos = {
+        'resultado_texto': resultado_formateado,
+        'motor': resultado['motor'],
+        'error_estimado': resultado['error_estimado'],
+        'convergio': resultado.get('convergio', True),
+    }
+    if precision:
+        datos['resultado_texto'] += '\n\n' + calculadora.format_precise(resultado['precisa'])
+        datos['precision'] = resultado['precisa']
+    datos.update(_grafica(calculadora, func, a, b, img_dir, modo_grafica, formato, codificacion, acumulada))
+    return datos
+
+
+@_gobernado
+def _calcular_multiple(funcion_str, limites):
+    calculadora = obtener_calculadora()
+    resultado = calculadora.calculate_multiple(funcion_str, limites)
+    datos = calculadora.batch_fields(resultado)
+    datos.pop('indefinida')
+    datos['resultado_texto'] = calculadora.format_multiple_result(
+        resultado['definida'], resultado['funcion'], resultado['region'], resultado['error_estimado'],
+    )
+    datos['grafica_url'] = None
+    return datos
+
+
+def _grafica(calculadora, func, a, b, img_dir, modo_grafica, formato, codificacion, acumulada=False):
+    """Genera la gráfica en el modo pedido; un error en la gráfica no invalida el resultado"""
+    if modo_grafica == 'archivo':
+        # Generar la gráfica y obtener la ruta
+        return {'grafica_url': calculadora.generate_integral_plot(func, a, b, img_dir, cumulative=acumulada)}
+    try:
+        if modo_grafica == 'memoria':
+            return {
+                'grafica_url': None,
+                'grafica_clave': calculadora.plot_key(func, a, b, cumulative=acumulada),
+                'grafica_formato': formato,
+                'grafica_bytes': calculadora.render_plot(func, a, b, formato=formato, cumulative=acumulada),
+            }
+        return {'grafica_url': None,
+                'grafica_datos': calculadora.plot_data(func, a, b, encoding=codificacion, cumulative=acumulada)}
+    except Exception as e:
+        print(f"Error al generar la gráfica: {e}")
+        return {'grafica_url': None}
+
+
+@_gobernado
+def renderizar_grafica(funcion_str, limite_inferior_str, limite_superior_str, formato='png', acumulada=False):
+    """
+    Renderiza solo la gráfica (sin integrar).
+
+    Returns:
+        tuple: (clave, bytes de la imagen)
+    """
+    calculadora = obtener_calculadora()
+    func = calculadora.parse_function(funcion_str)
+    a = calculadora.parse_limit(limite_inferior_str)
+    b = calculadora.parse_limit(limite_superior_str)
+    return (calculadora.plot_key(func, a, b, cumulative=acumulada),
+            calculadora.render_plot(func, a, b, formato=formato, cumulative=acumulada))
+
+
+@_gobernado
+def calcular_lote(integrales, graficar=False, img_dir=None):
+    """
+    Calcula un lote de integrales; integrales es una lista de (indice, función, a, b).
+
+    Returns:
+        list: Un diccionario por integral, con el índice original de la petición
+    """
+    calculadora = obtener_calculadora()
+    indices = [indice for indice, _, _, _ in integrales]
+    triples = [(funcion, a, b) for _, funcion, a, b in integrales]
+    resultados = []
+    for resultado in calculadora.calculate_many(triples, plot=graficar, img_dir=img_dir):
+        resultado['indice'] = indices[resultado['indice']]
+        resultados.append(resultado)
+    return resultados
+
+
+@_gobernado
+def calcular_lote_multiple(integrales):
+    """
+    Calcula un lote de integrales múltiples; integrales es una lista de
+    (indice, función, límites).
+
+    Returns:
+        list: Un diccionario por integral, con el índice original de la petición
+    """
+    calculadora = obtener_calculadora()
+    resultados = []
+    for indice, funcion, limites in integrales:
+        item = {'indice': indice, 'funcion': funcion, 'limites': limites}
+        try:
+            resultado = calculadora.calculate_multiple(funcion, limites)
+        except Exception as e:
+            resultados.append(dict(item, error=str(e), exito=False))
+            continue
+        resultados.append(dict(item, **calculadora.batch_fields(resultado), exito=True))
+    return resultados
+
+
+@_gobernado
+def calcular_barrido(funcion_str, limite_inferior, limite_superior, parametros, codificacion='base64'):
+    """
+    Calcula la integral de una función paramétrica sobre una malla de límites
+    y parámetros (ver IntegralCalculator.calculate_sweep).
+
+    Returns:
+        dict: resultado y error_estimado como arreglos compactos, motor,
+        puntos_numericos, n, indefinida y codificacion
+    """
+    calculadora = obtener_calculadora()
+    resultado = calculadora.calculate_sweep(funcion_str, limite_inferior, limite_superior, parametros)
+    return calculadora.sweep_fields(resultado, codificacion)
+
+
+def estadisticas(img_dir=None):
+    """Contadores de la calculadora de este proceso"""
+    calculadora = obtener_calculadora()
+    datos = {
+        'cache_resultados': calculadora.cache.stats(),
+        'funciones_compiladas': calculadora.compiler.stats(),
+        'expresiones': calculadora.parser.stats(),
+        'integrador_reglas': calculadora.fast_integrator.stats(),
+        'coalescencia': obtener_coalescedor().stats(),
+        'memoria': obtener_gobernador().stats(),
+    }
+    if img_dir is not None:
+        datos['almacen_imagenes'] = calculadora.image_store(img_dir).stats()
+    return datos
+
+
+# Integrales que recorren las vías de cálculo: reglas, integrate de SymPy con
+# límite en el infinito, integración racional y cuadratura numérica
+INTEGRALES_CALENTAMIENTO = (
+    ('x^2', '0', '1'),
+    ('x*exp(-x^2)', '0', 'oo'),
+    ('1/(x^3 + 1)', '0', '1'),
+    ('sin(sin(x))', '0', '1'),
+)
+
+
+def calentar():
+    """
+    Importa y ejercita SymPy, NumPy y matplotlib para que la primera petición
+    real no pague el arranque (carga perezosa de módulos de SymPy, fuentes y
+    mathtext de matplotlib, compilación de funciones).
+    """
+    calculadora = obtener_calculadora()
+    for funcion, a, b in INTEGRALES_CALENTAMIENTO:
+        resultado = calculadora.calculate_integral(funcion, a, b)
+        calculadora.format_result_pretty(resultado['definida'], resultado['indefinida'],
+                                         resultado['a'], resultado['b'], funcion,
+                                         error_estimate=resultado['error_estimado'],
+                                         engine=resultado['motor'])
+    calculadora.render_plot(resultado['funcion'], resultado['a'], resultado['b'])
+    calculadora.plot_data(resultado['funcion'], resultado['a'], resultado['b'])
+    # Lo medido al calentar no corresponde a ninguna petición
+    metricas.drain()
+
+
+def precalentar(calcular=True):
+    """
+    Calienta el proceso maestro de gunicorn antes del fork (preload_app) y
+    congela su heap: los workers heredan SymPy y matplotlib ya cargados, y el
+    recolector de basura no toca esos objetos, así que sus páginas siguen
+    compartidas (copy-on-write) en lugar de duplicarse en cada worker.
+
+    Con calcular=False solo se congela lo importado: con pool, los workers
+    web no analizan ni integran (ver clave_peticion) y los procesos del pool
+    se calientan por su cuenta.
+    """
+    if calcular:
+        calentar()
+    gc.collect()
+    gc.freeze()
@@ -0,0 +1,21 @@
+# conftest.py - Configuración común de las pruebas
+import os
+import sys
+import tempfile
+
+# Sin pool de procesos: los cálculos se hacen en el proceso de las pruebas
+os.environ.setdefault('CALCULADORA_PROCESOS', '0')
+os.environ.setdefault('CALCULADORA_COALESCENCIA', '0')
+# Trabajos asíncronos en un directorio propio de las pruebas
+os.environ.setdefault('CALCULADORA_TRABAJOS_DIR', tempfile.mkdtemp(prefix='calculadora_trabajos_'))
+os.environ.setdefault('CALCULADORA_PERFILADO_DIR', tempfile.mkdtemp(prefix='calculadora_perfiles_'))
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def cliente():
+    from app import app
+    return app.test_client()
@@ -0,0 +1,26 @@
+# test_admin.py - Autorización de las rutas /admin
+import pytest
+
+
+@pytest.fixture
+def perfilado(monkeypatch):
+    import app
+    monkeypatch.setattr(app, 'perfilado', True)
+    return app
+
+
+def test_sin_token_no_hay_rutas_admin(cliente, perfilado, monkeypatch):
+    monkeypatch.setattr(perfilado, 'token_admin', None)
+    # Una petición local (como todas detrás de un proxy inverso) tampoco entra
+    respuesta = cliente.get('/admin/perfiles', environ_base={'REMOTE_ADDR': '127.0.0.1'})
+    assert respuesta.status_code == 404
+
+
+def test_token_solo_en_la_cabecera(cliente, perfilado, monkeypatch):
+    monkeypatch.setattr(perfilado, 'token_admin', 'secreto')
+    assert cliente.get('/admin/perfiles').status_code == 403
+    assert cliente.get('/admin/perfiles?token=secreto').status_code == 403
+    assert cliente.get('/admin/perfiles', headers={'X-Admin-Token': 'otro'}).status_code == 403
+    respuesta = cliente.get('/admin/perfiles', headers={'X-Admin-Token': 'secreto'})
+    assert respuesta.status_code == 200
+    assert 'perfiles' in respuesta.get_json()
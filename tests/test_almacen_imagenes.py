@@ -0,0 +1,15 @@
+# test_almacen_imagenes.py - Almacén de gráficas en disco
+import os
+import stat
+
+import almacen_imagenes
+from almacen_imagenes import ImageStore
+
+
+def test_las_graficas_se_crean_con_los_permisos_de_la_umask(tmp_path):
+    almacen = ImageStore(str(tmp_path))
+    nombre = almacen.save(ImageStore.make_key('x^2', 0, 1), b'\x89PNG')
+    # No 0600 como el temporal de mkstemp: el servidor de estáticos puede ser otro usuario
+    modo = stat.S_IMODE(os.stat(tmp_path / nombre).st_mode)
+    assert modo == 0o666 & ~almacen_imagenes._UMASK
+    assert almacen.lookup(ImageStore.make_key('x^2', 0, 1)) == nombre
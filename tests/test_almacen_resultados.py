@@ -0,0 +1,135 @@
+# test_almacen_resultados.py - Almacén persistente de resultados (almacen_resultados.ResultStore)
+import json
+import types
+
+import pytest
+from sympy import Rational, Symbol, sin
+
+import almacen_resultados
+from almacen_resultados import ResultStore, read_corpus
+
+x = Symbol('x')
+
+
+class Reloj:
+    """Sustituye al módulo time del almacén para fijar las marcas de uso"""
+
+    def __init__(self, ahora=1000.0):
+        self.ahora = ahora
+
+    def time(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj(monkeypatch):
+    reloj = Reloj()
+    monkeypatch.setattr(almacen_resultados, 'time', types.SimpleNamespace(time=reloj.time))
+    return reloj
+
+
+def _entrada(n=0, relleno=0):
+    return {
+        'definida': Rational(1, 3) + n,
+        'indefinida': x ** 3 / 3 + sin(x),
+        'exacta': None,
+        'valor': 1 / 3 + n,
+        'motor': 'simbolico',
+        'relleno': 'a' * relleno,
+    }
+
+
+def test_persiste_entre_instancias(tmp_path):
+    ruta = str(tmp_path / 'resultados.db')
+    ResultStore(ruta).set('clave', _entrada())
+    otra = ResultStore(ruta)
+    entrada = otra.get('clave')
+    assert entrada['definida'] == Rational(1, 3)
+    assert entrada['indefinida'] == x ** 3 / 3 + sin(x)
+    assert entrada['exacta'] is None
+    assert entrada['motor'] == 'simbolico'
+    assert otra.get('otra clave') is None
+    estadisticas = otra.stats()
+    assert (estadisticas['aciertos'], estadisticas['fallos'], estadisticas['entradas']) == (1, 1, 1)
+
+
+def test_reemplaza_la_entrada(tmp_path):
+    almacen = ResultStore(str(tmp_path / 'resultados.db'))
+    almacen.set('clave', _entrada(0))
+    almacen.set('clave', _entrada(1))
+    assert almacen.get('clave')['definida'] == Rational(4, 3)
+    assert almacen.stats()['entradas'] == 1
+
+
+def test_las_entradas_vencidas_no_se_devuelven(tmp_path, reloj):
+    almacen = ResultStore(str(tmp_path / 'resultados.db'), ttl=60)
+    almacen.set('clave', _entrada())
+    reloj.ahora += 30
+    assert almacen.get('clave') is not None
+    reloj.ahora += 31
+    assert almacen.get('clave') is None
+
+
+def test_desaloja_las_menos_usadas(tmp_path, reloj):
+    tamano = len(ResultStore(str(tmp_path / 'medida.db')).serialize(_entrada(relleno=1000)))
+    almacen = ResultStore(str(tmp_path / 'resultados.db'), max_bytes=3 * tamano, check_every=1)
+    for i in range(3):
+        almacen.set(f'clave {i}', _entrada(relleno=1000))
+        reloj.ahora += 1
+    # Una lectura posterior a TOUCH_INTERVAL renueva la marca de uso de la más vieja
+    reloj.ahora += ResultStore.TOUCH_INTERVAL + 1
+    assert almacen.get('clave 0') is not None
+    reloj.ahora += 1
+    almacen.set('clave 3', _entrada(relleno=1000))
+    # Baja a 90 % de max_bytes: salen las dos usadas hace más tiempo
+    assert almacen.get('clave 1') is None
+    assert almacen.get('clave 2') is None
+    assert almacen.get('clave 0') is not None
+    assert almacen.get('clave 3') is not None
+    estadisticas = almacen.stats()
+    assert estadisticas['desalojos'] == 2
+    assert estadisticas['bytes'] <= 0.9 * almacen.max_bytes
+
+
+def test_sin_limite_no_desaloja(tmp_path):
+    almacen = ResultStore(str(tmp_path / 'resultados.db'), max_bytes=None, check_every=1)
+    for i in range(5):
+        almacen.set(f'clave {i}', _entrada(relleno=1000))
+    assert almacen.evict() == 0
+    assert almacen.stats()['entradas'] == 5
+
+
+def test_una_entrada_no_serializable_no_interrumpe(tmp_path, capsys):
+    almacen = ResultStore(str(tmp_path / 'resultados.db'))
+    almacen.set('clave', {'valor': object()})
+    assert almacen.get('clave') is None
+    assert almacen.stats()['errores'] == 1
+    assert 'almacén de resultados' in capsys.readouterr().out
+
+
+def test_migra_archivos_sin_marca_de_uso(tmp_path):
+    import sqlite3
+    ruta = str(tmp_path / 'viejo.db')
+    conn = sqlite3.connect(ruta)
+    conn.execute("CREATE TABLE resultados (clave TEXT PRIMARY KEY, valor TEXT NOT NULL, creado REAL NOT NULL)")
+    conn.execute("INSERT INTO resultados VALUES (?, ?, ?)", ('clave', json.dumps({'valor': 2.0}), 1.0))
+    conn.commit()
+    conn.close()
+    almacen = ResultStore(ruta)
+    assert almacen.get('clave') == {'valor': 2.0}
+    assert almacen.stats()['bytes'] == len(json.dumps({'valor': 2.0}))
+
+
+def test_leer_corpus(tmp_path):
+    corpus = tmp_path / 'corpus.txt'
+    corpus.write_text(
+        '# integrales frecuentes\n'
+        '\n'
+        'x^2; 0; 1\n'
+        '{"funcion": "sin(x)", "limite_inferior": "0", "limite_superior": "pi"}\n',
+        encoding='utf-8',
+    )
+    assert read_corpus(str(corpus)) == [('x^2', '0', '1'), ('sin(x)', '0', 'pi')]
+    corpus.write_text('x^2; 0\n', encoding='utf-8')
+    with pytest.raises(ValueError, match=':1:'):
+        read_corpus(str(corpus))
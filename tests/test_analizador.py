@@ -0,0 +1,91 @@
+# test_analizador.py - Analizador de expresiones (analizador.ExpressionParser)
+import time
+
+import pytest
+from sympy import E, Float, Integer, Rational, cos, exp, log, oo, pi, sin, sqrt, symbols
+
+from analizador import NOMBRES_MULTIPLES, ExpressionParser, ParseError
+
+x, y = symbols('x y')
+
+
+@pytest.fixture
+def analizador():
+    return ExpressionParser()
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('1 + 2*3', Integer(7)),
+    ('2^3^2', Integer(512)),          # ^ asocia por la derecha
+    ('2**3', Integer(8)),
+    ('-x^2', -x**2),                  # la potencia liga más que el signo
+    ('(-x)^2', x**2),
+    ('x^-1', 1/x),
+    ('8/4/2', Integer(1)),            # / asocia por la izquierda
+    ('1 - 2 - 3', Integer(-4)),
+    ('2^-2', Rational(1, 4)),
+])
+def test_precedencia_y_asociatividad(analizador, texto, esperado):
+    assert analizador.parse(texto) == esperado
+
+
+@pytest.mark.parametrize('texto, esperado', [
+    ('2x', 2*x),
+    ('2x^2', 2*x**2),                 # 2·(x^2), no (2x)^2
+    ('3sin(x)', 3*sin(x)),
+    ('x(x + 1)', x*(x + 1)),
+    ('(x + 1)(x - 1)', (x + 1)*(x - 1)),
+    ('xsin(x)', x*sin(x)),
+    ('sin(πx)', sin(pi*x)),
+    ('2pi', 2*pi),
+    ('e^x', exp(x)),
+])
+def test_multiplicacion_implicita(analizador, texto, esperado):
+    assert analizador.parse(texto) == esperado
+
+
+def test_funciones_y_constantes(analizador):
+    assert analizador.parse('sqrt(x) + ln(x) + cos(x)') == sqrt(x) + log(x) + cos(x)
+    assert analizador.parse('log(8, 2)') == log(8, 2)
+    assert analizador.parse('E') == E and analizador.parse('∞') == oo
+    assert analizador.parse('1.5e3') == Float(1500)
+
+
+@pytest.mark.parametrize('texto', [
+    '', 'x +', '(x', 'x)', 'sin x', 'sin(x, 2)', 'foo(x)', 'y', 'x $ 2', '__import__',
+])
+def test_entradas_invalidas(analizador, texto):
+    with pytest.raises(ParseError):
+        analizador.parse(texto)
+
+
+def test_limites_de_longitud_y_profundidad():
+    with pytest.raises(ParseError, match='20 caracteres'):
+        ExpressionParser(max_length=20).parse('x + ' * 10 + 'x')
+    with pytest.raises(ParseError, match='profundidad'):
+        ExpressionParser(max_depth=5).parse('(' * 10 + 'x' + ')' * 10)
+    with pytest.raises(ParseError, match='profundidad'):
+        ExpressionParser(max_depth=5).parse('-' * 10 + 'x')
+
+
+@pytest.mark.parametrize('texto', ['(9^9999)^9999', '2^2^2^2^2', '10^100000', '(1/3)^100000'])
+def test_potencias_numericas_enormes(analizador, texto):
+    inicio = time.perf_counter()
+    with pytest.raises(ParseError, match='Potencia numérica demasiado grande'):
+        analizador.parse(texto)
+    assert time.perf_counter() - inicio < 0.5
+
+
+@pytest.mark.parametrize('texto', ['2^2^2^2', '9^9999', 'x^100000', '2.0^100000', '(-1)^99999999'])
+def test_potencias_admitidas(analizador, texto):
+    analizador.parse(texto)
+
+
+def test_variables_de_integrales_multiples():
+    assert ExpressionParser(names=NOMBRES_MULTIPLES).parse('xy^2') == x*y**2
+
+
+def test_cache_de_expresiones(analizador):
+    assert analizador.parse('x^2') is analizador.parse('  x^2 ')
+    estadisticas = analizador.stats()
+    assert estadisticas['aciertos'] == 1 and estadisticas['fallos'] == 1
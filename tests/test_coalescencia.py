@@ -0,0 +1,163 @@
+# test_coalescencia.py - Cálculos idénticos en curso compartidos (coalescencia.SingleFlight)
+import os
+import threading
+import time
+
+import pytest
+
+from coalescencia import SingleFlight, private_directory
+
+
+class Cancelado(Exception):
+    pass
+
+
+def _en_hilos(n, fn):
+    resultados = [None] * n
+    errores = [None] * n
+
+    def correr(i):
+        try:
+            resultados[i] = fn()
+        except Exception as e:
+            errores[i] = e
+
+    hilos = [threading.Thread(target=correr, args=(i,)) for i in range(n)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(10)
+    return resultados, errores
+
+
+def test_hilos_comparten_un_calculo():
+    coalescedor = SingleFlight()
+    llamadas = []
+
+    def calculo():
+        llamadas.append(1)
+        time.sleep(0.2)
+        return {'valor': 42}
+
+    resultados, errores = _en_hilos(8, lambda: coalescedor.do('k', calculo))
+    assert errores == [None] * 8
+    assert len(llamadas) == 1
+    assert all(r[0] == {'valor': 42} for r in resultados)
+    assert sum(compartido for _, compartido in resultados) == 7
+    estadisticas = coalescedor.stats()
+    assert estadisticas['calculadas'] == 1 and estadisticas['coalescidas_hilos'] == 7
+    assert estadisticas['en_curso'] == 0
+
+
+def test_claves_distintas_no_se_comparten():
+    coalescedor = SingleFlight()
+    assert coalescedor.do('a', lambda: 1) == (1, False)
+    assert coalescedor.do('b', lambda: 2) == (2, False)
+
+
+def test_el_error_del_lider_llega_a_los_que_esperan():
+    coalescedor = SingleFlight()
+
+    def calculo():
+        time.sleep(0.2)
+        raise ValueError('falla')
+
+    _, errores = _en_hilos(4, lambda: coalescedor.do('k', calculo))
+    assert all(isinstance(e, ValueError) for e in errores)
+
+
+def test_si_el_lider_se_cancela_otro_toma_su_lugar():
+    coalescedor = SingleFlight(retry_on=(Cancelado,))
+    lider_empezo = threading.Event()
+    llamadas = []
+
+    def cancelado():
+        llamadas.append('lider')
+        lider_empezo.set()
+        time.sleep(0.2)
+        raise Cancelado()
+
+    lider = threading.Thread(target=lambda: pytest.raises(Cancelado, coalescedor.do, 'k', cancelado))
+    lider.start()
+    lider_empezo.wait(5)
+    resultado = coalescedor.do('k', lambda: llamadas.append('otro') or 7)
+    lider.join()
+    assert resultado == (7, False)
+    assert llamadas == ['lider', 'otro']
+
+
+def test_cancelar_mientras_se_espera():
+    coalescedor = SingleFlight(retry_on=(Cancelado,))
+    liberar = threading.Event()
+    hilo = threading.Thread(target=lambda: coalescedor.do('k', lambda: liberar.wait(5)))
+    hilo.start()
+    time.sleep(0.05)
+    cancel = threading.Event()
+    cancel.set()
+    with pytest.raises(Cancelado):
+        coalescedor.do('k', lambda: None, cancel)
+    liberar.set()
+    hilo.join()
+
+
+def test_procesos_comparten_el_resultado_por_archivo(tmp_path):
+    directorio = str(tmp_path / 'candados')
+    # Dos instancias son como dos procesos: flock se toma por archivo abierto
+    primero, segundo = SingleFlight(lock_dir=directorio), SingleFlight(lock_dir=directorio)
+    empezo = threading.Event()
+    llamadas = []
+
+    def calculo():
+        llamadas.append(1)
+        empezo.set()
+        time.sleep(0.2)
+        return {'grafica_bytes': b'\x89PNG', 'valor': 1.5, 'lista': [1, None]}
+
+    hilo = threading.Thread(target=lambda: primero.do('k', calculo))
+    hilo.start()
+    empezo.wait(5)
+    resultado, compartido = segundo.do('k', calculo)
+    hilo.join()
+    assert llamadas == [1]
+    assert compartido
+    assert resultado == {'grafica_bytes': b'\x89PNG', 'valor': 1.5, 'lista': [1, None]}
+    assert segundo.stats()['coalescidas_procesos'] == 1
+    # Sin pickle: el resultado queda en JSON
+    guardados = [nombre for nombre in os.listdir(directorio) if nombre.endswith('.res')]
+    with open(os.path.join(directorio, guardados[0]), encoding='utf-8') as archivo:
+        assert archivo.read().startswith('{')
+
+
+def test_resultado_vencido_se_recalcula(tmp_path):
+    directorio = str(tmp_path / 'candados')
+    SingleFlight(lock_dir=directorio, ttl=0.05).do('k', lambda: 1)
+    time.sleep(0.1)
+    assert SingleFlight(lock_dir=directorio, ttl=0.05).do('k', lambda: 2) == (2, False)
+
+
+def test_resultado_no_serializable_no_se_comparte(tmp_path):
+    directorio = str(tmp_path / 'candados')
+    objeto = object()
+    assert SingleFlight(lock_dir=directorio).do('k', lambda: objeto) == (objeto, False)
+    assert SingleFlight(lock_dir=directorio).do('k', lambda: 2) == (2, False)
+
+
+def test_directorio_compartido_no_privado(tmp_path):
+    directorio = tmp_path / 'abierto'
+    directorio.mkdir(mode=0o755)
+    os.chmod(directorio, 0o755)
+    with pytest.raises(PermissionError):
+        private_directory(str(directorio))
+    assert SingleFlight(lock_dir=str(directorio)).lock_dir is None
+    enlace = tmp_path / 'enlace'
+    enlace.symlink_to(tmp_path / 'otro')
+    (tmp_path / 'otro').mkdir(mode=0o700)
+    with pytest.raises(PermissionError):
+        private_directory(str(enlace))
+
+
+def test_clave_de_peticion_sin_analizar():
+    import tareas
+    assert tareas.clave_peticion(' x ** 2 ', '0', '1') == tareas.clave_peticion('x ^ 2', '0', '1')
+    assert tareas.clave_peticion('2 3', '0', '1') != tareas.clave_peticion('23', '0', '1')
+    assert tareas.clave_peticion('x', '0', '1', True) != tareas.clave_peticion('x', '0', '1', False)
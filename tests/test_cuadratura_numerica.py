@@ -0,0 +1,127 @@
+# test_cuadratura_numerica.py - Cuadratura de Gauss-Kronrod adaptativa
+import threading
+import time
+
+import mpmath
+import numpy as np
+import pytest
+
+import calculadora_logica
+from calculadora_logica import IntegralCalculator
+from cuadratura_numerica import (
+    QuadratureError,
+    cumulative_gauss_kronrod,
+    gauss_kronrod,
+    gauss_kronrod_many,
+    mpmath_precision,
+)
+
+# (función, a, b, valor exacto)
+INTEGRALES_CONOCIDAS = [
+    (np.sin, 0, np.pi, 2.0),
+    (lambda x: x ** 5 - 3 * x, -1, 2, 6.0),
+    (np.exp, 0, 1, np.e - 1),
+    (lambda x: np.sqrt(x), 0, 1, 2 / 3),
+    (lambda x: np.log(x), 0, 1, -1.0),
+    (lambda x: np.exp(-x ** 2), -np.inf, np.inf, np.sqrt(np.pi)),
+    (lambda x: 1 / x ** 2, 1, np.inf, 1.0),
+    (lambda x: np.exp(x), -np.inf, 0, 1.0),
+    (lambda x: 1 / (1 + x ** 2), 0, np.inf, np.pi / 2),
+    (lambda x: np.cos(50 * x), 0, np.pi / 4, np.sin(50 * np.pi / 4) / 50),
+]
+
+
+@pytest.mark.parametrize('f, a, b, exacto', INTEGRALES_CONOCIDAS)
+def test_integrales_conocidas(f, a, b, exacto):
+    valor, error, convergio = gauss_kronrod(f, a, b)
+    assert convergio
+    assert abs(valor - exacto) <= max(1e-10 * abs(exacto), 1e-12) * 10
+    # La estimación del error acota el error real
+    assert abs(valor - exacto) <= error + 1e-15
+    assert error <= max(1e-10 * abs(valor), 1e-12)
+
+
+def test_limites_invertidos_cambian_el_signo():
+    directo = gauss_kronrod(np.exp, 0, 1)
+    invertido = gauss_kronrod(np.exp, 1, 0)
+    assert invertido[0] == -directo[0] and invertido[1] == directo[1]
+    assert gauss_kronrod(lambda x: 1 / x ** 2, np.inf, 1)[0] == pytest.approx(-1.0, rel=1e-10)
+
+
+def test_limites_iguales():
+    assert gauss_kronrod(lambda x: 1 / x, 0, 0) == (0.0, 0.0, True)
+
+
+def test_la_tolerancia_pedida_se_respeta():
+    exacto = np.e - 1
+    for rel_tol in (1e-4, 1e-8, 1e-12):
+        valor, error, convergio = gauss_kronrod(np.exp, 0, 1, rel_tol=rel_tol, abs_tol=0)
+        assert convergio and error <= rel_tol * abs(valor)
+        assert abs(valor - exacto) <= error + 1e-15
+
+
+def test_valores_no_finitos_no_convergen():
+    valor, error, convergio = gauss_kronrod(lambda x: 1 / (x - 0.5) ** 2, 0, 1)
+    assert not convergio and error == np.inf
+
+
+def test_suma_no_finita_lanza_error():
+    with pytest.raises(QuadratureError):
+        gauss_kronrod(lambda x: np.full_like(x, 1e308), 0, 1e10)
+
+
+def test_muchos_puntos_coinciden_con_gauss_kronrod():
+    a = np.array([0.0, 0.5, 2.0, 0.0, 1.0])
+    b = np.array([1.0, 3.0, 0.5, np.inf, -np.inf])
+    k = np.array([1.0, 2.0, 2.0, 1.0, 3.0])
+    f = lambda x, k: np.exp(-k * x ** 2)
+    valores, errores = gauss_kronrod_many(f, a, b, params=(k,))
+    for i in range(len(a)):
+        esperado = gauss_kronrod(lambda x: f(x, k[i]), a[i], b[i])[0]
+        assert valores[i] == pytest.approx(esperado, rel=1e-9)
+        assert np.isfinite(errores[i])
+    finitos = np.isfinite(b)
+    acumulados, _ = cumulative_gauss_kronrod(f, a[finitos], b[finitos], params=(k[finitos],))
+    assert np.allclose(acumulados, valores[finitos], rtol=1e-9)
+
+
+def test_sin_subintervalos_suficientes_no_converge():
+    valor, error, convergio = gauss_kronrod(lambda x: x ** -0.99, 0, 1)
+    assert not convergio
+    assert error > 0 and valor < 100
+
+
+def test_respaldo_con_tanh_sinh_si_no_converge(monkeypatch):
+    original = gauss_kronrod
+
+    def sin_converger(f, a, b, **opciones):
+        valor, error, _ = original(f, a, b, max_intervals=1)
+        return valor, max(error, 1e-3), False
+
+    monkeypatch.setattr(calculadora_logica, 'gauss_kronrod', sin_converger)
+    resultado = IntegralCalculator().calculate_integral('x^x', '0', '1')
+    assert resultado['motor'] == 'mpmath' and resultado['convergio']
+    assert np.isclose(float(resultado['definida']), 0.7834305107121344, rtol=1e-12)
+
+
+def test_la_precision_de_mpmath_no_se_mezcla_entre_hilos():
+    vistas = []
+    dentro = threading.Event()
+
+    def larga():
+        with mpmath_precision(60):
+            dentro.set()
+            time.sleep(0.2)
+            vistas.append(mpmath.mp.dps)
+
+    hilo = threading.Thread(target=larga)
+    hilo.start()
+    dentro.wait()
+    with pytest.raises(QuadratureError):
+        with mpmath_precision(20, deadline=time.monotonic() + 0.01):
+            pass
+    with mpmath_precision(20):
+        vistas.append(mpmath.mp.dps)
+    hilo.join()
+    assert vistas == [60, 20]
+    assert mpmath.mp.dps == 15
@@ -0,0 +1,29 @@
+# test_formato.py - Texto del resultado que muestra el frontend
+import pytest
+
+from calculadora_logica import IntegralCalculator
+
+
+@pytest.fixture(scope='module')
+def calculadora():
+    return IntegralCalculator()
+
+
+def _texto(calculadora, funcion, a, b):
+    r = calculadora.calculate_integral(funcion, a, b)
+    return r, calculadora.format_result_pretty(r['definida'], r['indefinida'], r['a'], r['b'], funcion,
+                                               error_estimate=r['error_estimado'], engine=r['motor'])
+
+
+def test_valor_simbolico_sin_antiderivada_cerrada(calculadora):
+    resultado, texto = _texto(calculadora, 'abs(x)', '-1', '1')
+    assert resultado['motor'] == 'simbolico' and resultado['indefinida'] is None
+    assert 'cuadratura' not in texto
+    assert 'simbólica' in texto
+
+
+def test_valor_numerico(calculadora):
+    resultado, texto = _texto(calculadora, 'x^x', '0', '1')
+    assert resultado['motor'] != 'simbolico'
+    assert 'cuadratura numérica' in texto
+    assert '±' in texto
@@ -0,0 +1,32 @@
+# test_graficas.py - Datos de la gráfica que dibuja el navegador
+import json
+
+
+def _json_estricto(texto):
+    """Como response.json() del navegador: Infinity y NaN no son JSON válido"""
+    def rechazar(constante):
+        raise ValueError(f"Constante no válida en JSON: {constante}")
+    return json.loads(texto, parse_constant=rechazar)
+
+
+def test_datos_con_limite_infinito(cliente):
+    respuesta = cliente.post('/calcular', json={
+        'funcion': 'exp(-x)', 'limite_inferior': '0', 'limite_superior': 'oo',
+        'modo_grafica': 'datos', 'acumulada': True,
+    })
+    assert respuesta.status_code == 200
+    datos = _json_estricto(respuesta.get_data(as_text=True))
+    assert datos['exito']
+    assert datos['grafica_datos']['a'] == 0.0
+    assert datos['grafica_datos']['b'] is None
+
+
+def test_datos_en_lista_con_ambos_limites_infinitos(cliente):
+    respuesta = cliente.post('/calcular', json={
+        'funcion': '1/(1 + x^2)', 'limite_inferior': '-oo', 'limite_superior': 'oo',
+        'modo_grafica': 'datos', 'codificacion': 'lista',
+    })
+    assert respuesta.status_code == 200
+    datos = _json_estricto(respuesta.get_data(as_text=True))['grafica_datos']
+    assert datos['a'] is None and datos['b'] is None
+    assert len(datos['x']) == len(datos['y']) > 0
@@ -0,0 +1,74 @@
+# test_integracion_rapida.py - Integrador por reglas (integracion_rapida.FastIntegrator)
+import time
+
+import pytest
+from sympy import Rational, atan, cos, exp, integrate, log, sin, sqrt, symbols, tan
+
+from integracion_rapida import FastIntegrator
+
+x = symbols('x')
+
+# Una forma por regla (y combinaciones término a término), con la regla que debe cubrirla
+CASOS = [
+    (x**3 - 2*x + 5, 'polinomio'),
+    (Rational(7, 2), 'polinomio'),
+    ((2*x + 1)**Rational(1, 2), 'potencia'),
+    (1/(3*x - 2), 'potencia'),
+    ((x + 4)**-3, 'potencia'),
+    (sin(2*x + 1), 'trigonometrica'),
+    (cos(x/3), 'trigonometrica'),
+    (tan(x/2), 'trigonometrica'),
+    (exp(-3*x + 2), 'exponencial'),
+    (2**(5*x), 'exponencial'),
+    (log(2*x + 3), 'logaritmo'),
+    (1/(4*x**2 + 9), 'arcotangente'),
+    (x**2*exp(2*x), 'polinomio_por_funcion'),
+    ((x**2 + 1)*sin(3*x), 'polinomio_por_funcion'),
+    (exp(2*x)*cos(3*x + 1), 'exponencial_por_trigonometrica'),
+    (exp(-x)*sin(x), 'exponencial_por_trigonometrica'),
+    (3*sin(x) + x*exp(x) + 1/(x + 1), None),
+    ((x + 1)**2*cos(x), None),
+]
+
+
+@pytest.mark.parametrize('f, regla', CASOS)
+def test_reglas_coinciden_con_sympy(f, regla):
+    integrador = FastIntegrator()
+    encontrado = integrador.antiderivative(f, x)
+    assert encontrado is not None
+    antiderivada, polos = encontrado
+    if regla is not None:
+        assert integrador.stats()['reglas'][regla] >= 1
+    # Misma derivada que el integrando y misma integral definida que SymPy
+    diferencia = (antiderivada.diff(x) - f).subs(x, Rational(3, 10)).evalf()
+    assert abs(diferencia) < 1e-12
+    a, b = Rational(11, 10), Rational(2)
+    esperado = integrate(f, (x, a, b)).evalf()
+    assert abs((antiderivada.subs(x, b) - antiderivada.subs(x, a)).evalf() - esperado) < 1e-10
+
+
+def test_polos_conocidos():
+    integrador = FastIntegrator()
+    assert integrador.antiderivative(1/(x - 2), x) == (log(x - 2), [2])
+    assert integrador.antiderivative(log(2*x + 4), x)[1] == [-2]
+    assert integrador.antiderivative(1/(x**2 + 1), x) == (atan(x), [])
+    # Los polos de tan no los enumera la regla
+    assert integrador.antiderivative(tan(x), x)[1] is None
+
+
+@pytest.mark.parametrize('f', [exp(x**2), sin(x)/x, sqrt(x**2 + 1), x**20*exp(x)])
+def test_formas_no_cubiertas_siguen_por_sympy(f):
+    integrador = FastIntegrator()
+    assert integrador.antiderivative(f, x) is None
+    assert integrador.stats()['respaldos_sympy'] == 1
+
+
+def test_polinomio_de_grado_alto_no_se_expande():
+    integrador = FastIntegrator(max_polynomial_degree=200)
+    inicio = time.perf_counter()
+    # Expandirlo como Poly llevaría varios segundos
+    assert integrador.antiderivative((3*x + 7)**3000 * (x - 2), x) is None
+    assert time.perf_counter() - inicio < 1
+    # Una potencia sola la sigue cubriendo su regla, sin expandir
+    antiderivada, polos = integrador.antiderivative((3*x + 7)**3000, x)
+    assert antiderivada.diff(x) == (3*x + 7)**3000 and polos == []
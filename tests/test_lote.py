@@ -0,0 +1,34 @@
+# test_lote.py - Integrales por lotes (/calcular/lote)
+import json
+import math
+
+
+def _lote(cliente, integrales):
+    respuesta = cliente.post('/calcular/lote', json={'integrales': integrales})
+    assert respuesta.status_code == 200
+    lineas = [json.loads(linea) for linea in respuesta.get_data(as_text=True).splitlines() if linea]
+    return {resultado['indice']: resultado for resultado in lineas}
+
+
+def test_lote_con_antiderivada_erf(cliente):
+    # La antiderivada de exp(-x^2) usa erf, que NumPy no evalúa: cada par
+    # debe resolverse por separado en lugar de fallar todo el grupo
+    resultados = _lote(cliente, [
+        {'funcion': 'exp(-x^2)', 'limite_inferior': '-oo', 'limite_superior': 'oo'},
+        {'funcion': 'exp(-x^2)', 'limite_inferior': '0', 'limite_superior': 'oo'},
+        {'funcion': 'exp(-x^2)', 'limite_inferior': '0', 'limite_superior': '1'},
+    ])
+    assert len(resultados) == 3
+    assert all(resultado['exito'] for resultado in resultados.values()), resultados
+    esperados = [math.sqrt(math.pi), math.sqrt(math.pi) / 2, math.sqrt(math.pi) / 2 * math.erf(1)]
+    for indice, esperado in enumerate(esperados):
+        assert math.isclose(resultados[indice]['resultado'], esperado, rel_tol=1e-9)
+
+
+def test_lote_con_antiderivada_si(cliente):
+    resultados = _lote(cliente, [
+        {'funcion': 'sin(x)/x', 'limite_inferior': '1', 'limite_superior': '2'},
+        {'funcion': 'sin(x)/x', 'limite_inferior': '2', 'limite_superior': '3'},
+    ])
+    assert all(resultado['exito'] for resultado in resultados.values()), resultados
+    assert math.isclose(resultados[0]['resultado'] + resultados[1]['resultado'], 0.902569457632, rel_tol=1e-9)
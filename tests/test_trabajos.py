@@ -0,0 +1,91 @@
+# test_trabajos.py - Trabajos asíncronos compartidos entre los workers
+import importlib.util
+import json
+import os
+import tempfile
+import threading
+import time
+
+import pytest
+
+from trabajos import CANCELADO, COMPLETADO, EJECUTANDO, JobQueue
+
+
+@pytest.fixture(scope='module')
+def segunda_app():
+    """Otra instancia de la aplicación, como la de otro worker de gunicorn"""
+    import app
+    spec = importlib.util.spec_from_file_location('app_segundo_worker', app.__file__)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def _esperar(condicion, limite=10):
+    fin = time.monotonic() + limite
+    while not condicion():
+        assert time.monotonic() < fin, 'tiempo agotado'
+        time.sleep(0.05)
+
+
+def test_consulta_desde_otro_worker(cliente, segunda_app, monkeypatch):
+    import app
+    continuar = threading.Event()
+    original = app.calcular_coalescido
+
+    def calculo_retenido(*args, **kwargs):
+        continuar.wait(10)
+        return original(*args, **kwargs)
+
+    monkeypatch.setattr(app, 'calcular_coalescido', calculo_retenido)
+    respuesta = cliente.post('/calcular', json={
+        'funcion': 'x^2', 'limite_inferior': '0', 'limite_superior': '3',
+        'modo_grafica': 'datos', 'asincrono': True,
+    })
+    assert respuesta.status_code == 202
+    trabajo = respuesta.get_json()['trabajo']
+    assert trabajo not in segunda_app.trabajos._jobs
+
+    otro = segunda_app.app.test_client()
+    consulta = otro.get(f'/resultado/{trabajo}')
+    assert consulta.status_code == 202
+    assert consulta.get_json()['estado'] == EJECUTANDO
+
+    continuar.set()
+    _esperar(lambda: otro.get(f'/resultado/{trabajo}').status_code != 202)
+    final = otro.get(f'/resultado/{trabajo}').get_json()
+    assert final['estado'] == COMPLETADO and final['exito']
+    assert '9' in final['resultado_texto']
+
+    eventos = otro.get(f'/resultado/{trabajo}/eventos').get_data(as_text=True)
+    datos = eventos.split('event: resultado\ndata: ', 1)[1].split('\n', 1)[0]
+    assert json.loads(datos)['codigo'] == 200
+
+
+def test_trabajo_inexistente(segunda_app):
+    otro = segunda_app.app.test_client()
+    assert otro.get('/resultado/' + '0' * 32).status_code == 404
+    assert otro.get('/resultado/../../etc/passwd').status_code == 404
+
+
+def test_cancelar_desde_otro_proceso():
+    directorio = tempfile.mkdtemp()
+    propia, otra = JobQueue(workers=1, store_dir=directorio), JobQueue(workers=1, store_dir=directorio)
+
+    def espera_cancelacion(cancel):
+        assert cancel.wait(10)
+        raise RuntimeError('cancelado')
+
+    trabajo = propia.submit(espera_cancelacion)
+    _esperar(lambda: otra.get(trabajo.id).estado == EJECUTANDO)
+    remoto = otra.cancel(trabajo.id)
+    assert remoto.remote
+    assert otra.wait(remoto, 10)
+    assert remoto.estado == CANCELADO
+    assert trabajo.estado == CANCELADO
+
+
+def test_directorio_no_privado_deja_los_trabajos_locales():
+    directorio = tempfile.mkdtemp()
+    os.chmod(directorio, 0o755)
+    assert JobQueue(workers=1, store_dir=directorio).store_dir is None
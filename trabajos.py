@@ -0,0 +1,361 @@
+# trabajos.py - Cola de trabajos para los cálculos largos, compartida entre los workers
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from coalescencia import decode_json, encode_json, private_directory
+from pool_procesos import PoolSaturated, TaskCancelled, TaskTimeout, WorkerCrashed
+
+# Estados de un trabajo
+PENDIENTE = 'pendiente'
+EJECUTANDO = 'ejecutando'
+COMPLETADO = 'completado'
+ERROR = 'error'
+CANCELADO = 'cancelado'
+TERMINADOS = (COMPLETADO, ERROR, CANCELADO)
+
+# Errores que se reconstruyen con su tipo al leer un trabajo de otro proceso
+_ERRORES = {cls.__name__: cls for cls in (TaskTimeout, WorkerCrashed, TaskCancelled)}
+
+_ID = re.compile(r'[0-9a-f]{32}')
+
+
+class Job:
+    """Un cálculo aceptado por el servidor y su estado"""
+
+    def __init__(self, datos, job_id=None):
+        self.id = job_id or uuid.uuid4().hex
+        # Parámetros de la petición original (para construir la respuesta)
+        self.datos = datos
+        self.estado = PENDIENTE
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.terminado = None
+        self.cancel = threading.Event()
+        self.future = None
+        # Cambia con cada transición de estado; lo usan los que esperan
+        self.version = 0
+        # Proceso que lo ejecuta (los trabajos leídos del almacén son de otro)
+        self.pid = os.getpid()
+        self.remote = False
+
+    @property
+    def finished(self):
+        return self.estado in TERMINADOS
+
+    def state(self):
+        """Estado serializable del trabajo (ver JobQueue.store_dir)"""
+        error = self.error
+        if error is not None and not isinstance(error, str):
+            error = {'tipo': type(error).__name__, 'mensaje': str(error),
+                     'retry_after': getattr(error, 'retry_after', None)}
+        return {'id': self.id, 'datos': self.datos, 'estado': self.estado, 'resultado': self.resultado,
+                'error': error, 'creado': self.creado, 'terminado': self.terminado,
+                'version': self.version, 'pid': self.pid}
+
+    def update(self, state):
+        """Copia el estado leído del almacén"""
+        error = state['error']
+        if isinstance(error, dict):
+            if error['tipo'] == 'PoolSaturated':
+                error = PoolSaturated(error['retry_after'])
+            else:
+                error = _ERRORES.get(error['tipo'], Exception)(error['mensaje'])
+        self.datos = state['datos']
+        self.estado = state['estado']
+        self.resultado = state['resultado']
+        self.error = error
+        self.creado = state['creado']
+        self.terminado = state['terminado']
+        self.version = state['version']
+        self.pid = state['pid']
+
+
+class JobQueue:
+    """
+    Cola de trabajos en memoria del proceso web.
+
+    Cada trabajo corre en un hilo que normalmente solo espera al pool de
+    procesos, así que la petición HTTP que lo creó puede responder enseguida
+    con el identificador. Los resultados se consultan por sondeo o se esperan
+    con ``wait`` (Server-Sent Events) y se descartan ``ttl`` segundos después
+    de terminar.
+
+    Con ``store_dir``, cada trabajo deja su estado en un archivo JSON de ese
+    directorio (privado del usuario, ver coalescencia.private_directory), y
+    los demás workers de gunicorn lo consultan, esperan y cancelan desde ahí:
+    las consultas no tienen que llegar al proceso que aceptó el trabajo. Sin
+    ``store_dir`` los trabajos son locales a este proceso.
+
+    Args:
+        workers: Hilos que ejecutan los trabajos de este proceso
+        ttl: Segundos que se guarda un trabajo terminado
+        max_jobs: Trabajos sin terminar admitidos en este proceso
+        retry_after: Segundos sugeridos al rechazar un trabajo
+        store_dir: Directorio compartido por los workers (None = solo este proceso)
+    """
+
+    # Cada cuánto se relee un trabajo de otro proceso y se revisan las
+    # cancelaciones pedidas desde otros procesos (segundos)
+    POLL = 0.2
+
+    def __init__(self, workers=4, ttl=300.0, max_jobs=1000, retry_after=5, store_dir=None):
+        self.ttl = ttl
+        self.max_jobs = max_jobs
+        self.retry_after = retry_after
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='trabajo')
+        self._jobs = {}
+        self._changed = threading.Condition()
+        self.store_dir = store_dir
+        if store_dir is not None:
+            try:
+                private_directory(store_dir)
+            except OSError as e:
+                print(f"Trabajos solo en este proceso: {e}")
+                self.store_dir = None
+        self._watcher_pid = None
+        self._last_sweep = 0.0
+
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.cancelled = 0
+        self.rejected = 0
+
+    def submit(self, fn, datos=None):
+        """
+        Acepta un trabajo; fn recibe el Event de cancelación y devuelve el resultado.
+
+        Raises:
+            PoolSaturated: Si ya hay demasiados trabajos sin terminar
+        """
+        job = Job(datos or {})
+        with self._changed:
+            self._purge()
+            if sum(not j.finished for j in self._jobs.values()) >= self.max_jobs:
+                self.rejected += 1
+                raise PoolSaturated(self.retry_after)
+            self._jobs[job.id] = job
+            self.submitted += 1
+        self._save(job)
+        self._start_watcher()
+        job.future = self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id):
+        """Devuelve el trabajo (de este proceso o del almacén compartido), o None"""
+        with self._changed:
+            job = self._jobs.get(job_id)
+        if job is None and self.store_dir is not None and _ID.fullmatch(job_id):
+            state = self._load(job_id)
+            if state is not None:
+                job = Job(state['datos'], job_id)
+                job.update(state)
+                job.remote = True
+                self._check_owner(job)
+        return job
+
+    def cancel(self, job_id):
+        """Cancela un trabajo; devuelve el trabajo, o None si no existe"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job.remote:
+            # Lo cancela el proceso que lo ejecuta (ver _watch)
+            if not job.finished:
+                try:
+                    open(self._path(job_id, '.cancelar'), 'a').close()
+                except OSError:
+                    pass
+            return job
+        job.cancel.set()
+        # Si aún no empezó, nunca llegará a ejecutarse
+        if job.future is not None and job.future.cancel():
+            self._finish(job, CANCELADO, error="El cálculo fue cancelado.")
+        return job
+
+    def wait(self, job, timeout, version=None):
+        """
+        Espera hasta timeout segundos a que el trabajo termine (o, si se da
+        version, a que su estado cambie). Devuelve True si ocurrió.
+        """
+        deadline = time.monotonic() + timeout
+        if job.remote:
+            while not job.finished and (version is None or job.version == version):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                time.sleep(min(self.POLL, remaining))
+                self._refresh(job)
+            return True
+        with self._changed:
+            while not job.finished and (version is None or job.version == version):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._changed.wait(remaining)
+            return True
+
+    def stats(self):
+        """Devuelve los contadores de la cola"""
+        with self._changed:
+            activos = sum(not j.finished for j in self._jobs.values())
+            return {
+                "activos": activos,
+                "guardados": len(self._jobs),
+                "aceptados": self.submitted,
+                "completados": self.completed,
+                "errores": self.failed,
+                "cancelados": self.cancelled,
+                "rechazados": self.rejected,
+            }
+
+    def _run(self, job, fn):
+        if job.cancel.is_set():
+            self._finish(job, CANCELADO, error="El cálculo fue cancelado.")
+            return
+        self._transition(job, EJECUTANDO)
+        try:
+            resultado = fn(job.cancel)
+        except Exception as e:
+            if job.cancel.is_set():
+                self._finish(job, CANCELADO, error="El cálculo fue cancelado.")
+            else:
+                self._finish(job, ERROR, error=e)
+            return
+        if job.cancel.is_set():
+            # Sin pool de procesos el cálculo no se puede interrumpir: se descarta
+            self._finish(job, CANCELADO, error="El cálculo fue cancelado.")
+        else:
+            self._finish(job, COMPLETADO, resultado=resultado)
+
+    def _transition(self, job, estado):
+        with self._changed:
+            job.estado = estado
+            job.version += 1
+            self._changed.notify_all()
+        self._save(job)
+
+    def _finish(self, job, estado, resultado=None, error=None):
+        with self._changed:
+            if job.finished:
+                return
+            job.estado = estado
+            job.resultado = resultado
+            job.error = error
+            job.terminado = time.time()
+            job.version += 1
+            if estado == COMPLETADO:
+                self.completed += 1
+            elif estado == ERROR:
+                self.failed += 1
+            else:
+                self.cancelled += 1
+            self._changed.notify_all()
+        self._save(job)
+
+    def _purge(self):
+        """Descarta los trabajos terminados hace más de ttl segundos (con el lock tomado)"""
+        limite = time.time() - self.ttl
+        for job_id in [j.id for j in self._jobs.values() if j.finished and j.terminado < limite]:
+            del self._jobs[job_id]
+
+    # --- Almacén compartido entre procesos ---
+
+    def _path(self, job_id, ext='.json'):
+        return os.path.join(self.store_dir, job_id + ext)
+
+    def _save(self, job):
+        """Escribe el estado del trabajo de forma atómica para los demás procesos"""
+        if self.store_dir is None:
+            return
+        try:
+            data = encode_json(job.state())
+        except (TypeError, ValueError) as e:
+            # El resultado no es serializable: los demás procesos ven un error
+            failed = Job(job.datos, job.id)
+            failed.estado, failed.error, failed.terminado, failed.version = ERROR, e, job.terminado, job.version
+            data = encode_json(failed.state())
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.store_dir, prefix='.tmp_')
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp:
+                tmp.write(data)
+            os.replace(tmp_path, self._path(job.id))
+        except OSError as e:
+            print(f"Error al guardar el trabajo {job.id}: {e}")
+        if job.finished:
+            self._sweep()
+
+    def _load(self, job_id):
+        try:
+            with open(self._path(job_id), encoding='utf-8') as f:
+                return decode_json(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _refresh(self, job):
+        """Relee un trabajo de otro proceso"""
+        state = self._load(job.id)
+        if state is None:
+            job.estado, job.error = ERROR, Exception("El trabajo no existe o ya expiró.")
+            job.version += 1
+            return
+        job.update(state)
+        self._check_owner(job)
+
+    @staticmethod
+    def _check_owner(job):
+        """Un trabajo sin terminar cuyo proceso ya no existe no terminará nunca"""
+        if job.finished:
+            return
+        try:
+            os.kill(job.pid, 0)
+        except ProcessLookupError:
+            job.estado = ERROR
+            job.error = WorkerCrashed("El proceso que atendía el trabajo terminó de forma inesperada.")
+            job.version += 1
+        except OSError:
+            pass
+
+    def _start_watcher(self):
+        """Arranca (una vez por proceso: también tras un fork) la revisión de cancelaciones"""
+        if self.store_dir is None:
+            return
+        with self._changed:
+            if self._watcher_pid == os.getpid():
+                return
+            self._watcher_pid = os.getpid()
+        threading.Thread(target=self._watch, name='trabajos-cancelaciones', daemon=True).start()
+
+    def _watch(self):
+        """Aplica las cancelaciones pedidas desde otros procesos a los trabajos de este"""
+        while True:
+            time.sleep(self.POLL)
+            with self._changed:
+                active = [job.id for job in self._jobs.values() if not job.finished and not job.cancel.is_set()]
+            for job_id in active:
+                if os.path.exists(self._path(job_id, '.cancelar')):
+                    self.cancel(job_id)
+
+    def _sweep(self):
+        """Borra del almacén los trabajos sin cambios desde hace más de ttl segundos"""
+        now = time.time()
+        with self._changed:
+            if now - self._last_sweep < min(self.ttl, 60):
+                return
+            self._last_sweep = now
+        try:
+            with os.scandir(self.store_dir) as entries:
+                for entry in entries:
+                    try:
+                        if now - entry.stat().st_mtime > self.ttl:
+                            os.remove(entry.path)
+                    except FileNotFoundError:
+                        pass
+        except OSError:
+            pass